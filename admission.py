@@ -0,0 +1,128 @@
+"""
+Admission control for /chat.
+
+- At most `max_concurrent` agent runs execute at once
+- Up to `max_queue` further requests wait; beyond that callers get AdmissionRejected
+  (mapped to HTTP 429 + Retry-After)
+- Requests for the same thread_id run strictly in arrival order (asyncio.Lock is FIFO);
+  different threads run in parallel
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict
+
+
+class AdmissionRejected(Exception):
+    """Raised when the waiting queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Ticket:
+    thread_id: str
+    wait_sec: float
+    admitted_at: float
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 128, window: int = 1024) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._thread_locks: Dict[str, asyncio.Lock] = {}
+        self._thread_refs: Dict[str, int] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waits: Deque[float] = deque(maxlen=window)
+        self._service: Deque[float] = deque(maxlen=window)
+
+    def _thread_lock(self, thread_id: str) -> asyncio.Lock:
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = self._thread_locks[thread_id] = asyncio.Lock()
+        self._thread_refs[thread_id] = self._thread_refs.get(thread_id, 0) + 1
+        return lock
+
+    def _drop_thread_ref(self, thread_id: str) -> None:
+        self._thread_refs[thread_id] -= 1
+        if not self._thread_refs[thread_id]:
+            del self._thread_refs[thread_id]
+            del self._thread_locks[thread_id]
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely free, from recent service times."""
+        avg_service = sum(self._service) / len(self._service) if self._service else 1.0
+        return max(1, math.ceil(avg_service * (self.waiting + 1) / self.max_concurrent))
+
+    async def acquire(self, thread_id: str) -> Ticket:
+        """Wait for this thread's turn and a free run slot, or raise AdmissionRejected."""
+        lock = self._thread_locks.get(thread_id)
+        would_wait = self._slots.locked() or (lock is not None and lock.locked())
+        if would_wait and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.retry_after())
+
+        t0 = time.monotonic()
+        lock = self._thread_lock(thread_id)
+        self.waiting += 1
+        try:
+            await lock.acquire()
+            try:
+                await self._slots.acquire()
+            except BaseException:
+                lock.release()
+                raise
+        except BaseException:
+            self._drop_thread_ref(thread_id)
+            raise
+        finally:
+            self.waiting -= 1
+
+        now = time.monotonic()
+        self._waits.append(now - t0)
+        self.in_flight += 1
+        self.admitted += 1
+        return Ticket(thread_id=thread_id, wait_sec=now - t0, admitted_at=now)
+
+    def release(self, ticket: Ticket) -> None:
+        self._service.append(time.monotonic() - ticket.admitted_at)
+        self.in_flight -= 1
+        self._slots.release()
+        self._thread_locks[ticket.thread_id].release()
+        self._drop_thread_ref(ticket.thread_id)
+
+    @asynccontextmanager
+    async def admit(self, thread_id: str) -> AsyncIterator[Ticket]:
+        ticket = await self.acquire(thread_id)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 1) if waits else 0.0
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "active_threads": len(self._thread_locks),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p99": pct(0.99),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
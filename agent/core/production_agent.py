@@ -6,22 +6,27 @@ from agent.core.agent_loop import Agent, AgentMode
 from agent.core.llm_planner import build_planner_prompt, parse_plan_json
 from agent.core.policy import enforce_post_change_checks
 from agent.core.strict_verifier import strict_verify
-from agent.llm.openai_http import OpenAIHTTPClient
+from agent.llm.backend import as_backend
+from agent.llm.client_registry import get_registry
+from agent.llm.response_cache import with_response_cache
 from agent.tools.base import ToolInputError
 
 
 class ProductionAgent(Agent):
     def __init__(self, tools, mode: AgentMode) -> None:
         super().__init__(tools, mode)
-        self.llm = OpenAIHTTPClient()
+        # Shared pooled client: agents created per request reuse its keep-alive connections
+        self.llm = get_registry().get("openai", flavor="http")
 
     def plan(self, user_input: str) -> Dict:
         tools = self.tools.get_tool_schemas()
         prompt = build_planner_prompt(user_input, tools)
 
+        # self.llm may be any LLMBackend or a `complete(prompt)` client (tests inject fakes)
+        llm = with_response_cache(as_backend(self.llm))
         last_text = None
         for attempt in range(self.limits.max_planner_attempts):
-            resp = self.llm.complete(prompt)
+            resp = llm.generate(prompt)
             last_text = resp.text
             try:
                 plan = parse_plan_json(resp.text)
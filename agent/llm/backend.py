@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Protocol, Tuple, Union, runtime_checkable
+
+from openai import AsyncOpenAI, OpenAI
+
+from agent.llm.client_registry import get_registry
+
+Message = Dict[str, str]
+Prompt = Union[str, List[Message]]
+Usage = Optional[Dict[str, int]]  # prompt_tokens / completion_tokens / total_tokens
+
+
+@dataclass(frozen=True)
+class LLMResult:
+    """One completion plus how it was produced."""
+    text: str
+    model: str
+    backend: str
+    latency_ms: float
+    ttft_ms: Optional[float] = None  # time to first streamed chunk
+    usage: Usage = None              # provider-reported token counts, if any
+    streamed: bool = False
+    cached: bool = False             # served from the response cache
+    raw: Optional[Any] = None
+
+
+@runtime_checkable
+class LLMBackend(Protocol):
+    """
+    The one call shape the agent loops use. `prompt` is a plain string (sent
+    as a single user message) or a list of {"role", "content"} messages.
+    """
+
+    name: str
+    model: str
+
+    def generate(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> LLMResult: ...
+
+    async def agenerate(
+        self,
+        prompt: Prompt,
+        *,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> LLMResult: ...
+
+    def stream(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> Iterator[str]: ...
+
+    def astream(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> AsyncIterator[str]: ...
+
+
+def as_messages(prompt: Prompt) -> List[Message]:
+    return [{"role": "user", "content": prompt}] if isinstance(prompt, str) else list(prompt)
+
+
+class BaseBackend:
+    """
+    Implements the LLMBackend methods (timing, streaming, sync/async bridging)
+    on top of a few primitives. Subclasses implement `_generate` and override
+    `_agenerate` / `_stream` / `_astream` when the client has native versions;
+    the defaults run the sync call on a worker thread and stream it as one chunk.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str = "", temperature: float = 0.0) -> None:
+        self.model = model
+        self.temperature = temperature
+
+    # -- primitives: return (text, usage, raw) or yield text chunks --
+    def _generate(self, messages: List[Message], model: str, temperature: float) -> Tuple[str, Usage, Any]:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: List[Message], model: str, temperature: float) -> Tuple[str, Usage, Any]:
+        return await asyncio.to_thread(self._generate, messages, model, temperature)
+
+    def _stream(self, messages: List[Message], model: str, temperature: float) -> Iterator[str]:
+        yield self._generate(messages, model, temperature)[0]
+
+    async def _astream(self, messages: List[Message], model: str, temperature: float) -> AsyncIterator[str]:
+        yield (await self._agenerate(messages, model, temperature))[0]
+
+    # -- LLMBackend --
+    def _args(self, prompt: Prompt, model: Optional[str], temperature: Optional[float]):
+        return as_messages(prompt), model or self.model, self.temperature if temperature is None else temperature
+
+    def generate(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> LLMResult:
+        messages, model, temperature = self._args(prompt, model, temperature)
+        t0 = time.perf_counter()
+        text, usage, raw = self._generate(messages, model, temperature)
+        return LLMResult(text, model, self.name, (time.perf_counter() - t0) * 1000, usage=usage, raw=raw)
+
+    async def agenerate(
+        self,
+        prompt: Prompt,
+        *,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> LLMResult:
+        """Complete `prompt`; with `on_token`, stream and hand each chunk to it as it arrives."""
+        messages, model, temperature = self._args(prompt, model, temperature)
+        t0 = time.perf_counter()
+        if on_token is None:
+            text, usage, raw = await self._agenerate(messages, model, temperature)
+            return LLMResult(text, model, self.name, (time.perf_counter() - t0) * 1000, usage=usage, raw=raw)
+        parts: List[str] = []
+        ttft = None
+        async for chunk in self._astream(messages, model, temperature):
+            if ttft is None:
+                ttft = (time.perf_counter() - t0) * 1000
+            parts.append(chunk)
+            on_token(chunk)
+        return LLMResult("".join(parts), model, self.name, (time.perf_counter() - t0) * 1000, ttft_ms=ttft, streamed=True)
+
+    def stream(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> Iterator[str]:
+        return self._stream(*self._args(prompt, model, temperature))
+
+    def astream(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> AsyncIterator[str]:
+        return self._astream(*self._args(prompt, model, temperature))
+
+
+def _chat_usage(usage: Any) -> Usage:
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+class OpenAIChatBackend(BaseBackend):
+    """
+    Chat Completions API (OpenAI, Ollama and other OpenAI-compatible servers).
+    Without an explicit `client`, the sync and async SDK clients come from the
+    shared client registry for (provider, base_url, api_key).
+    """
+
+    name = "openai_chat"
+
+    def __init__(
+        self,
+        model: str,
+        client: Optional[Union[OpenAI, AsyncOpenAI]] = None,
+        *,
+        provider: str = "openai",
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        temperature: float = 0.3,
+    ) -> None:
+        super().__init__(model, temperature)
+        self.provider = provider
+        self.base_url = base_url
+        self.api_key = api_key
+        self.client = client
+
+    def _sync_client(self) -> OpenAI:
+        if self.client is None:
+            return get_registry().get(self.provider, self.base_url, self.api_key, flavor="sync")
+        if isinstance(self.client, AsyncOpenAI):
+            raise RuntimeError("Synchronous call on a backend wrapping an AsyncOpenAI client")
+        return self.client
+
+    def _async_client(self) -> Optional[AsyncOpenAI]:
+        """None when only a sync client is available (calls then run on a worker thread)."""
+        if self.client is None:
+            return get_registry().get(self.provider, self.base_url, self.api_key, flavor="async")
+        return self.client if isinstance(self.client, AsyncOpenAI) else None
+
+    def _generate(self, messages, model, temperature):
+        resp = self._sync_client().chat.completions.create(model=model, messages=messages, temperature=temperature)
+        return resp.choices[0].message.content, _chat_usage(resp.usage), resp
+
+    async def _agenerate(self, messages, model, temperature):
+        client = self._async_client()
+        if client is None:
+            return await super()._agenerate(messages, model, temperature)
+        resp = await client.chat.completions.create(model=model, messages=messages, temperature=temperature)
+        return resp.choices[0].message.content, _chat_usage(resp.usage), resp
+
+    def _stream(self, messages, model, temperature):
+        stream = self._sync_client().chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    async def _astream(self, messages, model, temperature):
+        client = self._async_client()
+        if client is None:
+            async for chunk in super()._astream(messages, model, temperature):
+                yield chunk
+            return
+        stream = await client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class ResponsesBackend(BaseBackend):
+    """
+    Wraps OpenAIHTTPClient (Responses API) or anything else with
+    `complete(prompt) -> obj with .text/.raw`. A single user message is sent as a
+    plain prompt string, so simple `complete(prompt: str)` fakes keep working.
+    """
+
+    name = "openai_responses"
+
+    def __init__(self, client: Any, model: Optional[str] = None) -> None:
+        super().__init__(model or getattr(client, "model", ""), temperature=0.0)
+        self.client = client
+
+    def _generate(self, messages, model, temperature):
+        if len(messages) == 1 and messages[0]["role"] == "user":
+            resp = self.client.complete(messages[0]["content"])
+        else:
+            resp = self.client.complete(messages)
+        raw = getattr(resp, "raw", None)
+        usage = None
+        if isinstance(raw, dict) and isinstance(raw.get("usage"), dict):
+            u = raw["usage"]
+            usage = {
+                "prompt_tokens": u.get("input_tokens", 0),
+                "completion_tokens": u.get("output_tokens", 0),
+                "total_tokens": u.get("total_tokens", u.get("input_tokens", 0) + u.get("output_tokens", 0)),
+            }
+        return resp.text, usage, raw
+
+
+def as_backend(llm: Any, model: Optional[str] = None) -> LLMBackend:
+    """
+    Adapt any supported client to LLMBackend: backends pass through, OpenAI SDK
+    clients get OpenAIChatBackend, `complete(prompt)` clients get ResponsesBackend.
+    """
+    if isinstance(llm, LLMBackend):
+        return llm
+    if isinstance(llm, (OpenAI, AsyncOpenAI)):
+        return OpenAIChatBackend(model or "gpt-4o-mini", client=llm)
+    if callable(getattr(llm, "complete", None)):
+        return ResponsesBackend(llm, model)
+    raise TypeError(f"Unsupported LLM client: {type(llm).__name__}")
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """The provider's breaker is open; the call was not attempted."""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"Circuit open for {name} (retry in {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one provider+model.
+
+    - Closed: calls go through; the last `window` outcomes are kept and the
+      breaker opens once at least `min_calls` of them have a failure rate of
+      `failure_rate` or more
+    - Open: calls fail fast with CircuitOpen for `open_sec`
+    - Half-open: up to `probes` calls are let through; a success closes the
+      breaker (fresh window), a failure opens it again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 3,
+        window: int = 20,
+        open_sec: float = 30.0,
+        probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_sec = open_sec
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_sec:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def acquire(self) -> None:
+        """Call before each attempt; raises CircuitOpen instead of letting it through."""
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._probes_in_flight >= self.probes):
+                self._stats["rejected"] += 1
+                retry_after = max(0.0, self.open_sec - (time.monotonic() - self._opened_at))
+                raise CircuitOpen(self.name, retry_after)
+            if state == HALF_OPEN:
+                self._probes_in_flight += 1
+            self._stats["calls"] += 1
+
+    def release(self) -> None:
+        """The acquired call was abandoned (e.g. cancelled) without an outcome."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(False)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(True)
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._trip()
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            outcomes = list(self._outcomes)
+            return {
+                "name": self.name,
+                "state": state,
+                "failure_rate": round(sum(outcomes) / len(outcomes), 3) if outcomes else 0.0,
+                "window_calls": len(outcomes),
+                "retry_after_sec": round(max(0.0, self.open_sec - (time.monotonic() - self._opened_at)), 1)
+                if state == OPEN else 0.0,
+                **self._stats,
+            }
+
+
+class BreakerRegistry:
+    """
+    One shared CircuitBreaker per (provider, model). Thresholds come from
+    LLM_BREAKER_FAILURE_RATE, LLM_BREAKER_MIN_CALLS, LLM_BREAKER_WINDOW and
+    LLM_BREAKER_OPEN_SEC unless given.
+    """
+
+    def __init__(self, **settings: Any) -> None:
+        self.settings = {
+            "failure_rate": float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            "min_calls": int(os.getenv("LLM_BREAKER_MIN_CALLS", "3")),
+            "window": int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+            "open_sec": float(os.getenv("LLM_BREAKER_OPEN_SEC", "30")),
+            **settings,
+        }
+        self._lock = threading.Lock()
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get((provider, model))
+            if breaker is None:
+                breaker = self._breakers[(provider, model)] = CircuitBreaker(f"{provider}/{model}", **self.settings)
+            return breaker
+
+    def state(self, provider: str, model: str) -> str:
+        """State without creating a breaker for an unseen provider (those are closed)."""
+        with self._lock:
+            breaker = self._breakers.get((provider, model))
+        return breaker.state if breaker else CLOSED
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [b.stats() for b in breakers]
+
+
+_breakers: Optional[BreakerRegistry] = None
+_breakers_lock = threading.Lock()
+
+
+def get_breakers() -> BreakerRegistry:
+    """The process-wide breaker registry (created on first use)."""
+    global _breakers
+    if _breakers is None:
+        with _breakers_lock:
+            if _breakers is None:
+                _breakers = BreakerRegistry()
+    return _breakers
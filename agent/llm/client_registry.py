@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from agent.llm.openai_http import OpenAIHTTPClient
+
+# (provider, base_url, api key fingerprint, flavor)
+ClientKey = Tuple[str, Optional[str], str, str]
+
+FLAVORS = ("async", "sync", "http")  # AsyncOpenAI, OpenAI, OpenAIHTTPClient
+
+
+@dataclass
+class _Entry:
+    client: Any
+    provider: str
+    base_url: Optional[str]
+    flavor: str
+    http_client: Optional[Any] = None
+    created_ts: float = field(default_factory=time.time)
+    lookups: int = 0
+
+
+def resolve_provider(provider: str, base_url: Optional[str] = None, api_key: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Default (base_url, api_key) for a routing-policy provider name."""
+    if provider == "ollama":
+        return base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"), api_key or "ollama"
+    if provider in ("openai", "openai_compat"):
+        return base_url or os.getenv("OPENAI_BASE_URL") or None, api_key or os.getenv("OPENAI_API_KEY")
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def _fingerprint(api_key: Optional[str]) -> str:
+    # Cache key and stats never hold the raw key
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+class ClientRegistry:
+    """
+    Process-wide cache of LLM clients keyed by (provider, base_url, api key).
+
+    Clients are created on first use and then shared by every request, route
+    and fallback, so their HTTP connection pools (and keep-alive connections)
+    survive across calls instead of being rebuilt on each fallback.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None, max_keepalive: Optional[int] = None) -> None:
+        self.max_connections = max_connections or int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+        self.max_keepalive = max_keepalive or int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+        self._lock = threading.Lock()
+        self._entries: Dict[ClientKey, _Entry] = {}
+        self.created = 0
+        self.hits = 0
+
+    def get(
+        self,
+        provider: str,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        flavor: str = "async",
+    ) -> Any:
+        """Shared client for a provider; `flavor` is "async", "sync" or "http"."""
+        if flavor not in FLAVORS:
+            raise ValueError(f"Unknown client flavor: {flavor}")
+        base_url, api_key = resolve_provider(provider, base_url, api_key)
+        key: ClientKey = (provider, base_url, _fingerprint(api_key), flavor)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = self._create(provider, base_url, api_key, flavor)
+                self.created += 1
+            else:
+                self.hits += 1
+            entry.lookups += 1
+            return entry.client
+
+    def _create(self, provider: str, base_url: Optional[str], api_key: Optional[str], flavor: str) -> _Entry:
+        if flavor == "http":
+            client = OpenAIHTTPClient(api_key=api_key, base_url=base_url)
+            return _Entry(client, provider, base_url, flavor)
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive)
+        if flavor == "async":
+            http_client = DefaultAsyncHttpxClient(limits=limits)
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        else:
+            http_client = DefaultHttpxClient(limits=limits)
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        return _Entry(client, provider, base_url, flavor, http_client=http_client)
+
+    @staticmethod
+    def _pool_stats(entry: _Entry) -> Dict[str, Any]:
+        if entry.flavor == "http":
+            return entry.client.pool_stats()
+        try:
+            # httpx keeps its connection pool on the transport; best effort, internals vary by version
+            connections = list(entry.http_client._transport._pool.connections)
+        except Exception:
+            return {}
+        idle = sum(1 for c in connections if c.is_idle())
+        return {"connections": len(connections), "idle_connections": idle}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries: List[_Entry] = list(self._entries.values())
+            summary = {"clients": len(entries), "created": self.created, "hits": self.hits}
+        summary["by_client"] = [
+            {
+                "provider": e.provider,
+                "base_url": e.base_url,
+                "flavor": e.flavor,
+                "lookups": e.lookups,
+                "age_sec": round(time.time() - e.created_ts, 1),
+                **self._pool_stats(e),
+            }
+            for e in entries
+        ]
+        return summary
+
+    async def aclose(self) -> None:
+        """Close every client and its connection pool (shutdown / tests)."""
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), {}
+        for e in entries:
+            try:
+                if e.flavor == "async":
+                    await e.client.close()
+                else:
+                    e.client.close()
+            except Exception:
+                pass
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    """The process-wide registry (created on first use)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ClientRegistry()
+    return _registry
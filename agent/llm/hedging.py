@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, fields
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+OnToken = Optional[Callable[[str], None]]
+# One attempt: called with its own on_token (None when not streaming), returns the completion text
+Attempt = Callable[[OnToken], Awaitable[str]]
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    Per-role "hedge" block in routing_policy.json. Once the primary has been
+    slower than its `percentile` latency, the fallback gets the same request.
+    """
+    enabled: bool = False
+    percentile: float = 95.0
+    initial_delay_ms: float = 2000.0  # used until `min_samples` latencies are known
+    min_delay_ms: float = 200.0
+    max_delay_ms: float = 10000.0
+    min_samples: int = 20
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "HedgePolicy":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (config or {}).items() if k in known})
+
+
+@dataclass
+class HedgeResult:
+    text: Optional[str]
+    winner: Optional[str]           # "primary" / "fallback"; None if both failed
+    hedged: bool                    # fallback was started
+    hedge_reason: Optional[str]     # "slow_primary" / "primary_error"
+    delay_ms: float
+    latency_ms: float
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def trace(self) -> Dict[str, Any]:
+        return {
+            "winner": self.winner,
+            "hedged": self.hedged,
+            "hedge_reason": self.hedge_reason,
+            "delay_ms": round(self.delay_ms, 1),
+            "latency_ms": round(self.latency_ms, 1),
+            "errors": self.errors,
+        }
+
+
+class HedgeFailed(Exception):
+    """Neither the primary nor the fallback produced an answer."""
+
+    def __init__(self, result: HedgeResult) -> None:
+        super().__init__("; ".join(f"{k}: {v}" for k, v in result.errors.items()) or "no answer")
+        self.result = result
+
+
+class Hedger:
+    """
+    Races a primary LLM call against a delayed fallback.
+
+    - The hedge delay is the primary's observed latency percentile (rolling
+      window), clamped to the policy's min/max. A primary that loses while
+      still running is recorded at its elapsed time: a lower bound, but
+      leaving it out would skew the window toward the fast calls
+    - If the primary fails before the delay, the fallback starts immediately
+    - The first non-empty answer wins and the other call is cancelled; when
+      streaming, the first attempt to deliver a chunk owns the stream
+    """
+
+    def __init__(self, window: int = 256) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._stats = {"calls": 0, "hedged": 0, "primary_wins": 0, "fallback_wins": 0, "failures": 0,
+                       "primary_censored": 0}
+
+    def observe(self, key: str, latency_ms: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(latency_ms)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))]
+
+    def delay_ms(self, key: str, policy: HedgePolicy) -> float:
+        with self._lock:
+            count = len(self._latencies.get(key, ()))
+        if count < policy.min_samples:
+            delay = policy.initial_delay_ms
+        else:
+            delay = self.percentile(key, policy.percentile)
+        return min(policy.max_delay_ms, max(policy.min_delay_ms, delay))
+
+    async def run(
+        self,
+        key: str,
+        policy: HedgePolicy,
+        primary: Attempt,
+        fallback: Attempt,
+        on_token: OnToken = None,
+    ) -> HedgeResult:
+        """Answer from whichever attempt finishes first; raises HedgeFailed if both fail."""
+        delay = self.delay_ms(key, policy)
+        t0 = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        labels: Dict[asyncio.Task, str] = {}
+        stream_owner = []
+
+        def forward(label: str) -> OnToken:
+            if on_token is None:
+                return None
+
+            def deliver(chunk: str) -> None:
+                if not stream_owner:
+                    stream_owner.append(label)
+                    for other, task in tasks.items():
+                        if other != label:
+                            task.cancel()
+                if stream_owner[0] == label:
+                    on_token(chunk)
+            return deliver
+
+        def start(label: str, attempt: Attempt) -> asyncio.Task:
+            task = asyncio.create_task(attempt(forward(label)))
+            tasks[label] = task
+            labels[task] = label
+            return task
+
+        def censor() -> None:
+            self.observe(key, (time.perf_counter() - t0) * 1000)
+            with self._lock:
+                self._stats["primary_censored"] += 1
+
+        result = HedgeResult(None, None, False, None, delay, 0.0)
+        pending = {start("primary", primary)}
+        timeout: Optional[float] = delay / 1000
+        try:
+            while pending and result.winner is None:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    result.hedged, result.hedge_reason = True, "slow_primary"
+                    pending.add(start("fallback", fallback))
+                    timeout = None
+                    continue
+                for task in done:
+                    label = labels[task]
+                    if task.cancelled():
+                        result.errors[label] = "cancelled"
+                        if label == "primary":
+                            censor()
+                    elif task.exception() is not None:
+                        err = task.exception()
+                        result.errors[label] = f"{type(err).__name__}: {err}"[:200]
+                    elif not (task.result() or "").strip():
+                        result.errors[label] = "empty response"
+                    elif result.winner is None:
+                        result.text, result.winner = task.result(), label
+                        if label == "primary":
+                            self.observe(key, (time.perf_counter() - t0) * 1000)
+                # A primary that failed before the hedge delay hands over right away,
+                # unless it already streamed chunks (those cannot be taken back)
+                if result.winner is None and "fallback" not in tasks and not stream_owner:
+                    result.hedged, result.hedge_reason = True, "primary_error"
+                    pending.add(start("fallback", fallback))
+                    timeout = None
+        finally:
+            if tasks["primary"] in pending:
+                censor()
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        result.latency_ms = (time.perf_counter() - t0) * 1000
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["hedged"] += result.hedged
+            if result.winner is None:
+                self._stats["failures"] += 1
+            else:
+                self._stats[f"{result.winner}_wins"] += 1
+        if result.winner is None:
+            raise HedgeFailed(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            keys = list(self._latencies)
+        stats["primary_latency_ms"] = {
+            key: {
+                "samples": len(self._latencies[key]),
+                "p50": self.percentile(key, 50),
+                "p95": self.percentile(key, 95),
+            }
+            for key in keys
+        }
+        return stats
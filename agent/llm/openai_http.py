@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import os
+import threading
 import requests
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
+
+from requests.adapters import HTTPAdapter
 
 from dotenv import load_dotenv
 
@@ -20,37 +23,97 @@ class OpenAIHTTPClient:
     """
     Minimal OpenAI client using the Responses API.
     Deterministic settings for planning.
+
+    Connections are pooled and kept alive, so repeated calls (planner retries,
+    repair prompts) reuse one TCP/TLS connection instead of handshaking each time.
+    The urllib3 pool lives in one shared HTTPAdapter; each thread gets its own
+    requests.Session mounted on it, so the client is safe to share across threads.
     """
 
     def __init__(
         self,
         api_key: Optional[str] = None,
         model: Optional[str] = None,
-        base_url: str = "https://api.openai.com/v1",
+        base_url: Optional[str] = None,
         timeout_sec: int = 60,
+        connect_timeout_sec: Optional[float] = None,
+        pool_size: Optional[int] = None,
+        keep_alive: bool = True,
     ) -> None:
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self.model = model or os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
-        self.base_url = base_url.rstrip("/")
-        self.timeout_sec = timeout_sec
+        self.base_url = (base_url or os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+        self.timeout_sec = timeout_sec  # read timeout
+        self.connect_timeout_sec = (
+            connect_timeout_sec
+            if connect_timeout_sec is not None
+            else float(os.environ.get("OPENAI_HTTP_CONNECT_TIMEOUT", "5"))
+        )
+        self.pool_size = pool_size or int(os.environ.get("OPENAI_HTTP_POOL_SIZE", "10"))
+        self.keep_alive = keep_alive
 
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not set")
 
-    def complete(self, prompt: str) -> LLMResponse:
-        url = f"{self.base_url}/responses"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
+        # pool_maxsize = connections kept per host; block=False opens extra ones under burst
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self._local = threading.local()
+        self._sessions_lock = threading.Lock()
+        self._sessions: list = []
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "Connection": "keep-alive" if self.keep_alive else "close",
+            })
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connections currently held by the pool (idle = ready for reuse)."""
+        manager = self._adapter.poolmanager
+        pools = [p for p in (manager.pools.get(key) for key in manager.pools.keys()) if p is not None]
+        return {
+            "pool_size": self.pool_size,
+            "hosts": len(pools),
+            # The pool queue is pre-filled with None placeholders; count real connections only
+            "idle_connections": sum(1 for p in pools if p.pool for c in list(p.pool.queue) if c is not None),
+            "connections_opened": sum(p.num_connections for p in pools),
+            "requests": sum(p.num_requests for p in pools),
         }
 
+    def close(self) -> None:
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+
+    def __enter__(self) -> "OpenAIHTTPClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def complete(self, prompt: Union[str, List[Dict[str, str]]]) -> LLMResponse:
+        """`prompt` is a string or a list of {"role", "content"} messages (Responses API input)."""
+        url = f"{self.base_url}/responses"
+
         payload = {
             "model": self.model,
             "input": prompt,
             "temperature": 0,
         }
 
-        r = requests.post(url, headers=headers, json=payload, timeout=self.timeout_sec)
+        r = self._session().post(url, json=payload, timeout=(self.connect_timeout_sec, self.timeout_sec))
         if r.status_code >= 400:
             raise RuntimeError(f"OpenAI error {r.status_code}: {r.text}")
 
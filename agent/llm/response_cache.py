@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agent.llm.backend import BaseBackend, LLMBackend, LLMResult, Prompt
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+    """Content address of a completion request."""
+    blob = json.dumps(
+        {"model": model, "messages": [[m.get("role"), m.get("content")] for m in messages], "temperature": temperature},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed completion cache: in-memory LRU in front of a SQLite file.
+
+    - Entries expire `ttl_sec` after they were stored
+    - The LRU holds `max_memory` entries; the file holds `max_disk` (least
+      recently used rows are evicted in batches once it is over)
+    - path=None keeps everything in memory
+    - The LRU has its own lock, separate from the file's, so memory hits never
+      wait on SQLite; async callers use aget/aput, which run the file work on
+      a worker thread
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_sec: float = 86400.0,
+        max_memory: int = 512,
+        max_disk: int = 10000,
+    ) -> None:
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self._lock = threading.Lock()     # LRU and stats
+        self._db_lock = threading.Lock()  # the SQLite connection and _disk_rows
+        self._lru: "OrderedDict[str, Tuple[float, str, Optional[Dict[str, int]]]]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "puts": 0, "expired": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, text TEXT NOT NULL, usage TEXT,"
+                " created_ts REAL NOT NULL, last_used_ts REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_ts)")
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[Dict[str, int]]]]:
+        """(text, usage) for a live entry, else None."""
+        found = self._memory_get(key)
+        if found is None and self._db is not None:
+            found = self._disk_get(key)
+        return self._counted(found)
+
+    async def aget(self, key: str) -> Optional[Tuple[str, Optional[Dict[str, int]]]]:
+        """get() for the event loop: the SQLite lookup runs on a worker thread."""
+        found = self._memory_get(key)
+        if found is None and self._db is not None:
+            found = await asyncio.to_thread(self._disk_get, key)
+        return self._counted(found)
+
+    def put(self, key: str, text: str, usage: Optional[Dict[str, int]] = None) -> None:
+        now = self._memory_put(key, text, usage)
+        if self._db is not None:
+            self._disk_put(key, text, usage, now)
+
+    async def aput(self, key: str, text: str, usage: Optional[Dict[str, int]] = None) -> None:
+        """put() for the event loop: the SQLite write (and any eviction) runs on a worker thread."""
+        now = self._memory_put(key, text, usage)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, text, usage, now)
+
+    def _counted(self, found: Optional[Tuple[str, Optional[Dict[str, int]]]]) -> Optional[Tuple[str, Optional[Dict[str, int]]]]:
+        if found is None:
+            with self._lock:
+                self._stats["misses"] += 1
+        return found
+
+    def _memory_get(self, key: str) -> Optional[Tuple[str, Optional[Dict[str, int]]]]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] <= self.ttl_sec:
+                self._lru.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[1], entry[2]
+            del self._lru[key]
+            self._stats["expired"] += 1
+            return None
+
+    def _memory_put(self, key: str, text: str, usage: Optional[Dict[str, int]]) -> float:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, text, usage)
+            self._stats["puts"] += 1
+        return now
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, Optional[Dict[str, int]]]]:
+        now = time.time()
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT text, usage, created_ts FROM responses WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl_sec:
+                self._db.execute("DELETE FROM responses WHERE key=?", (key,))
+                self._disk_rows -= 1
+                with self._lock:
+                    self._stats["expired"] += 1
+                return None
+            self._db.execute("UPDATE responses SET last_used_ts=? WHERE key=?", (now, key))
+        usage = json.loads(row[1]) if row[1] else None
+        with self._lock:
+            self._remember(key, row[2], row[0], usage)
+            self._stats["disk_hits"] += 1
+        return row[0], usage
+
+    def _disk_put(self, key: str, text: str, usage: Optional[Dict[str, int]], now: float) -> None:
+        with self._db_lock:
+            if self._db is None:
+                return
+            cur = self._db.execute(
+                "INSERT OR REPLACE INTO responses(key, text, usage, created_ts, last_used_ts) VALUES (?, ?, ?, ?, ?)",
+                (key, text, json.dumps(usage) if usage else None, now, now),
+            )
+            self._disk_rows += 1 if cur.rowcount == 1 else 0
+            if self._disk_rows > self.max_disk:
+                self._evict_disk()
+
+    def _remember(self, key: str, created_ts: float, text: str, usage: Optional[Dict[str, int]]) -> None:
+        self._lru[key] = (created_ts, text, usage)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory:
+            self._lru.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        # Expired rows first, then least recently used down to 90% so eviction isn't per put
+        self._db.execute("DELETE FROM responses WHERE created_ts < ?", (time.time() - self.ttl_sec,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - int(self.max_disk * 0.9)
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used_ts LIMIT ?)",
+                (excess,),
+            )
+            with self._lock:
+                self._stats["evictions"] += excess
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._lru),
+                "disk_entries": self._disk_rows,
+            }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CachingBackend(BaseBackend):
+    """
+    LLMBackend wrapper that answers repeated deterministic requests from a
+    ResponseCache. Only calls at temperature <= `max_temperature` (default 0)
+    are cached; everything else goes straight to the wrapped backend.
+    """
+
+    def __init__(self, inner: LLMBackend, cache: ResponseCache, max_temperature: float = 0.0) -> None:
+        super().__init__(inner.model, getattr(inner, "temperature", 0.0))
+        self.inner = inner
+        self.cache = cache
+        self.max_temperature = max_temperature
+        self.name = inner.name
+
+    def _key(self, prompt: Prompt, model: Optional[str], temperature: Optional[float]) -> Optional[str]:
+        messages, model, temperature = self._args(prompt, model, temperature)
+        if temperature > self.max_temperature:
+            return None
+        return cache_key(model, messages, temperature)
+
+    def _result(self, found: Optional[Tuple[str, Optional[Dict[str, int]]]], model: Optional[str], t0: float) -> Optional[LLMResult]:
+        if found is None:
+            return None
+        text, usage = found
+        return LLMResult(text, model or self.model, self.name, (time.perf_counter() - t0) * 1000, usage=usage, cached=True)
+
+    def generate(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> LLMResult:
+        t0 = time.perf_counter()
+        key = self._key(prompt, model, temperature)
+        hit = self._result(self.cache.get(key), model, t0) if key else None
+        if hit is not None:
+            return hit
+        result = self.inner.generate(prompt, model=model, temperature=temperature)
+        if key and result.text:
+            self.cache.put(key, result.text, result.usage)
+        return result
+
+    async def agenerate(
+        self,
+        prompt: Prompt,
+        *,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> LLMResult:
+        t0 = time.perf_counter()
+        key = self._key(prompt, model, temperature)
+        hit = self._result(await self.cache.aget(key), model, t0) if key else None
+        if hit is not None:
+            if on_token is not None:
+                on_token(hit.text)
+            return hit
+        result = await self.inner.agenerate(prompt, model=model, temperature=temperature, on_token=on_token)
+        if key and result.text:
+            await self.cache.aput(key, result.text, result.usage)
+        return result
+
+    def stream(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None) -> Iterator[str]:
+        return self.inner.stream(prompt, model=model, temperature=temperature)
+
+    def astream(self, prompt: Prompt, *, model: Optional[str] = None, temperature: Optional[float] = None):
+        return self.inner.astream(prompt, model=model, temperature=temperature)
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache, or None unless enabled with LLM_RESPONSE_CACHE=1.
+    LLM_RESPONSE_CACHE_PATH ("" = memory only), LLM_RESPONSE_CACHE_TTL_SEC,
+    LLM_RESPONSE_CACHE_MEMORY and LLM_RESPONSE_CACHE_MAX_ENTRIES configure it.
+    """
+    global _cache
+    if os.getenv("LLM_RESPONSE_CACHE", "0").lower() not in ("1", "true", "yes"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    path=os.getenv("LLM_RESPONSE_CACHE_PATH", "llm_cache.db") or None,
+                    ttl_sec=float(os.getenv("LLM_RESPONSE_CACHE_TTL_SEC", "86400")),
+                    max_memory=int(os.getenv("LLM_RESPONSE_CACHE_MEMORY", "512")),
+                    max_disk=int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+                )
+    return _cache
+
+
+def with_response_cache(backend: LLMBackend) -> LLMBackend:
+    """Wrap `backend` in the process-wide cache when caching is enabled."""
+    cache = get_response_cache()
+    if cache is None or isinstance(backend, CachingBackend):
+        return backend
+    return CachingBackend(backend, cache)
@@ -1,17 +1,33 @@
 import os
+import asyncio
 import sqlite3
 import json
 import time
 import random
+import inspect
 import re
 from typing import List, Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from openai import OpenAI
 
+from admission import AdmissionController, AdmissionRejected
+from agent.llm.backend import LLMBackend, LLMResult, OpenAIChatBackend, as_backend
+from agent.llm.circuit_breaker import CircuitOpen, get_breakers
+from agent.llm.client_registry import get_registry
+from agent.llm.hedging import HedgeFailed, HedgePolicy, Hedger
+from agent.llm.response_cache import get_response_cache, with_response_cache
+from context_window import estimate_tokens, fold_summary, message_tokens, select_window
+from history import HistoryCache, ThreadState
+from http_fetch import get_fetcher
+from llm_metrics import LLMCall, LLMStats, call_tokens, summarize_calls
+from prompt_budget import DETAIL_TOOL, compact_result, format_tool_logs, ref_for, tool_detail
+from storage import GroupCommitWriter, SQLitePool, UsageAggregator, column_exists, migrate
+from tool_cache import ToolCache
+from tool_runtime import ToolTimeout, runtime_from_env
 from tools import (
     calculator,
     current_time,
@@ -30,6 +46,7 @@ class RunOutcome:
     final_text: str
     tool_logs: List[Dict]
     reason: Optional[str] = None
+    llm_calls: List[Dict] = field(default_factory=list)  # LLMCall.to_dict() per model call
 
 # -------------------- EXCEPTIONS --------------------
 class AgentTimeout(Exception):
@@ -50,34 +67,42 @@ def load_routing_policy(path="routing_policy.json"):
     from pathlib import Path
     return json.loads(Path(path).read_text(encoding="utf-8"))
 
-def create_llm_from_policy(policy_entry: Dict[str, str]):
+# Process-wide LLM clients, created lazily and shared by every route and fallback
+llm_clients = get_registry()
+
+def create_llm_from_policy(policy_entry: Dict[str, str]) -> Tuple[LLMBackend, str]:
     """
-    Create an LLM client from a policy entry {provider, model}.
+    Get an LLM backend for a policy entry {provider, model}.
+    Its SDK clients come from the shared registry, so this is cheap to call.
     
     Args:
         policy_entry: Dict with 'provider' and 'model' keys
         
     Returns:
-        Tuple of (llm_client, model_name)
+        Tuple of (llm_backend, model_name)
     """
-    provider = policy_entry["provider"]
     model = policy_entry["model"]
-    
-    if provider == "ollama":
-        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
-        return OpenAI(
-            api_key="ollama",
-            base_url=base_url
-        ), model
-    elif provider == "openai_compat" or provider == "openai":
-        api_key = os.getenv("OPENAI_API_KEY")
-        base_url = os.getenv("OPENAI_BASE_URL")
-        if base_url:
-            return OpenAI(api_key=api_key, base_url=base_url), model
-        else:
-            return OpenAI(api_key=api_key), model
-    else:
-        raise ValueError(f"Unknown provider: {provider}")
+    return OpenAIChatBackend(model, provider=policy_entry["provider"]), model
+
+# Per-model latency histograms and token totals for every LLM call (see call_llm_with_retries)
+llm_stats = LLMStats()
+
+# Shared per provider/model breakers: a dead provider fails fast instead of burning the retry budget
+llm_breakers = get_breakers()
+
+def breaker_key(backend: LLMBackend) -> Tuple[str, str]:
+    return getattr(backend, "provider", None) or backend.name, backend.model
+
+# Primary latency history and win counters for hedged calls (see hedge_policy)
+llm_hedger = Hedger()
+
+def hedge_policy(role: str) -> Optional[HedgePolicy]:
+    """The role's "hedge" settings from routing_policy.json, if hedging is on and a fallback exists."""
+    if not ROUTING_POLICY or LLM_MODE == "mock":
+        return None
+    entry = ROUTING_POLICY.get(role, {})
+    policy = HedgePolicy.from_dict(entry.get("hedge"))
+    return policy if policy.enabled and "fallback" in entry else None
 
 def should_use_strong_executor(user_text: str, policy: dict) -> bool:
     rules = policy["rules"]["use_strong_executor_if"]
@@ -101,17 +126,10 @@ except FileNotFoundError:
     ROUTING_POLICY = None
 
 # Create two separate LLM clients
-def create_llm_client(provider: str, model: str, base_url: Optional[str] = None):
-    """Create an LLM client based on provider type."""
-    if provider == "ollama":
-        return OpenAI(
-            api_key="ollama",  # Ollama doesn't need real key
-            base_url=base_url or "http://localhost:11434/v1"
-        ), model
-    elif provider == "openai_compat" or provider == "openai":
-        return OpenAI(api_key=os.getenv("OPENAI_API_KEY")), model
-    else:
-        raise ValueError(f"Unknown provider: {provider}")
+def create_llm_client(provider: str, model: str, base_url: Optional[str] = None) -> Tuple[LLMBackend, str]:
+    """Get an LLM backend for a provider type (base_url applies to Ollama only)."""
+    base_url = base_url if provider == "ollama" else None
+    return OpenAIChatBackend(model, provider=provider, base_url=base_url), model
 
 # Initialize planner and executor LLMs
 if LLM_MODE == "mock":
@@ -140,16 +158,78 @@ else:
         executor_llm, executor_model_name = create_llm_client(executor_provider, executor_model)
         print(f"🚀 Running in LIVE mode - Planner: {planner_provider}/{planner_model_name}, Executor: {executor_provider}/{executor_model_name}")
 
-# Legacy client for backwards compatibility
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def __getattr__(name: str):
+    # Legacy module attributes `client` / `async_client`, now served by the registry on first use
+    if name == "client":
+        return llm_clients.get("openai", flavor="sync")
+    if name == "async_client":
+        return llm_clients.get("openai")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -------------------- DB --------------------
-DB_PATH = "assistant.db"
+DB_PATH = os.getenv("ASSISTANT_DB_PATH", "assistant.db")
+TRACES_DIR = os.getenv("TRACES_DIR", "traces")
+
+# Per-thread WAL connections shared by every request (see storage.py)
+store = SQLitePool(DB_PATH)
+# Write-behind: message/memory inserts are batched into one commit every few ms
+writer = GroupCommitWriter(store)
+
+# Tool results, reused per tool policy; write_file/run_command invalidate file reads
+tool_cache = ToolCache(
+    max_entries=int(os.getenv("TOOL_CACHE_ENTRIES", "512")),
+    max_chars=int(os.getenv("TOOL_CACHE_MAX_CHARS", "2000000")),
+)
+
+# Tool execution: I/O and CPU worker pools, per-tool timeouts (see tool_runtime.py)
+tool_runtime = runtime_from_env()
+
+# Hot threads read their recent history from memory instead of SQLite
+history_cache = HistoryCache(
+    max_threads=int(os.getenv("HISTORY_CACHE_THREADS", "1024")),
+    capacity=int(os.getenv("HISTORY_CACHE_MESSAGES", "50")),
+)
+writer.add_error_listener(lambda ops: history_cache.invalidate())  # a dropped write must not linger in the cache
 
 def db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return this thread's pooled connection (close() is a no-op)."""
+    return store.connection()
+
+# -------------------- MIGRATIONS --------------------
+# Applied once each at startup, in order; the version is kept in PRAGMA user_version.
+# Append new entries - never edit or renumber shipped ones.
+def _migrate_memories_project_id(conn):
+    # Older databases predate project-scoped memory
+    if not column_exists(conn, "memories", "project_id"):
+        conn.execute("ALTER TABLE memories ADD COLUMN project_id TEXT")
+
+def _migrate_messages_thread_index(conn):
+    # History reads filter by thread and walk ids; without this they scan every thread's rows
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages(thread_id, id)")
+
+def _migrate_thread_summaries(conn):
+    # Rolling summary of the oldest `summarized` messages of each thread (see build_conversation)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS thread_summaries (
+        thread_id TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        summarized INTEGER NOT NULL,
+        updated_ts INTEGER NOT NULL
+    )
+    """)
+
+def _migrate_memories_rank_index(conn):
+    # Serves the importance/recency fill in retrieve_memories without a sort
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_memories_rank ON memories(project_id, importance DESC, last_used_ts DESC)"
+    )
+
+MIGRATIONS = [
+    (1, "memories.project_id column", _migrate_memories_project_id),
+    (2, "messages (thread_id, id) index", _migrate_messages_thread_index),
+    (3, "thread_summaries table", _migrate_thread_summaries),
+    (4, "memories (project_id, importance, last_used_ts) index", _migrate_memories_rank_index),
+]
 
 def init_db():
     conn = db()
@@ -180,36 +260,197 @@ def init_db():
     cur.execute("""
     CREATE INDEX IF NOT EXISTS idx_memories_importance ON memories(importance)
     """)
-    # Add project_id column if it doesn't exist (non-destructive migration)
-    try:
-        cur.execute("ALTER TABLE memories ADD COLUMN project_id TEXT")
-    except Exception:
-        pass  # Column already exists
+    migrate(store, MIGRATIONS)
     cur.execute("""
     CREATE INDEX IF NOT EXISTS idx_memories_project ON memories(project_id)
     """)
-    conn.commit()
-    conn.close()
+    global MEMORY_FTS
+    MEMORY_FTS = init_memories_fts(cur)
 
-def add_message(thread_id: str, role: str, content: str):
-    conn = db()
-    conn.execute(
+def init_memories_fts(cur) -> bool:
+    """
+    Create the memories_fts FTS5 index (external content = memories) and the
+    triggers that keep it in sync. Returns False if this SQLite build has no FTS5.
+    """
+    exists = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='memories_fts'"
+    ).fetchone()
+    try:
+        cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+            text, content='memories', content_rowid='id', tokenize='porter unicode61'
+        )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  FTS5 unavailable ({e}), memory retrieval falls back to LIKE")
+        return False
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE OF text ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO memories_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """)
+    if not exists:
+        # Index rows written before the FTS table existed
+        cur.execute("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')")
+    return True
+
+def message_op(thread_id: str, role: str, content: str):
+    return (
         "INSERT INTO messages(thread_id, role, content) VALUES (?, ?, ?)",
         (thread_id, role, content),
     )
-    conn.commit()
-    conn.close()
+
+def add_message(thread_id: str, role: str, content: str) -> int:
+    """Queue a message insert on the group-commit writer. Returns its write sequence number."""
+    seq = writer.submit(*message_op(thread_id, role, content))
+    history_cache.append(thread_id, role, content)
+    return seq
+
+def record_turn(
+    thread_id: str,
+    user_message: str,
+    assistant_message: Optional[str],
+    new_memories: List[Dict[str, Any]] = (),
+) -> int:
+    """Queue one /chat turn (user + assistant messages, extracted memories) to commit together."""
+    ops = [message_op(thread_id, "user", user_message)]
+    ops.extend(memory_op(**mem) for mem in new_memories)
+    if assistant_message is not None:
+        ops.append(message_op(thread_id, "assistant", assistant_message))
+    seq = writer.submit_many(ops)
+    history_cache.append(thread_id, "user", user_message)
+    if assistant_message is not None:
+        history_cache.append(thread_id, "assistant", assistant_message)
+    return seq
+
+def load_thread(thread_id: str) -> ThreadState:
+    """
+    Read a thread's tail (up to the cache capacity), message count and summary
+    from SQLite and cache them. Flushes queued writes first (read-your-writes).
+    """
+    token = history_cache.begin_load(thread_id)
+    writer.flush()
+    con = db()
+    rows = con.execute(
+        "SELECT role, content FROM messages WHERE thread_id=? ORDER BY id DESC LIMIT ?",
+        (thread_id, history_cache.capacity),
+    ).fetchall()
+    messages = [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
+    total = len(messages)
+    if total == history_cache.capacity:
+        total = con.execute("SELECT COUNT(*) FROM messages WHERE thread_id=?", (thread_id,)).fetchone()[0]
+    row = con.execute(
+        "SELECT summary, summarized FROM thread_summaries WHERE thread_id=?", (thread_id,)
+    ).fetchone()
+    state = ThreadState(messages, total, row["summary"] if row else "", row["summarized"] if row else 0)
+    history_cache.populate(thread_id, state, token)
+    return state
+
+def get_thread_state(thread_id: str) -> ThreadState:
+    return history_cache.state(thread_id) or load_thread(thread_id)
 
 def get_recent_messages(thread_id: str, limit: int = 20) -> List[Dict[str, str]]:
-    conn = db()
-    rows = conn.execute(
+    """Last `limit` messages of a thread, oldest first (from history_cache when possible)."""
+    cached = history_cache.get(thread_id, limit)
+    if cached is not None:
+        return cached
+    if limit <= history_cache.capacity:
+        messages = load_thread(thread_id).messages
+        return messages[max(0, len(messages) - limit):]
+    writer.flush()
+    rows = db().execute(
         "SELECT role, content FROM messages WHERE thread_id=? ORDER BY id DESC LIMIT ?",
         (thread_id, limit),
     ).fetchall()
-    conn.close()
-    rows = list(reversed(rows))
+    return [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
+
+# -------------------- CONVERSATION WINDOW --------------------
+# Token budget for history sent to the planner/executor; older turns live in the rolling summary
+CONTEXT_BUDGET_TOKENS = int(os.getenv("CONTEXT_BUDGET_TOKENS", "3000"))
+CONTEXT_MAX_MESSAGE_TOKENS = int(os.getenv("CONTEXT_MAX_MESSAGE_TOKENS", "1000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "500"))
+SUMMARY_MAX_CATCHUP = 200  # older messages than this can't survive in the summary anyway
+# Tool results in prompts (prompt_budget.py): executor tool log budget; 0 sends full results
+TOOL_LOG_BUDGET_TOKENS = int(os.getenv("TOOL_LOG_BUDGET_TOKENS", "3000"))
+# Planner turns with several tool calls: worker threads per turn, calls run per step
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+MAX_TOOL_CALLS_PER_STEP = 8
+# Tools with side effects run one at a time, in the planner's order, between the read-only groups
+SIDE_EFFECT_TOOLS = {"write_file", "run_command", "save_memory"}
+
+def summary_op(thread_id: str, summary: str, summarized: int):
+    return (
+        "INSERT INTO thread_summaries(thread_id, summary, summarized, updated_ts) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(thread_id) DO UPDATE SET summary=excluded.summary, "
+        "summarized=excluded.summarized, updated_ts=excluded.updated_ts",
+        (thread_id, summary, summarized, int(time.time())),
+    )
+
+def fetch_thread_messages(thread_id: str, offset: int, limit: int) -> List[Dict[str, str]]:
+    """Messages `offset`..`offset+limit-1` of a thread in chronological order."""
+    writer.flush()
+    rows = db().execute(
+        "SELECT role, content FROM messages WHERE thread_id=? ORDER BY id LIMIT ? OFFSET ?",
+        (thread_id, limit, offset),
+    ).fetchall()
     return [{"role": r["role"], "content": r["content"]} for r in rows]
 
+def build_conversation(thread_id: str, user_message: str) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """
+    Conversation context for a new user message: the rolling summary (as a
+    system message) followed by the newest messages that fit CONTEXT_BUDGET_TOKENS,
+    ending with `user_message`.
+
+    Messages that have just slid out of the window are folded into the summary,
+    which is queued for write and cached, so each turn folds only the new
+    overflow. Returns (messages, context stats for the trace).
+    """
+    state = get_thread_state(thread_id)
+    history = state.messages + [{"role": "user", "content": user_message}]
+    first_pos = state.total - len(state.messages)  # thread position of history[0]
+
+    start, window = select_window(history, CONTEXT_BUDGET_TOKENS, CONTEXT_MAX_MESSAGE_TOKENS)
+    if first_pos + start < state.summarized:
+        # The budget grew back over messages the summary already covers; don't repeat them
+        skip = state.summarized - first_pos - start
+        start, window = start + skip, window[skip:]
+
+    summary, summarized = state.summary, state.summarized
+    window_pos = first_pos + start
+    folded = 0
+    if window_pos > summarized:
+        older = []
+        if summarized < first_pos:
+            catchup_from = max(summarized, first_pos - SUMMARY_MAX_CATCHUP)
+            older = fetch_thread_messages(thread_id, catchup_from, first_pos - catchup_from)
+        to_fold = older + history[max(0, summarized - first_pos):start]
+        summary = fold_summary(summary, to_fold, CONTEXT_SUMMARY_TOKENS)
+        folded, summarized = window_pos - summarized, window_pos
+        writer.submit(*summary_op(thread_id, summary, summarized))
+        history_cache.set_summary(thread_id, summary, summarized)
+
+    messages = [{"role": "system", "content": summary}] if summary else []
+    messages.extend(window)
+    context = {
+        "window_messages": len(window),
+        "window_tokens": sum(message_tokens(m) for m in window),
+        "summary_tokens": estimate_tokens(summary),
+        "summarized_messages": summarized,
+        "folded_messages": folded,
+    }
+    return messages, context
+
 # -------------------- PROJECT-AWARE MEMORY --------------------
 def compute_project_id(workspace_dir: str) -> str:
     import hashlib
@@ -217,50 +458,119 @@ def compute_project_id(workspace_dir: str) -> str:
     p = Path(workspace_dir).resolve().as_posix()
     return hashlib.sha1(p.encode("utf-8")).hexdigest()[:12]
 
-def add_memory(kind: str, text: str, importance: int = 5, project_id: str = None):
-    """Add a new memory with the new schema."""
-    import time
-    conn = db()
+def memory_op(kind: str, text: str, importance: int = 5, project_id: str = None):
     ts = int(time.time())
-    conn.execute(
+    return (
         "INSERT INTO memories(ts, kind, text, importance, last_used_ts, uses, project_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
         (ts, kind.strip(), text.strip(), int(importance), ts, 0, project_id),
     )
-    conn.commit()
-    conn.close()
+
+def add_memory(kind: str, text: str, importance: int = 5, project_id: str = None) -> int:
+    """Queue a new memory insert on the group-commit writer. Returns its write sequence number."""
+    return writer.submit(*memory_op(kind, text, importance, project_id))
+
+MEMORY_FTS = False  # set by init_db() once the FTS5 index is in place
+
+MEMORY_COLUMNS = "id, kind, text, importance, last_used_ts, uses, project_id"
+
+# Terms matching more rows than this carry almost no bm25 signal but make ranking
+# cost proportional to table size, so they are dropped like stopwords.
+MEMORY_FTS_MAX_TERM_DOCS = 2000
+
+QUERY_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "so", "that",
+    "the", "this", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+    "you", "your",
+}
+
+def memory_query_terms(query: str, max_terms: int = 16) -> List[str]:
+    """Split a user message into distinct lowercase search terms (stopwords dropped)."""
+    terms = []
+    for word in re.findall(r"\w+", query.lower()):
+        if len(word) < 2 or word in QUERY_STOPWORDS or word in terms:
+            continue
+        terms.append(word)
+    return terms[:max_terms]
 
 def retrieve_memories(con, query: str, project_id: str = None, limit: int = 8) -> List[sqlite3.Row]:
     """
     Retrieve memories with intelligent ranking:
     - Project memories first (project_id = current)
     - Global memories second (project_id IS NULL)
-    - Then by keyword match, importance, recency
+    - Then by keyword match (FTS5 bm25 over the query terms), importance, recency
     """
-    q = f"%{query.lower()}%"
-    rows = con.execute("""
-        SELECT id, kind, text, importance, last_used_ts, uses, project_id
+    terms = memory_query_terms(query)
+    if not MEMORY_FTS:
+        return _retrieve_memories_like(con, terms, project_id, limit)
+
+    terms = [t for t in terms if 0 < _fts_term_docs(con, t) <= MEMORY_FTS_MAX_TERM_DOCS]
+    hits = []
+    if terms:
+        hits = con.execute("""
+            SELECT m.id, m.kind, m.text, m.importance, m.last_used_ts, m.uses, m.project_id
+            FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid
+            WHERE memories_fts MATCH ? AND (m.project_id = ? OR m.project_id IS NULL)
+            ORDER BY (m.project_id = ?) DESC, bm25(memories_fts)
+            LIMIT ?
+        """, (" OR ".join(f'"{t}"' for t in terms), project_id, project_id, limit)).fetchall()
+
+    # Fill the remaining slots per scope by importance/recency (idx_memories_rank)
+    seen = {r["id"] for r in hits}
+    fill_limit = limit + len(hits)
+    ranked = []
+    for scope_id in ([project_id] if project_id is not None else []) + [None]:
+        ranked.extend(r for r in hits if r["project_id"] == scope_id)
+        where = "project_id = ?" if scope_id is not None else "project_id IS NULL"
+        params = (scope_id, fill_limit) if scope_id is not None else (fill_limit,)
+        rows = con.execute(f"""
+            SELECT {MEMORY_COLUMNS} FROM memories
+            WHERE {where}
+            ORDER BY importance DESC, last_used_ts DESC
+            LIMIT ?
+        """, params).fetchall()
+        ranked.extend(r for r in rows if r["id"] not in seen)
+        if len(ranked) >= limit:
+            break
+    return ranked[:limit]
+
+def _fts_term_docs(con, term: str) -> int:
+    """Number of indexed memories matching term, counted up to MEMORY_FTS_MAX_TERM_DOCS + 1."""
+    return con.execute(
+        "SELECT count(*) FROM (SELECT rowid FROM memories_fts WHERE memories_fts MATCH ? LIMIT ?)",
+        (f'"{term}"', MEMORY_FTS_MAX_TERM_DOCS + 1),
+    ).fetchone()[0]
+
+def _retrieve_memories_like(con, terms: List[str], project_id: str, limit: int) -> List[sqlite3.Row]:
+    """Fallback ranking without FTS5: count of query terms found via LIKE."""
+    patterns = [f"%{t}%" for t in terms]
+    match_score = " + ".join(["(CASE WHEN lower(text) LIKE ? THEN 1 ELSE 0 END)"] * len(patterns)) or "0"
+    return con.execute(f"""
+        SELECT {MEMORY_COLUMNS}
         FROM memories
         WHERE (project_id = ? OR project_id IS NULL)
         ORDER BY
           (project_id = ?) DESC,
-          (CASE WHEN lower(text) LIKE ? THEN 1 ELSE 0 END) DESC,
+          ({match_score}) DESC,
           importance DESC,
           last_used_ts DESC
         LIMIT ?
-    """, (project_id, project_id, q, limit)).fetchall()
-    return rows
+    """, (project_id, project_id, *patterns, limit)).fetchall()
+
+def load_memories(query: str, project_id: str = None, limit: int = 8) -> List[sqlite3.Row]:
+    """Run retrieve_memories on this thread's pooled connection (for use off the event loop)."""
+    return retrieve_memories(db(), query, project_id=project_id, limit=limit)
+
+# Retrieval hits are counted in memory and written back in one executemany
+memory_usage = UsageAggregator(
+    writer,
+    "UPDATE memories SET uses = uses + ?, last_used_ts = MAX(last_used_ts, ?) WHERE id = ?",
+    flush_interval=float(os.getenv("MEMORY_USAGE_FLUSH_SEC", "2.0")),
+)
 
 def mark_memory_used(memory_id: int):
-    """Increment uses counter and update last_used_ts when a memory is retrieved."""
-    import time
-    conn = db()
-    ts = int(time.time())
-    conn.execute(
-        "UPDATE memories SET uses = uses + 1, last_used_ts = ? WHERE id = ?",
-        (ts, memory_id)
-    )
-    conn.commit()
-    conn.close()
+    """Increment uses counter and update last_used_ts when a memory is retrieved (batched)."""
+    memory_usage.record([memory_id])
 
 def format_memories(memories):
     """Format memories for display to the model."""
@@ -272,7 +582,7 @@ def format_memories(memories):
         lines.append(f"- ({kind}, {importance}) {text}")
     return "\n".join(lines)
 
-def should_save_memory(user_message: str) -> Optional[Dict[str, Any]]:
+async def should_save_memory(user_message: str) -> Optional[Dict[str, Any]]:
     """
     Uses GPT to decide if the user message contains info worth remembering.
     Returns dict with key/value/importance or None.
@@ -291,12 +601,14 @@ def should_save_memory(user_message: str) -> Optional[Dict[str, Any]]:
         f'User message: "{user_message}"\n\n'
         "Output (JSON or NO):"
     )
-    response = client.chat.completions.create(
+    text = (await call_llm_with_retries(
+        [{"role": "user", "content": prompt}],
+        llm_client=None,
         model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
         temperature=0.0,
-    )
-    text = response.choices[0].message.content.strip()
+        max_retries=0,
+        role="memory",
+    )).strip()
     if text.upper() == "NO":
         return None
     try:
@@ -352,38 +664,45 @@ def extract_first_json_object(text: str) -> Optional[dict]:
 
 
 TOOL_CALL_RE = re.compile(r"\{.*\}", re.DOTALL)
+TOOL_LIST_RE = re.compile(r"\[.*\]", re.DOTALL)
 
 def parse_tool_call(text: str) -> Optional[Dict[str, Any]]:
     """
-    Extracts the first JSON object from a response and validates it as a tool call.
+    Extracts the first tool call from a response (see parse_tool_calls).
     Returns None if response is not a valid tool call.
     """
-    if not text:
-        return None
+    calls = parse_tool_calls(text)
+    return calls[0] if calls else None
 
-    # If model returns pure JSON, use it; otherwise extract first {...} block
-    candidate = text.strip()
-    if not (candidate.startswith("{") and candidate.endswith("}")):
-        m = TOOL_CALL_RE.search(text)
-        if not m:
-            return None
-        candidate = m.group(0)
 
-    try:
-        obj = json.loads(candidate)
-    except Exception:
-        return None
+def _valid_call(obj: Any) -> bool:
+    return isinstance(obj, dict) and isinstance(obj.get("tool"), str) and isinstance(obj.get("args"), dict)
 
-    if not isinstance(obj, dict):
-        return None
-    if "tool" not in obj or "args" not in obj:
-        return None
-    if not isinstance(obj["tool"], str):
-        return None
-    if not isinstance(obj["args"], dict):
+
+def parse_tool_calls(text: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Tool calls in a planner response: a single {"tool", "args"} object, or
+    several independent calls as {"tools": [{"tool", "args"}, ...]} (a bare
+    JSON list of calls is accepted too). Invalid entries are dropped; returns
+    None if no valid call remains.
+    """
+    if not text:
         return None
+    obj = None
+    # Pure JSON, else the outermost {...} or [...] block
+    for candidate in (text.strip(), *(m.group(0) for m in (TOOL_CALL_RE.search(text), TOOL_LIST_RE.search(text)) if m)):
+        try:
+            obj = json.loads(candidate)
+            break
+        except Exception:
+            continue
 
-    return obj
+    if isinstance(obj, dict) and isinstance(obj.get("tools"), list):
+        obj = obj["tools"]
+    if isinstance(obj, list):
+        calls = [{"tool": c["tool"], "args": c["args"]} for c in obj if _valid_call(c)]
+        return calls or None
+    return [obj] if _valid_call(obj) else None
 
 
 def try_parse_json(text: str):
@@ -401,75 +720,267 @@ def trace(event: dict):
         f.write(json.dumps(event, ensure_ascii=False) + "\n")
 
 
-def call_llm_with_retries(
+async def call_llm_with_retries(
     messages: List[dict],
     *,
     llm_client = None,
     model: str = "gpt-4o-mini",
     max_retries: int = 5,
     max_total_time: float = 50.0,
+    temperature: Optional[float] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    role: str = "other",
+    fallback: bool = False,
+    on_call: Optional[Callable[[LLMCall], None]] = None,
 ) -> str:
     """
     Retries the LLM call on transient failures (rate limits/timeouts).
     Caps total retry time to avoid HTTP timeout.
     Raises the exception if all retries fail.
+
+    `llm_client` is any LLMBackend (or a client as_backend() can adapt);
+    default: OpenAI chat via the shared client registry. `temperature` None
+    uses the backend default. With LLM_RESPONSE_CACHE=1, temperature-0 calls
+    are answered from the response cache when the same request was seen before.
+
+    If on_token is given the completion is streamed and each chunk is passed
+    to it as it arrives; the full text is still returned. A stream that fails
+    after its first chunk is not retried (the chunks were already delivered).
+
+    Runs on the event loop: backends await their async clients (sync-only ones
+    run on a worker thread), and backoff uses asyncio.sleep so a retrying
+    request never holds a thread.
+
+    Every attempt goes through the provider/model circuit breaker: while it
+    is open this raises CircuitOpen at once, so callers can move on to a
+    fallback without waiting out the retries.
+
+    Each call (retries included) is recorded as an LLMCall: `role` and
+    `fallback` label it, llm_stats aggregates it per model and `on_call`
+    receives it (run_agent_loop attaches these to the trace and RunOutcome).
     """
-    if llm_client is None:
-        llm_client = client
-    
-    # Handle MockLLM (no retry needed, deterministic)
-    if hasattr(llm_client, 'mode'):  # MockLLM has mode attribute
-        from mock_llm import Msg
-        mock_messages = [Msg(role=m["role"], content=m["content"]) for m in messages]
-        return llm_client.chat(mock_messages)
+    backend = as_backend(llm_client, model) if llm_client is not None else OpenAIChatBackend(model)
+    breaker = llm_breakers.get(breaker_key(backend)[0], model)
+    backend_name = backend.name
+    backend = with_response_cache(backend)
     
     last_err: Optional[Exception] = None
     start_time = time.time()
+    t0 = time.perf_counter()
+    attempts = 0
+    status = "error"
+    result: Optional[LLMResult] = None
     
-    for attempt in range(max_retries + 1):
-        try:
-            response = llm_client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=0.3,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            last_err = e
-            if attempt < max_retries:
-                # Check if we have time for another retry
-                elapsed = time.time() - start_time
-                base_delay = 2.0
-                delay = min(15, base_delay * (2 ** attempt))
-                
-                if elapsed + delay > max_total_time:
-                    print(f"Retry budget exhausted ({elapsed:.1f}s elapsed, {max_total_time}s limit)")
-                    break
-                
-                print(f"Retry {attempt + 1}/{max_retries} after {delay:.1f}s...")
-                time.sleep(delay)
-    
-    raise last_err
+    try:
+        for attempt in range(max_retries + 1):
+            delivered = []
+            def forward(chunk: str):
+                delivered.append(chunk)
+                on_token(chunk)
+            try:
+                breaker.acquire()
+            except CircuitOpen:
+                status = "circuit_open"
+                raise
+            attempts += 1
+            try:
+                result = await backend.agenerate(
+                    messages,
+                    model=model,
+                    temperature=temperature,
+                    on_token=forward if on_token is not None else None,
+                )
+            except asyncio.CancelledError:
+                breaker.release()
+                status = "cancelled"
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                last_err = e
+                if delivered:
+                    raise
+                if attempt < max_retries:
+                    # Check if we have time for another retry
+                    elapsed = time.time() - start_time
+                    base_delay = 2.0
+                    delay = min(15, base_delay * (2 ** attempt))
+                    
+                    if elapsed + delay > max_total_time:
+                        print(f"Retry budget exhausted ({elapsed:.1f}s elapsed, {max_total_time}s limit)")
+                        break
+                    
+                    print(f"Retry {attempt + 1}/{max_retries} after {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+            else:
+                if result.cached:
+                    breaker.release()  # says nothing about the provider's health
+                else:
+                    breaker.record_success()
+                status = "ok"
+                return result.text
+        
+        raise last_err
+    except asyncio.CancelledError:
+        status = "cancelled"  # e.g. a hedged call that lost, or the client went away
+        raise
+    finally:
+        ok = status == "ok"
+        prompt_tokens, completion_tokens, estimated = call_tokens(
+            messages, result.text if ok else "", result.usage if ok else None
+        )
+        call = LLMCall(
+            role=role,
+            model=model,
+            backend=backend_name,
+            status=status,
+            latency_ms=(time.perf_counter() - t0) * 1000,
+            attempts=attempts,
+            fallback=fallback,
+            cached=ok and result.cached,
+            ttft_ms=result.ttft_ms if ok else None,
+            prompt_tokens=prompt_tokens if attempts else 0,
+            completion_tokens=completion_tokens,
+            tokens_estimated=estimated and attempts > 0,
+        )
+        llm_stats.record(call)
+        if on_call:
+            on_call(call)
+
 
+async def call_llm_hedged(
+    role: str,
+    policy: HedgePolicy,
+    messages: List[dict],
+    *,
+    llm_client: Any,
+    model: str,
+    temperature: Optional[float] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    emit: Optional[Callable[[dict], None]] = None,
+    run_id: Optional[str] = None,
+    on_call: Optional[Callable[[LLMCall], None]] = None,
+) -> str:
+    """
+    call_llm_with_retries against the role's primary, hedged with its policy
+    fallback (see agent/llm/hedging.py). Emits an "llm_hedge" trace event
+    either way; raises HedgeFailed if neither model answered.
+    """
+    fallback = ROUTING_POLICY[role]["fallback"]
+    fallback_llm, fallback_model = create_llm_from_policy(fallback)
+
+    def attempt(llm: Any, attempt_model: str, is_fallback: bool):
+        return lambda tokens: call_llm_with_retries(
+            messages, llm_client=llm, model=attempt_model, temperature=temperature, on_token=tokens,
+            role=role, fallback=is_fallback, on_call=on_call
+        )
+
+    result = None
+    try:
+        result = await llm_hedger.run(
+            model, policy, attempt(llm_client, model, False), attempt(fallback_llm, fallback_model, True),
+            on_token=on_token
+        )
+        return result.text
+    except HedgeFailed as e:
+        result = e.result
+        raise
+    finally:
+        if emit and result is not None:
+            emit({
+                "type": "llm_hedge",
+                "ts": int(time.time()),
+                "run_id": run_id,
+                "role": role,
+                "primary_model": model,
+                "fallback_provider": fallback["provider"],
+                "fallback_model": fallback_model,
+                **result.trace(),
+            })
+
+
+def executor_response_event(
+    run_id: str,
+    text: str,
+    chunks: List[str],
+    timing: Dict[str, Optional[float]],
+    streamed: bool,
+) -> dict:
+    """The executor_response trace event; for a streamed reply, with chunk count and time to first chunk."""
+    event = {
+        "type": "executor_response",
+        "ts": int(time.time()),
+        "run_id": run_id,
+        "text": text[:4000],
+        "streamed": streamed,
+        "latency_ms": round((time.perf_counter() - timing["start"]) * 1000, 1),
+    }
+    if streamed:
+        event["chunks"] = len(chunks)
+        event["ttft_ms"] = round(timing["ttft_ms"], 1) if timing["ttft_ms"] is not None else None
+    return event
+
+
+TOOL_KEYWORDS = ["file", "read", "write", "search", "run", "command", "calculate", "time", "date", "folder", "directory"]
+MEMORY_TRIGGERS = ["remember", "save this", "from now on", "always", "store this"]
+# Tool hints needs_tools() doesn't cover; a planner bypass must not skip these.
+# Matched at the start of a word ("rain" catches "raining"), so erring on the side
+# of a planner call: a wrong bypass answers without the tool, a wrong block costs one call
+BYPASS_BLOCKERS = [
+    # time and date
+    "today", "tonight", "tomorrow", "yesterday", "what day", "which day", "clock", "hour",
+    # weather
+    "weather", "rain", "snow", "temperature", "forecast", "sunny", "humid", "wind", "degrees",
+    "celsius", "fahrenheit",
+    # lookups
+    "look up", "lookup", "google", "news", "latest", "price", "stock", "score", "find",
+    # files and commands
+    "open", "list", "show me", "execute",
+    # math phrasing
+    "percent", "multiply", "divide", "sum of", "average", "how much", "how many", "convert",
+    "http://", "https://", "www.",
+]
+BYPASS_BLOCKER_RE = re.compile(r"(?<![\w])(" + "|".join(re.escape(k) for k in BYPASS_BLOCKERS) + ")")
+FILE_TOKEN = re.compile(r"\b[\w-]+\.[a-z0-9]{1,4}\b")
+MATH_EXPRESSION = re.compile(r"\d\s*[-+*/x×^%]\s*\d|\d\s*%")
+
+PLANNER_BYPASS = os.getenv("PLANNER_BYPASS", "1").lower() in ("1", "true", "yes")
+PLANNER_BYPASS_MAX_CHARS = int(os.getenv("PLANNER_BYPASS_MAX_CHARS", "500"))
 
 def needs_tools(user_text: str) -> bool:
     """Check if user input likely requires tool usage."""
-    keywords = ["file", "read", "write", "search", "run", "command", "calculate", "time", "date", "folder", "directory"]
     t = user_text.lower()
-    return any(k in t for k in keywords)
-
+    return any(k in t for k in TOOL_KEYWORDS)
 
-tool_cache = {}  # key: (tool_name, json.dumps(args, sort_keys=True))
+def route_request(user_text: str) -> Dict[str, Any]:
+    """
+    Decide whether a request can skip the planner and go straight to the
+    executor. Returns {"bypass_planner": bool, "reason": str}; the reason
+    names the rule that decided, so misroutes can be audited from traces.
+    """
+    t = user_text.lower()
+    if not PLANNER_BYPASS:
+        return {"bypass_planner": False, "reason": "bypass_disabled"}
+    for keyword in TOOL_KEYWORDS:
+        if keyword in t:
+            return {"bypass_planner": False, "reason": f"tool_keyword:{keyword}"}
+    blocker = BYPASS_BLOCKER_RE.search(t)
+    if blocker:
+        return {"bypass_planner": False, "reason": f"tool_keyword:{blocker.group(1)}"}
+    if FILE_TOKEN.search(t):
+        return {"bypass_planner": False, "reason": "file_name"}
+    for trigger in MEMORY_TRIGGERS:
+        if trigger in t:
+            return {"bypass_planner": False, "reason": f"memory_trigger:{trigger}"}
+    if MATH_EXPRESSION.search(t):
+        return {"bypass_planner": False, "reason": "math_expression"}
+    if len(user_text) > PLANNER_BYPASS_MAX_CHARS:
+        return {"bypass_planner": False, "reason": "long_request"}
+    return {"bypass_planner": True, "reason": "no_tool_signals"}
 
 
 def run_tool(tool_name: str, args: dict) -> str:
-    """Execute tool with caching to avoid redundant calls."""
-    key = (tool_name, json.dumps(args, sort_keys=True))
-    if key in tool_cache:
-        return tool_cache[key]
-    result = TOOLS[tool_name](**args)
-    tool_cache[key] = result
-    return result
+    """Execute a tool, reusing a cached result where its policy allows (see tool_cache.py)."""
+    return tool_cache.call(tool_name, args, TOOLS[tool_name])
 
 
 def synthesize_fallback(tool_logs: list) -> str:
@@ -484,7 +995,17 @@ def synthesize_fallback(tool_logs: list) -> str:
     return "\n".join(lines)
 
 
-def run_agent_loop(
+def save_run_trace(start_ts: int, run_id: str, events: List[dict]) -> None:
+    """Write the run trace to <TRACES_DIR>/<start_ts>_<run_id>.json (blocking file I/O)."""
+    from pathlib import Path
+    Path(TRACES_DIR).mkdir(parents=True, exist_ok=True)
+    Path(TRACES_DIR, f"{start_ts}_{run_id}.json").write_text(
+        json.dumps(events, indent=2),
+        encoding="utf-8"
+    )
+
+
+async def run_agent_loop(
     tools: Dict[str, Callable],
     messages: List[dict],
     *,
@@ -494,18 +1015,34 @@ def run_agent_loop(
     memory_block: str = "",
     project_id: str = "default",
     memory_trace: List[dict] = None,
+    context_trace: Optional[dict] = None,
+    on_event: Optional[Callable[[dict], None]] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    route: Optional[Dict[str, Any]] = None,
 ) -> RunOutcome:
     """
     Agent loop with planner/executor split.
     
     Args:
         tools: Dict mapping tool names to callable functions
-        messages: List of message dicts with 'role' and 'content' (includes user request)
+        messages: List of message dicts with 'role' and 'content': system prompt,
+            prior conversation (see build_conversation), then the user request last
         max_steps: Maximum number of tool call iterations
         max_seconds: Maximum execution time in seconds
         enable_trace: Whether to log events to agent.log
         memory_block: Formatted memory text to inject into planner context
         project_id: Project identifier for scoped memory
+        context_trace: Conversation window stats recorded on run_start
+        on_event: Called with each trace event as it happens, plus live-only
+            "executor_token" events while the executor streams (used by /chat/stream)
+        on_token: Called with each executor text chunk as it arrives
+        route: route_request() decision; with bypass_planner the executor
+            answers directly (with the memory block) and no planner call is made
+    
+    The executor streams whenever on_event or on_token is given; the
+    executor_response trace event is assembled from the chunks afterwards.
+    Cancelling the run (client disconnect) stops the executor stream and
+    saves the trace with the partial response.
         
     Returns:
         RunOutcome with explicit status, final_text, tool_calls, and optional error
@@ -514,18 +1051,38 @@ def run_agent_loop(
     
     run_id = str(uuid.uuid4())
     start_ts = int(time.time())
-    trace = [{
+    trace = []
+
+    def emit(event: dict):
+        """Record a trace event and forward it to the live listener, if any."""
+        trace.append(event)
+        if on_event:
+            on_event(event)
+
+    llm_calls: List[Dict] = []
+
+    def record_call(call: LLMCall):
+        """on_call hook: keep the call for RunOutcome and trace it as an llm_call event."""
+        entry = call.to_dict()
+        llm_calls.append(entry)
+        emit({"type": "llm_call", "ts": int(time.time()), "run_id": run_id, **entry})
+
+    emit({
         "type": "run_start",
         "ts": start_ts,
         "run_id": run_id,
         "project_id": project_id,
-        "memories": memory_trace or []
-    }]
+        "memories": memory_trace or [],
+        "context": context_trace or {}
+    })
     
     start_time = time.time()
+    deadline = time.monotonic() + max_seconds  # tools never run past the run's budget
     
-    # Extract user text from messages
-    user_text = next((m["content"] for m in messages if m["role"] == "user"), "")
+    # The request is the last user message; everything between the system prompt and it is context
+    last_user = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=len(messages))
+    user_text = messages[last_user]["content"] if last_user < len(messages) else ""
+    conversation = messages[1 if messages and messages[0]["role"] == "system" else 0:last_user]
     
     # Select executor based on complexity (policy-driven)
     active_executor_llm = executor_llm
@@ -536,7 +1093,7 @@ def run_agent_loop(
         if should_use_strong_executor(user_text, ROUTING_POLICY):
             # Use a stronger model if configured (for now, just log it)
             # Future: Could have a "strong_executor" field in policy
-            trace.append({
+            emit({
                 "type": "routing_decision",
                 "ts": int(time.time()),
                 "run_id": run_id,
@@ -544,36 +1101,137 @@ def run_agent_loop(
                 "using_strong_executor": True
             })
     
+    planner_hedge = hedge_policy("planner")
+    executor_hedge = hedge_policy("executor")
+    bypass_planner = bool(route and route.get("bypass_planner"))
+    
+    if route:
+        emit({
+            "type": "request_route",
+            "ts": int(time.time()),
+            "run_id": run_id,
+            "bypass_planner": bypass_planner,
+            "reason": route.get("reason"),
+        })
+    
     # Log planner routing decision
-    trace.append({
-        "type": "planner_routing",
-        "ts": int(time.time()),
-        "run_id": run_id,
-        "provider": ROUTING_POLICY["planner"]["primary"]["provider"] if ROUTING_POLICY and LLM_MODE != "mock" else "mock",
-        "model": planner_model_name,
-        "has_fallback": bool(ROUTING_POLICY and "fallback" in ROUTING_POLICY.get("planner", {}))
-    })
+    if not bypass_planner:
+        emit({
+            "type": "planner_routing",
+            "ts": int(time.time()),
+            "run_id": run_id,
+            "provider": ROUTING_POLICY["planner"]["primary"]["provider"] if ROUTING_POLICY and LLM_MODE != "mock" else "mock",
+            "model": planner_model_name,
+            "has_fallback": bool(ROUTING_POLICY and "fallback" in ROUTING_POLICY.get("planner", {})),
+            "hedge": planner_hedge is not None,
+            "breaker": llm_breakers.state(breaker_key(planner_llm)[0], planner_model_name),
+            "fallback_breaker": llm_breakers.state(
+                ROUTING_POLICY["planner"]["fallback"]["provider"], ROUTING_POLICY["planner"]["fallback"]["model"]
+            ) if ROUTING_POLICY and LLM_MODE != "mock" and "fallback" in ROUTING_POLICY["planner"] else None
+        })
     
     # Planner loop state
     planner_history = []
     tool_logs = []
     final_instruction = None
+    executor_chunks: List[str] = []
+    executor_timing: Dict[str, Optional[float]] = {"start": None, "ttft_ms": None}
+    tool_slots = asyncio.Semaphore(TOOL_CONCURRENCY)
+    
+    async def run_tool_call(tool_name: str, args: dict) -> Tuple[Optional[str], str, Dict[str, Any]]:
+        """
+        One planner tool call -> (status, result, timing). status None means
+        nothing ran and `result` is feedback for the planner only; "timeout"
+        means the tool missed its deadline (tool_runtime.py). Other tool
+        exceptions surface as ToolExecutionError.
+        """
+        # More of a clipped tool result (prompt_budget refs); not a real tool
+        if tool_name == DETAIL_TOOL:
+            return None, tool_detail(tool_logs, str(args.get("ref", "")), args.get("offset", 0)), {}
+        
+        # Check if tool exists
+        if tool_name not in tools:
+            return None, f"Tool '{tool_name}' is not available. Continue without tools.", {}
+        
+        # Gate save_memory tool - only allow if user requested it
+        if tool_name == "save_memory":
+            user_lower = user_text.lower()
+            if not any(keyword in user_lower for keyword in MEMORY_TRIGGERS):
+                return None, "User did not request saving memory.", {}
+            # If allowed, actually save the memory
+            try:
+                kind = args.get("kind", "fact")
+                text = args.get("text", "")
+                importance = args.get("importance", 5)
+                scope = args.get("scope", "global")
+                # If scope="project", save with project_id; otherwise NULL (global)
+                mem_project_id = project_id if scope == "project" else None
+                add_memory(kind, text, importance, mem_project_id)
+                return "ok", f"Memory saved: [{kind}] {text} (scope: {scope})", {}
+            except Exception as e:
+                return "error", f"Error saving memory: {str(e)}", {}
+        
+        # Execute normal tool on its runtime pool, at most TOOL_CONCURRENCY at a time,
+        # within its own timeout and what is left of max_seconds
+        fn = TOOLS[tool_name]
+        if not inspect.iscoroutinefunction(fn):
+            fn = lambda **kwargs: run_tool(tool_name, kwargs)  # through tool_cache
+        waited = time.perf_counter()
+        async with tool_slots:
+            slot_ms = (time.perf_counter() - waited) * 1000
+            try:
+                run = await tool_runtime.run(tool_name, fn, args, deadline=deadline)
+            except ToolTimeout as e:
+                return "timeout", f"Tool error: {e}. Continue without this result.", {
+                    "queue_ms": None if e.started else round(slot_ms + e.timeout_sec * 1000, 1),
+                    "exec_ms": None,
+                    "timeout_sec": round(e.timeout_sec, 2),
+                }
+            except Exception as e:
+                raise ToolExecutionError(f"{type(e).__name__}: {e}") from e
+        return "ok", run.result, {
+            "queue_ms": round(slot_ms + run.queue_ms, 1),
+            "exec_ms": round(run.exec_ms, 1),
+            "timeout_sec": round(run.timeout_sec, 2),
+        }
+    
+    async def run_tool_batch(calls: List[dict]) -> List[Tuple[Optional[str], str, Dict[str, Any]]]:
+        """
+        Outcomes of one planner turn, in call order. Consecutive read-only calls
+        run concurrently; a side-effecting call waits for everything before it
+        and finishes before anything after it starts, so [write a, read a]
+        reads what was written. The first tool failure is raised.
+        """
+        outcomes: List[Any] = []
+        group: List[dict] = []
+        for call in [*calls, None]:
+            if call is not None and call["tool"] not in SIDE_EFFECT_TOOLS:
+                group.append(call)
+                continue
+            if group:
+                outcomes += await asyncio.gather(
+                    *(run_tool_call(c["tool"], c["args"]) for c in group),
+                    return_exceptions=True
+                )
+                group = []
+                failed = next((o for o in outcomes if isinstance(o, BaseException)), None)
+                if failed is not None:
+                    raise failed
+            if call is not None:
+                outcomes.append(await run_tool_call(call["tool"], call["args"]))
+        return outcomes
     
     try:
-        for step in range(1, max_steps + 1):
+        for step in range(1, (0 if bypass_planner else max_steps) + 1):
             # Check timeout
             if time.time() - start_time > max_seconds:
-                from pathlib import Path
-                Path("traces").mkdir(exist_ok=True)
-                Path(f"traces/{start_ts}_{run_id}.json").write_text(
-                    json.dumps(trace, indent=2),
-                    encoding="utf-8"
-                )
+                await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
                 return RunOutcome(
                     status="error",
                     final_text="I couldn't complete that request. Please try again.",
                     tool_logs=tool_logs,
-                    reason="timeout"
+                    reason="timeout",
+                    llm_calls=llm_calls
                 )
             
             if enable_trace:
@@ -581,7 +1239,7 @@ def run_agent_loop(
             
             # Build fresh planner messages
             tool_logs_text = "\n".join([
-            f"- {log['name']}: {log['result'][:200]}" for log in tool_logs
+            f"- [{log['ref']}] {log['name']}: {log['result'][:200]}" for log in tool_logs
             ]) if tool_logs else "None yet"
             
             user_message_with_logs = f"{user_text}\n\nTool logs so far:\n{tool_logs_text}"
@@ -592,38 +1250,60 @@ def run_agent_loop(
             if memory_block:
                 planner_messages.append({"role": "system", "content": memory_block})
             planner_messages.extend([
+            *conversation,
             *planner_history,
             {"role": "user", "content": user_message_with_logs}
             ])
             
-            # Call planner LLM (with fallback support)
+            # Call planner LLM (hedged, or with fallback after the primary gives up)
             planner_error = None
             try:
-                raw = call_llm_with_retries(
-                    planner_messages,
-                    llm_client=planner_llm,
-                    model=planner_model_name
-                )
+                if planner_hedge:
+                    raw = await call_llm_hedged(
+                        "planner",
+                        planner_hedge,
+                        planner_messages,
+                        llm_client=planner_llm,
+                        model=planner_model_name,
+                        temperature=PLANNER_TEMPERATURE,
+                        emit=emit,
+                        run_id=run_id,
+                        on_call=record_call
+                    )
+                else:
+                    raw = await call_llm_with_retries(
+                        planner_messages,
+                        llm_client=planner_llm,
+                        model=planner_model_name,
+                        temperature=PLANNER_TEMPERATURE,
+                        role="planner",
+                        on_call=record_call
+                    )
             except Exception as e:
                 planner_error = e
-                # Try fallback planner if available
-                if ROUTING_POLICY and LLM_MODE != "mock" and "fallback" in ROUTING_POLICY["planner"]:
-                    trace.append({
+                # Try fallback planner if available (a failed hedge already tried it)
+                if not planner_hedge and ROUTING_POLICY and LLM_MODE != "mock" and "fallback" in ROUTING_POLICY["planner"]:
+                    emit({
                         "type": "planner_fallback",
                         "ts": int(time.time()),
                         "run_id": run_id,
                         "primary_error": str(e)[:200],
+                        "circuit_open": isinstance(e, CircuitOpen),
                         "trying_fallback": True
                     })
                     try:
                         fallback_llm, fallback_model = create_llm_from_policy(ROUTING_POLICY["planner"]["fallback"])
-                        raw = call_llm_with_retries(
+                        raw = await call_llm_with_retries(
                             planner_messages,
                             llm_client=fallback_llm,
-                            model=fallback_model
+                            model=fallback_model,
+                            temperature=PLANNER_TEMPERATURE,
+                            role="planner",
+                            fallback=True,
+                            on_call=record_call
                         )
                         planner_error = None  # Fallback succeeded
-                        trace.append({
+                        emit({
                             "type": "planner_fallback_success",
                             "ts": int(time.time()),
                             "run_id": run_id,
@@ -635,20 +1315,16 @@ def run_agent_loop(
                 
                 # If still failed, return error
                 if planner_error:
-                    from pathlib import Path
-                    Path("traces").mkdir(exist_ok=True)
-                    Path(f"traces/{start_ts}_{run_id}.json").write_text(
-                        json.dumps(trace, indent=2),
-                        encoding="utf-8"
-                    )
+                    await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
                     return RunOutcome(
                         status="error",
                         final_text="I couldn't complete that request. Please try again.",
                         tool_logs=tool_logs,
-                        reason="planner_failure"
+                        reason="planner_failure",
+                        llm_calls=llm_calls
                     )
 
-            trace.append({
+            emit({
             "type": "planner_raw",
             "ts": int(time.time()),
             "run_id": run_id,
@@ -656,85 +1332,78 @@ def run_agent_loop(
             })
 
             if not raw or not raw.strip():
-                from pathlib import Path
-                Path("traces").mkdir(exist_ok=True)
-                Path(f"traces/{start_ts}_{run_id}.json").write_text(
-                json.dumps(trace, indent=2),
-                encoding="utf-8"
-                )
+                await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
                 raise PlannerError("Planner returned empty output")
 
-            # Try to parse as tool call
-            obj = parse_tool_call(raw)
+            # Try to parse as tool call(s): one call, or several independent ones to run concurrently
+            calls = parse_tool_calls(raw)
             
-            if obj and "tool" in obj:
-                tool_name = obj["tool"]
-                args = obj["args"]
+            if calls:
+                skipped = calls[MAX_TOOL_CALLS_PER_STEP:]
+                calls = calls[:MAX_TOOL_CALLS_PER_STEP]
                 
                 if enable_trace:
-                    trace({"event": "tool_call", "step": step, "tool": tool_name, "args": args})
-                
-                # Check if tool exists
-                if tool_name not in tools:
-                    planner_history.append({"role": "assistant", "content": raw})
-                    planner_history.append({"role": "user", "content": f"Tool '{tool_name}' is not available. Continue without tools."})
-                    continue
+                    trace({"event": "tool_call", "step": step, "calls": calls})
                 
-                # Gate save_memory tool - only allow if user requested it
-                if tool_name == "save_memory":
-                    allowed_keywords = ["remember", "save this", "from now on", "always", "store this"]
-                    user_lower = user_text.lower()
-                    if not any(keyword in user_lower for keyword in allowed_keywords):
-                        result = "User did not request saving memory."
-                        status = "rejected"
-                        planner_history.append({"role": "assistant", "content": raw})
-                        planner_history.append({"role": "user", "content": result})
-                        continue
-                    # If allowed, actually save the memory
-                    try:
-                        kind = args.get("kind", "fact")
-                        text = args.get("text", "")
-                        importance = args.get("importance", 5)
-                        scope = args.get("scope", "global")
-                        # If scope="project", save with project_id; otherwise NULL (global)
-                        mem_project_id = project_id if scope == "project" else None
-                        add_memory(kind, text, importance, mem_project_id)
-                        result = f"Memory saved: [{kind}] {text} (scope: {scope})"
-                        status = "ok"
-                    except Exception as e:
-                        result = f"Error saving memory: {str(e)}"
-                        status = "error"
-                else:
-                    # Execute normal tool
-                    try:
-                        result = run_tool(tool_name, args)
-                        status = "ok"
-                    except Exception as e:
-                        raise ToolExecutionError(f"{type(e).__name__}: {e}") from e
+                batch_start = time.perf_counter()
+                outcomes = await run_tool_batch(calls)
                 
-                tool_logs.append({
-                    "name": tool_name,
-                    "arguments": args,
-                    "result": result,
-                    "status": status
-                })
+                if len(calls) > 1:
+                    emit({
+                        "type": "tool_batch",
+                        "ts": int(time.time()),
+                        "run_id": run_id,
+                        "calls": len(calls),
+                        "skipped": len(skipped),
+                        "concurrency": TOOL_CONCURRENCY,
+                        "sequential": sum(call["tool"] in SIDE_EFFECT_TOOLS for call in calls),
+                        "wall_ms": round((time.perf_counter() - batch_start) * 1000, 1),
+                    })
                 
-                trace.append({
-                    "type": "tool_result",
-                    "ts": int(time.time()),
-                    "run_id": run_id,
-                    "tool": tool_name,
-                    "args": args,
-                    "status": status,
-                    "result": str(result)[:8000],
-                })
+                # Logged in call order, so refs follow the planner's list
+                feedback = []
+                for call, (status, result, timing) in zip(calls, outcomes):
+                    tool_name, args = call["tool"], call["args"]
+                    if status is None:  # not run (pseudo-tool, unknown tool, gated)
+                        feedback.append(result)
+                        continue
+                    
+                    ref = ref_for(len(tool_logs))
+                    tool_logs.append({
+                        "ref": ref,
+                        "name": tool_name,
+                        "arguments": args,
+                        "result": result,
+                        "status": status
+                    })
+                    
+                    emit({
+                        "type": "tool_result",
+                        "ts": int(time.time()),
+                        "run_id": run_id,
+                        "ref": ref,
+                        "tool": tool_name,
+                        "args": args,
+                        "status": status,
+                        "result": str(result)[:8000],
+                        **timing,
+                    })
+                    
+                    if enable_trace:
+                        trace({"event": "tool_result", "step": step, "tool": tool_name, "status": status})
+                    
+                    # Clipped to the tool's planner cap: history is re-sent on every later step
+                    if TOOL_LOG_BUDGET_TOKENS:
+                        result = compact_result(ref, tool_name, result, "planner")
+                    feedback.append(f"Tool result [{ref}]:\n{result}")
                 
-                if enable_trace:
-                    trace({"event": "tool_result", "step": step, "tool": tool_name, "status": status})
+                if skipped:
+                    feedback.append(f"Only {MAX_TOOL_CALLS_PER_STEP} tool calls run per step; "
+                                    f"skipped: {', '.join(c['tool'] for c in skipped)}. Request them again if needed.")
                 
-                # Update planner history minimally
+                # Update planner history minimally: all results of this step in one message
                 planner_history.append({"role": "assistant", "content": raw})
-                planner_history.append({"role": "user", "content": f"Tool result:\n{result}"})
+                planner_history.append({"role": "user", "content": "\n\n".join(feedback)})
                 continue
             
             # Check for final instruction
@@ -754,113 +1423,142 @@ def run_agent_loop(
 
         # Executor call (once) - AFTER the loop
         # Log executor routing decision
-        trace.append({
+        emit({
             "type": "executor_routing",
             "ts": int(time.time()),
             "run_id": run_id,
             "provider": ROUTING_POLICY["executor"]["primary"]["provider"] if ROUTING_POLICY and LLM_MODE != "mock" else "mock",
             "model": active_executor_model,
-            "is_strong_executor": should_use_strong_executor(user_text, ROUTING_POLICY) if ROUTING_POLICY else False
+            "is_strong_executor": should_use_strong_executor(user_text, ROUTING_POLICY) if ROUTING_POLICY else False,
+            "hedge": executor_hedge is not None
         })
         
-        tool_logs_text = "\n".join([
-            f"- {log['name']}({log['arguments']}): {log['result']}" for log in tool_logs
-        ]) if tool_logs else "No tools were used."
+        if not tool_logs:
+            tool_logs_text = "No tools were used."
+        elif TOOL_LOG_BUDGET_TOKENS:
+            tool_logs_text, budget_stats = format_tool_logs(tool_logs, TOOL_LOG_BUDGET_TOKENS)
+            emit({"type": "tool_log_budget", "ts": int(time.time()), "run_id": run_id, **budget_stats})
+        else:
+            tool_logs_text = "\n".join([
+                f"- [{log['ref']}] {log['name']}({log['arguments']}): {log['result']}" for log in tool_logs
+            ])
+        
+        if bypass_planner:
+            final_instruction = "No tools are needed. Answer the user directly."
         
         executor_messages = [
             {"role": "system", "content": EXECUTOR_SYSTEM},
+            # Without a planner the memories (preferences, facts) must reach the executor directly
+            *([{"role": "system", "content": memory_block}] if bypass_planner and memory_block else []),
+            *conversation,
             {"role": "user", "content": user_text},
             {"role": "user", "content": f"Planner instruction:\n{final_instruction or 'Provide answer based on available information'}"},
             {"role": "user", "content": f"Tool logs:\n{tool_logs_text}"}
         ]
         
+        # Stream executor chunks to the listeners; the trace keeps only the assembled text
+        def executor_token(text: str):
+            if executor_timing["ttft_ms"] is None:
+                executor_timing["ttft_ms"] = (time.perf_counter() - executor_timing["start"]) * 1000
+            executor_chunks.append(text)
+            if on_token:
+                on_token(text)
+            if on_event:
+                on_event({"type": "executor_token", "run_id": run_id, "text": text})
+        
+        streaming = on_event is not None or on_token is not None
+        executor_timing["start"] = time.perf_counter()
         try:
-            final_text = call_llm_with_retries(lambda: active_executor_llm.chat(executor_messages))
+            if executor_hedge:
+                final_text = await call_llm_hedged(
+                    "executor",
+                    executor_hedge,
+                    executor_messages,
+                    llm_client=active_executor_llm,
+                    model=active_executor_model,
+                    on_token=executor_token if streaming else None,
+                    emit=emit,
+                    run_id=run_id,
+                    on_call=record_call
+                )
+            else:
+                final_text = await call_llm_with_retries(
+                    executor_messages,
+                    llm_client=active_executor_llm,
+                    model=active_executor_model,
+                    on_token=executor_token if streaming else None,
+                    role="executor",
+                    on_call=record_call
+                )
         except Exception as e:
             raise ExecutorError(f"Executor LLM failed: {e}") from e
         
-        trace.append({
-            "type": "executor_response",
-            "ts": int(time.time()),
-            "run_id": run_id,
-            "text": final_text[:4000],
-        })
+        emit(executor_response_event(run_id, final_text, executor_chunks, executor_timing, streaming))
         
         if enable_trace:
             trace({"event": "final_answer", "text_preview": final_text[:500]})
         
-        from pathlib import Path
-        Path("traces").mkdir(exist_ok=True)
-        Path(f"traces/{start_ts}_{run_id}.json").write_text(
-            json.dumps(trace, indent=2),
-            encoding="utf-8"
-        )
+        await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
         
         return RunOutcome(
             status="ok",
             final_text=final_text,
             tool_logs=tool_logs,
-            reason=None
+            reason=None,
+            llm_calls=llm_calls
         )
     
     except PlannerError as e:
         # Planner failed - return error outcome
-        from pathlib import Path
-        Path("traces").mkdir(exist_ok=True)
-        Path(f"traces/{start_ts}_{run_id}.json").write_text(
-            json.dumps(trace, indent=2),
-            encoding="utf-8"
-        )
+        await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
         return RunOutcome(
             status="error",
             final_text="I couldn't complete that request. Please try again.",
             tool_logs=tool_logs,
-            reason="planner_failure"
+            reason="planner_failure",
+            llm_calls=llm_calls
         )
     
     except ToolExecutionError as e:
         # Tool execution failed - return error outcome
-        from pathlib import Path
-        Path("traces").mkdir(exist_ok=True)
-        Path(f"traces/{start_ts}_{run_id}.json").write_text(
-            json.dumps(trace, indent=2),
-            encoding="utf-8"
-        )
+        await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
         return RunOutcome(
             status="error",
             final_text="I couldn't complete that request. Please try again.",
             tool_logs=tool_logs,
-            reason="tool_failure"
+            reason="tool_failure",
+            llm_calls=llm_calls
         )
     
+    except asyncio.CancelledError:
+        # Client went away (/chat/stream): keep what was produced, then let the cancellation through
+        if executor_chunks:
+            event = executor_response_event(run_id, "".join(executor_chunks), executor_chunks, executor_timing, True)
+            emit({**event, "cancelled": True})
+        emit({"type": "run_cancelled", "ts": int(time.time()), "run_id": run_id})
+        save_run_trace(start_ts, run_id, trace)
+        raise
+    
     except ExecutorError as e:
         # Executor failed - return partial outcome with fallback
-        from pathlib import Path
-        Path("traces").mkdir(exist_ok=True)
-        Path(f"traces/{start_ts}_{run_id}.json").write_text(
-            json.dumps(trace, indent=2),
-            encoding="utf-8"
-        )
+        await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
         return RunOutcome(
             status="partial",
             final_text=synthesize_fallback(tool_logs),
             tool_logs=tool_logs,
-            reason="executor_failed"
+            reason="executor_failed",
+            llm_calls=llm_calls
         )
     
     except Exception as e:
         # Unrecoverable error during agent loop
-        from pathlib import Path
-        Path("traces").mkdir(exist_ok=True)
-        Path(f"traces/{start_ts}_{run_id}.json").write_text(
-            json.dumps(trace, indent=2),
-            encoding="utf-8"
-        )
+        await asyncio.to_thread(save_run_trace, start_ts, run_id, trace)
         return RunOutcome(
             status="error",
             final_text="I couldn't complete that request. Please try again.",
             tool_logs=tool_logs,
-            reason="unknown_error"
+            reason="unknown_error",
+            llm_calls=llm_calls
         )
 
 # -------------------- TOOLS --------------------
@@ -881,6 +1579,33 @@ TOOLS: Dict[str, Callable] = {
 app = FastAPI()
 init_db()
 
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await llm_clients.aclose()
+
+@app.on_event("shutdown")
+def close_tool_runtime():
+    tool_runtime.close()
+
+@app.on_event("shutdown")
+def close_db():
+    memory_usage.close()
+    writer.close()  # flush queued writes before the connections go away
+    store.close_all()
+
+# Bounded concurrent runs + waiting queue; same-thread messages run in order
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("CHAT_MAX_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("CHAT_MAX_QUEUE", "128")),
+)
+
+def busy_response(e: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(e)},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
 @app.get("/health")
 def health():
     return {"ok": True}
@@ -889,9 +1614,28 @@ def health():
 def ping():
     return {"reply": "ping", "tool_logs": []}
 
+@app.get("/metrics")
+def metrics():
+    response_cache = get_response_cache()
+    return {
+        "admission": admission.stats(),
+        "db": store.stats(),
+        "writer": writer.stats(),
+        "memory_usage": memory_usage.stats(),
+        "history_cache": history_cache.stats(),
+        "tool_cache": tool_cache.stats(),
+        "tool_runtime": tool_runtime.stats(),
+        "http_fetch": get_fetcher().stats(),
+        "llm_clients": llm_clients.stats(),
+        "hedging": llm_hedger.stats(),
+        "llm": llm_stats.stats(),
+        "circuit_breakers": llm_breakers.stats(),
+        "response_cache": response_cache.stats() if response_cache else {"enabled": False},
+    }
+
 # Available tools description for the AI
 TOOLS_DESCRIPTION = """Available tools:
-- calculator: {"expression": "math expression"} - Evaluate math
+- calculator: {"expression": "math expression"} or {"expressions": ["expr", ...]} - Evaluate math (+ - * / // % **)
 - current_time: {} - Get current date/time
 - web_search: {"query": "search term"} - Search the web
 - weather: {"location": "city name"} - Get weather info
@@ -899,6 +1643,7 @@ TOOLS_DESCRIPTION = """Available tools:
 - read_file: {"path": "file.txt"} - Read file contents
 - write_file: {"path": "file.txt", "content": "text"} - Write to file
 - run_command: {"cmd": "ls"} - Run safe commands (ls, pwd, dir, python)
+- tool_detail: {"ref": "r1", "offset": 0} - Read more of a clipped tool result (ref/offset from its "chars omitted" note)
 """
 
 PLANNER_SYSTEM = (
@@ -906,10 +1651,13 @@ PLANNER_SYSTEM = (
     + TOOLS_DESCRIPTION + "\n"
     "Your job: decide the next step to solve the user request.\n"
     'If a tool is needed, output ONLY valid JSON: {"tool":"name","args":{...}}\n'
+    'If several independent tools are needed, output them together: {"tools":[{"tool":"name","args":{...}}, ...]}\n'
     'If no tool is needed, output ONLY: {"final": "<short instruction to executor>"}\n'
     "Never include any other text."
 )
 
+PLANNER_TEMPERATURE = 0.0  # deterministic plans (and cacheable with LLM_RESPONSE_CACHE=1)
+
 EXECUTOR_SYSTEM = (
     "You are the EXECUTOR.\n"
     "You receive: the user request, brief planner instruction, and tool results.\n"
@@ -928,42 +1676,88 @@ class ChatResponse(BaseModel):
     tool_calls: Optional[List[Dict[str, Any]]] = None
     status: Optional[str] = None
     reason: Optional[str] = None
+    llm: Optional[Dict[str, Any]] = None  # summarize_calls() of the run's LLM calls
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    import uuid
-    import os
-    
+async def chat(req: ChatRequest):
+    try:
+        async with admission.admit(req.thread_id):
+            return await run_chat_turn(req)
+    except AdmissionRejected as e:
+        return busy_response(e)
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Same turn as /chat, delivered as server-sent events while it runs:
+    run trace events (planner_routing, tool_result, ...) as they are recorded,
+    executor_token chunks as the executor streams, then a final "done" event
+    carrying the /chat response body. If the client disconnects, the run is
+    cancelled; only the user message is persisted.
+    """
+    try:
+        ticket = await admission.acquire(req.thread_id)
+    except AdmissionRejected as e:
+        return busy_response(e)
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run_turn():
+        try:
+            result = await run_chat_turn(req, on_event=events.put_nowait)
+            events.put_nowait({"type": "done", **result})
+        finally:
+            admission.release(ticket)
+            events.put_nowait(None)
+
+    task = asyncio.create_task(run_turn())
+
+    async def sse():
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                data = json.dumps(event, ensure_ascii=False, default=str)
+                yield f"event: {event['type']}\ndata: {data}\n\n"
+            await task
+        finally:
+            # The client disconnected mid-stream: stop the run (and its LLM stream) instead of finishing it unseen
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def run_chat_turn(req: ChatRequest, on_event: Optional[Callable[[dict], None]] = None) -> Dict[str, Any]:
+    """One /chat turn: memories + history, agent loop, persistence. Returns the ChatResponse body."""
     # Compute project ID from current workspace
     current_workspace = os.getcwd()
     project_id = compute_project_id(current_workspace)
     
-    run_id = str(uuid.uuid4())
-    start_ts = int(time.time())
-    trace = []
-    
+    # Writes for this turn are collected and committed once at the end (record_turn)
+    new_memories = []
+    memory_gate: Optional[asyncio.Task] = None
     try:
         if req.save_memory:
-            add_memory(
-                key=req.save_memory.get("key", ""),
-                value=req.save_memory.get("value", ""),
-                importance=int(req.save_memory.get("importance", 5)),
-            )
-
-        add_message(req.thread_id, "user", req.user_message)
+            new_memories.append({
+                "kind": "fact",
+                "text": f"{req.save_memory.get('key', '')}: {req.save_memory.get('value', '')}",
+                "importance": int(req.save_memory.get("importance", 5)),
+            })
 
-        auto_mem = should_save_memory(req.user_message)
-        if auto_mem:
-            add_memory(
-                key=auto_mem["key"],
-                value=auto_mem["value"],
-                importance=auto_mem["importance"],
-            )
+        # The memory gate is an LLM call of its own: run it alongside the turn so it does not
+        # delay run_start (the first /chat/stream event), and collect its verdict before persisting
+        memory_gate = asyncio.create_task(should_save_memory(req.user_message))
 
-        history = get_recent_messages(req.thread_id)
+        # Summary + token-budgeted recent turns, ending with this (not yet committed) user message.
+        # Both reads run on worker threads so the event loop stays free during SQLite work
+        conversation, context_trace = await asyncio.to_thread(build_conversation, req.thread_id, req.user_message)
         
-        with db() as con:
-            memories = retrieve_memories(con, req.user_message, project_id=project_id, limit=8)
+        memories = await asyncio.to_thread(load_memories, req.user_message, project_id, 8)
 
         memory_block = ""
         memory_trace = []
@@ -980,32 +1774,48 @@ def chat(req: ChatRequest):
                 })
             
             # Mark memories as used
-            # for m in memories:
-            #     mark_memory_used(m['id'])
+            memory_usage.record(m['id'] for m in memories)
 
         messages = [{"role": "system", "content": PLANNER_SYSTEM}]
-        messages.extend(history)
+        messages.extend(conversation)
 
-        # Determine max_steps based on user input
+        # Determine max_steps based on user input; clearly tool-free requests skip the planner
         max_steps = 1 if not needs_tools(req.user_message) else 6
+        route = route_request(req.user_message)
 
         # Run agent loop with tool support
         print(f">>> /chat START (project_id: {project_id})")
         if memory_trace:
             print(f">>> MEMORY: {len(memory_trace)} loaded - {sum(1 for m in memory_trace if m['scope']=='project')} project, {sum(1 for m in memory_trace if m['scope']=='global')} global")
-        outcome = run_agent_loop(
+        outcome = await run_agent_loop(
             tools=TOOLS,
             messages=messages,
             max_steps=max_steps,
             max_seconds=100,
             memory_block=memory_block,
             project_id=project_id,
-            memory_trace=memory_trace
+            memory_trace=memory_trace,
+            context_trace=context_trace,
+            on_event=on_event,
+            route=route
         )
         print(f">>> /chat END (status: {outcome.status})")
         
-        # Save final answer to history
-        add_message(req.thread_id, "assistant", outcome.final_text)
+        try:
+            auto_mem = await memory_gate
+        except Exception as e:
+            # Best effort: a failed gate must not cost the user the answer
+            print(f"Memory gate failed: {type(e).__name__}: {e}")
+            auto_mem = None
+        if auto_mem:
+            new_memories.append({
+                "kind": "fact",
+                "text": f"{auto_mem['key']}: {auto_mem['value']}",
+                "importance": auto_mem["importance"],
+            })
+        
+        # Queue the whole turn; the group-commit writer persists it in one transaction
+        record_turn(req.thread_id, req.user_message, outcome.final_text, new_memories)
         
         # Convert memories to JSON-serializable dicts
         used_memories_list = [dict(m) for m in memories] if memories else []
@@ -1016,31 +1826,79 @@ def chat(req: ChatRequest):
             "used_memories": used_memories_list,
             "tool_calls": outcome.tool_logs if outcome.tool_logs else None,
             "reason": outcome.reason,
+            "llm": summarize_calls(outcome.llm_calls),
         }
+    except asyncio.CancelledError:
+        # Stream abandoned by the client: keep the user message, there is no reply to store
+        record_turn(req.thread_id, req.user_message, None)
+        raise
     except Exception as e:
         # Log and return error
         import traceback
         error_msg = f"Error: {str(e)}\n{traceback.format_exc()}"
         print(error_msg)
+        try:
+            record_turn(req.thread_id, req.user_message, None)
+        except Exception:
+            pass
         return {
             "assistant_message": f"I encountered an error: {str(e)}",
             "used_memories": [],
             "tool_calls": None,
         }
-@app.get("/memories")
-def list_memories(limit: int = 100):
-    conn = db()
-    rows = conn.execute(
-        "SELECT id, key, value, importance, created_at FROM memories ORDER BY id DESC LIMIT ?",
-        (limit,),
+    finally:
+        # Turn cancelled or failed before the gate's verdict was needed
+        if memory_gate is not None and not memory_gate.done():
+            memory_gate.cancel()
+
+
+MAX_PAGE_SIZE = 200
+
+def keyset_page(rows: List[sqlite3.Row], limit: int) -> Tuple[List[dict], Optional[int]]:
+    """Rows fetched newest first with LIMIT limit+1 -> (page, cursor for the next older page)."""
+    page = [dict(r) for r in rows[:limit]]
+    next_before = page[-1]["id"] if len(rows) > limit else None
+    return page, next_before
+
+@app.get("/threads/{thread_id}/messages")
+def list_thread_messages(thread_id: str, before: Optional[int] = None, limit: int = 50):
+    """
+    Messages of a thread, newest page first. Pass the returned `next_before`
+    as `before` to get the next older page (keyset pagination on id).
+    Each page is in chronological order.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    writer.flush()
+    rows = db().execute(
+        "SELECT id, role, content, created_at FROM messages "
+        "WHERE thread_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+        (thread_id, before if before is not None else 2**63 - 1, limit + 1),
     ).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    page, next_before = keyset_page(rows, limit)
+    page.reverse()
+    return {"thread_id": thread_id, "messages": page, "next_before": next_before}
+
+@app.get("/memories")
+def list_memories(before: Optional[int] = None, limit: int = 100, project_id: Optional[str] = None):
+    """
+    Memories, newest first. Pass the returned `next_before` as `before` for the
+    next page. `project_id` limits the list to one project.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    memory_usage.flush()
+    writer.flush()
+    sql = f"SELECT {MEMORY_COLUMNS}, ts FROM memories WHERE id < ?"
+    params: List[Any] = [before if before is not None else 2**63 - 1]
+    if project_id is not None:
+        sql += " AND project_id = ?"
+        params.append(project_id)
+    rows = db().execute(sql + " ORDER BY id DESC LIMIT ?", (*params, limit + 1)).fetchall()
+    page, next_before = keyset_page(rows, limit)
+    return {"memories": page, "next_before": next_before}
 
 @app.delete("/memories/{memory_id}")
 def delete_memory(memory_id: int):
-    conn = db()
-    conn.execute("DELETE FROM memories WHERE id=?", (memory_id,))
-    conn.commit()
-    conn.close()
+    writer.flush()  # a queued insert of this memory must land before the delete
+    with store.transaction() as conn:
+        conn.execute("DELETE FROM memories WHERE id=?", (memory_id,))
     return {"deleted": memory_id}
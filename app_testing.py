@@ -0,0 +1,53 @@
+"""
+Shared setup for the test scripts that exercise app.py.
+
+Import `app` from here: the app is loaded in mock mode with its database and
+traces in a throwaway directory, so test runs leave nothing in the repo.
+
+fresh_app() swaps in an empty database with its own writer, history cache and
+usage aggregator (plus any module attributes passed as keyword arguments) and,
+on exit, closes what it created and restores what it replaced:
+
+    with fresh_app(history_cache=HistoryCache(capacity=5)):
+        app.record_turn("t", "hi", "hello")
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+TMP_DIR = tempfile.mkdtemp(prefix="assistant-tests-")
+
+os.environ["LLM_MODE"] = "mock"
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+os.environ.setdefault("ASSISTANT_DB_PATH", os.path.join(TMP_DIR, "assistant.db"))
+os.environ.setdefault("TRACES_DIR", os.path.join(TMP_DIR, "traces"))
+
+import app
+from history import HistoryCache
+from storage import GroupCommitWriter, SQLitePool, UsageAggregator
+
+SWAPPED = ("store", "writer", "history_cache", "memory_usage", "MEMORY_FTS")
+
+
+@contextmanager
+def fresh_app(db_path: Optional[str] = None, **overrides: Any) -> Iterator[Any]:
+    """An empty database (or `db_path`) behind app for the duration of the block."""
+    saved = {name: getattr(app, name) for name in (*SWAPPED, *overrides)}
+    store = SQLitePool(db_path or os.path.join(tempfile.mkdtemp(dir=TMP_DIR), "test.db"))
+    writer = GroupCommitWriter(store)
+    writer.add_error_listener(lambda ops: app.history_cache.invalidate())
+    usage = UsageAggregator(writer, app.memory_usage.sql, flush_interval=app.memory_usage.flush_interval)
+    app.store, app.writer, app.memory_usage = store, writer, usage
+    app.history_cache = HistoryCache()
+    for name, value in overrides.items():
+        setattr(app, name, value)
+    try:
+        app.init_db()
+        yield app
+    finally:
+        usage.close()
+        writer.close()
+        store.close_all()
+        for name, value in saved.items():
+            setattr(app, name, value)
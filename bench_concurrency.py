@@ -0,0 +1,78 @@
+"""
+Mock-mode concurrency benchmark for /chat.
+
+Fires N concurrent conversations at the app in-process (no server needed) and
+compares the async pipeline against the old model of one blocked threadpool
+worker per request (FastAPI/anyio default: 40 threads).
+
+Usage:
+    python bench_concurrency.py [concurrency] [latency_ms]
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+LATENCY_MS = sys.argv[2] if len(sys.argv) > 2 else "200"
+THREADPOOL_SIZE = 40
+
+os.environ["LLM_MODE"] = "mock"
+os.environ["MOCK_LLM_LATENCY_MS"] = LATENCY_MS
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+os.environ.setdefault("CHAT_MAX_CONCURRENCY", str(CONCURRENCY))  # measure the pipeline, not admission
+
+import httpx
+import app
+
+
+def _payload(i: int) -> dict:
+    return {"thread_id": f"bench_{i}", "user_message": "Hello, how are you?"}
+
+
+async def bench_async(n: int):
+    """All requests share one event loop, like uvicorn serving async def chat."""
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        async def one(i):
+            t0 = time.perf_counter()
+            r = await client.post("/chat", json=_payload(i))
+            r.raise_for_status()
+            return time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(n)))
+        return time.perf_counter() - t0, latencies
+
+
+def bench_threadpool(n: int):
+    """Each request pins a pool thread for its whole lifetime (the old sync handler)."""
+    def one(i):
+        t0 = time.perf_counter()
+        asyncio.run(app.chat(app.ChatRequest(**_payload(i))))
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as pool:
+        latencies = list(pool.map(one, range(n)))
+    return time.perf_counter() - t0, latencies
+
+
+def report(label: str, wall: float, latencies):
+    lat = sorted(latencies)
+    p50 = statistics.median(lat)
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    print(f"{label:<12} wall={wall:6.2f}s  throughput={len(lat) / wall:7.1f} req/s  "
+          f"p50={p50 * 1000:7.1f}ms  p99={p99 * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    print(f"\nConcurrency={CONCURRENCY}, mock LLM latency={LATENCY_MS}ms per call\n")
+    wall_t, lat_t = bench_threadpool(CONCURRENCY)
+    wall_a, lat_a = asyncio.run(bench_async(CONCURRENCY))
+    print()
+    report(f"threadpool({THREADPOOL_SIZE})", wall_t, lat_t)
+    report("async", wall_a, lat_a)
+    print(f"\nSpeedup: {wall_t / wall_a:.1f}x")
@@ -0,0 +1,119 @@
+"""
+Planner latency benchmark for OpenAIHTTPClient against a local
+OpenAI-compatible stand-in (Responses API), no network or API key needed.
+
+Runs ProductionAgent.plan N times with a fresh connection per call
+(keep_alive=False, what every call paid before pooling) and with the pooled
+keep-alive session. Uses TLS with a throwaway self-signed certificate when
+`openssl` is available. `handshake_ms` adds a simulated delay to each new
+connection to stand in for WAN round trips (0 = localhost only).
+
+Usage:
+    python bench_openai_http.py [calls] [handshake_ms]
+"""
+import json
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+HANDSHAKE_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+
+PLAN = {"goal": "Read docs/patch_test.txt", "steps": [
+    {"tool": "fs.read_file", "args": {"path": "docs/patch_test.txt"}, "acceptance": "file read"}]}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive unless the client sends Connection: close
+    disable_nagle_algorithm = True  # as real servers do; else delayed ACKs add ~40ms per reused request
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        if HANDSHAKE_MS:
+            time.sleep(HANDSHAKE_MS / 1000)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"output": [{"content": [{"type": "output_text", "text": json.dumps(PLAN)}]}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in():
+    """Returns (base_url, ca_bundle or None, server)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    scheme, ca = "http", None
+    if shutil.which("openssl"):
+        tmp = tempfile.mkdtemp()
+        cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+             "-days", "1", "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+            check=True, capture_output=True,
+        )
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(cert, key)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        scheme, ca = "https", cert
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"{scheme}://127.0.0.1:{server.server_address[1]}/v1", ca, server
+
+
+def bench(agent, n):
+    latencies = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        agent.plan("Read docs/patch_test.txt")
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def report(label, latencies, connections):
+    lat = sorted(latencies)
+    print(f"{label:<22} p50={statistics.median(lat) * 1000:7.2f}ms  "
+          f"p99={lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000:7.2f}ms  connections={connections}")
+    return statistics.median(lat)
+
+
+if __name__ == "__main__":
+    base_url, ca, server = start_stand_in()
+    if ca:
+        os.environ["REQUESTS_CA_BUNDLE"] = ca
+    os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+
+    from agent.core.agent_loop import AgentMode
+    from agent.core.production_agent import ProductionAgent
+    from agent.llm.openai_http import OpenAIHTTPClient
+    from agent.registry import build_registry
+
+    agent = ProductionAgent(build_registry(), AgentMode.REVIEWER)
+    print(f"\nStand-in: {base_url}  calls={CALLS}  simulated handshake={HANDSHAKE_MS}ms\n")
+
+    results = {}
+    for label, keep_alive in (("new connection/call", False), ("pooled keep-alive", True)):
+        agent.llm = OpenAIHTTPClient(base_url=base_url, keep_alive=keep_alive)
+        bench(agent, 3)  # warm-up (imports, first handshake)
+        StandInHandler.connections = 0
+        latencies = bench(agent, CALLS)
+        results[label] = report(label, latencies, StandInHandler.connections)
+        agent.llm.close()
+    server.shutdown()
+
+    before, after = results["new connection/call"], results["pooled keep-alive"]
+    print(f"\nPlanner p50 saved per call: {(before - after) * 1000:.2f}ms ({before / after:.1f}x)")
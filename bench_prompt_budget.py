@@ -0,0 +1,95 @@
+"""
+Mock-mode benchmark for tool-log prompt budgeting (prompt_budget.py).
+
+Runs a scripted multi-step plan (large read_file / run_command results, as the
+real tools return up to 5 KB / 8 KB) and sums the estimated prompt tokens sent
+to the planner and executor, with budgeting on and with full results
+(TOOL_LOG_BUDGET_TOKENS=0).
+
+Usage:
+    python bench_prompt_budget.py [steps]
+"""
+import asyncio
+import json
+import os
+import sys
+
+STEPS = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+
+os.environ["LLM_MODE"] = "mock"
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+import app
+from context_window import message_tokens
+from mock_llm import MockLLM
+
+PLAN = [("read_file", {"path": f"src/module_{i}.py"}) if i % 2 == 0 else ("run_command", {"cmd": "python -m pytest"})
+        for i in range(STEPS)]
+FAKE_TOOLS = {
+    "read_file": lambda path: "".join(f"{path} line {n}: x = compute(x, {n})  # some code\n" for n in range(120))[:5000],
+    "run_command": lambda cmd: "".join(f"test_{n} PASSED\n" for n in range(600))[:7800] + "\n3 failed, 597 passed",
+}
+
+
+class CountingLLM(MockLLM):
+    def __init__(self, mode):
+        super().__init__(mode, latency_sec=0)
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def _agenerate(self, messages, model, temperature):
+        self._count(messages)
+        return await super()._agenerate(messages, model, temperature)
+
+    async def _astream(self, messages, model, temperature):
+        self._count(messages)
+        async for chunk in super()._astream(messages, model, temperature):
+            yield chunk
+
+    def _count(self, messages):
+        self.calls += 1
+        self.prompt_tokens += sum(message_tokens(m) for m in messages)
+
+
+class ScriptedPlanner(CountingLLM):
+    """Issues PLAN one step at a time, then finishes."""
+
+    def _respond(self, messages):
+        done = sum(1 for m in messages if m.role == "user" and m.content.startswith("Tool result"))
+        if done < len(PLAN):
+            tool, args = PLAN[done]
+            return json.dumps({"tool": tool, "args": args})
+        return '{"final":"Summarize the files and the test run."}'
+
+
+def run(budget_tokens: int):
+    app.TOOL_LOG_BUDGET_TOKENS = budget_tokens
+    app.planner_llm = ScriptedPlanner("planner")
+    app.executor_llm = CountingLLM("executor")
+    outcome = asyncio.run(app.run_agent_loop(
+        FAKE_TOOLS, [{"role": "user", "content": "Review the modules and run the tests"}],
+        max_steps=STEPS + 2, on_token=lambda text: None
+    ))
+    assert outcome.status == "ok" and len(outcome.tool_logs) == STEPS, outcome
+    return app.planner_llm, app.executor_llm
+
+
+def main():
+    app.TOOLS.update(FAKE_TOOLS)
+    app.tool_cache.clear()
+    budget = app.TOOL_LOG_BUDGET_TOKENS
+    full_planner, full_executor = run(0)
+    planner, executor = run(budget)
+
+    print(f"Prompt tokens (estimated), {STEPS} tool steps:")
+    print(f"  {'':10} {'full results':>14} {'budgeted':>10} {'saved':>7}")
+    for name, before, after in (
+        ("planner", full_planner.prompt_tokens, planner.prompt_tokens),
+        ("executor", full_executor.prompt_tokens, executor.prompt_tokens),
+        ("total", full_planner.prompt_tokens + full_executor.prompt_tokens, planner.prompt_tokens + executor.prompt_tokens),
+    ):
+        print(f"  {name:10} {before:>14} {after:>10} {1 - after / before:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Arithmetic engine for the calculator tool (no eval).
+
+- Expressions are parsed with ast and compiled into a tree of closures over a
+  whitelist: int/float literals, + - * / // % **, unary +/-, parentheses.
+  Names, calls, attributes, comparisons, etc. are rejected at compile time
+- Limits keep any input cheap: expression length, node count and nesting
+  depth; integer exponents up to MAX_EXPONENT; integer results up to
+  MAX_RESULT_BITS (checked before multiplying or raising, so 9**9**9 is
+  refused instead of computed); float overflow and complex results are errors
+- compile_expression is an LRU cache, so repeated expressions skip parsing
+- evaluate_many evaluates a batch, one result (or error) per expression
+"""
+import ast
+import math
+import operator
+from functools import lru_cache
+from typing import Callable, List, Union
+
+Number = Union[int, float]
+
+MAX_EXPRESSION_CHARS = 500
+MAX_NODES = 200
+MAX_DEPTH = 40
+MAX_EXPONENT = 1000
+MAX_RESULT_BITS = 4096
+MAX_BATCH = 50
+
+
+class CalcError(ValueError):
+    """Rejected or failed expression; the message is shown to the user."""
+
+
+def _check_result(value: Number) -> Number:
+    if isinstance(value, int) and value.bit_length() > MAX_RESULT_BITS:
+        raise CalcError("result too large")
+    if isinstance(value, float) and math.isinf(value):
+        raise CalcError("result too large")
+    return value
+
+
+def _mul(a: Number, b: Number) -> Number:
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_RESULT_BITS + 1:
+        raise CalcError("result too large")
+    return a * b
+
+
+def _pow(base: Number, exp: Number) -> Number:
+    if isinstance(exp, int):
+        if abs(exp) > MAX_EXPONENT:
+            raise CalcError(f"exponent too large (limit {MAX_EXPONENT})")
+        if isinstance(base, int) and exp > 0 and (abs(base).bit_length() - 1) * exp > MAX_RESULT_BITS:
+            raise CalcError("result too large")
+    elif abs(exp) > MAX_EXPONENT:
+        raise CalcError(f"exponent too large (limit {MAX_EXPONENT})")
+    result = base ** exp
+    if isinstance(result, complex):
+        raise CalcError("result is not a real number")
+    return result
+
+
+BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _pow,
+}
+UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def _compile(node: ast.AST, depth: int) -> Callable[[], Number]:
+    if depth > MAX_DEPTH:
+        raise CalcError("expression too deeply nested")
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        _check_result(value)
+        return lambda: value
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+        op = BINARY_OPS[type(node.op)]
+        left, right = _compile(node.left, depth + 1), _compile(node.right, depth + 1)
+        return lambda: _check_result(op(left(), right()))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPS:
+        op = UNARY_OPS[type(node.op)]
+        operand = _compile(node.operand, depth + 1)
+        return lambda: op(operand())
+    what = type(getattr(node, "op", node)).__name__
+    raise CalcError(f"unsupported expression element: {what}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> Callable[[], Number]:
+    """Parse and compile once; raises CalcError for anything outside the whitelist or limits."""
+    expression = expression.strip()
+    if not expression:
+        raise CalcError("empty expression")
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise CalcError(f"expression too long (limit {MAX_EXPRESSION_CHARS} characters)")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        raise CalcError("invalid expression") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise CalcError(f"expression too complex (limit {MAX_NODES} nodes)")
+    return _compile(tree.body, 0)
+
+
+def evaluate(expression: str) -> Number:
+    try:
+        return compile_expression(str(expression))()
+    except ZeroDivisionError:
+        raise CalcError("division by zero") from None
+    except OverflowError:
+        raise CalcError("result too large") from None
+
+
+def evaluate_many(expressions: List[str]) -> List[str]:
+    """str() of each result, or "Error: ..." for that expression alone."""
+    # A bare string would otherwise be evaluated one character at a time
+    if not isinstance(expressions, list) or not all(isinstance(e, str) for e in expressions):
+        raise CalcError("expressions must be a list of strings")
+    if len(expressions) > MAX_BATCH:
+        raise CalcError(f"too many expressions (limit {MAX_BATCH})")
+    results = []
+    for expression in expressions:
+        try:
+            results.append(str(evaluate(expression)))
+        except CalcError as e:
+            results.append(f"Error: {e}")
+    return results
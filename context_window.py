@@ -0,0 +1,85 @@
+"""
+Token-budgeted conversation window.
+
+- select_window(): newest messages backward until the token budget is spent;
+  single oversized messages (e.g. pasted read_file output) are clipped
+- fold_summary(): folds messages that fell out of the window into a rolling,
+  extractive summary (no LLM call). The caller persists it, so each turn only
+  folds the messages that just left the window instead of re-summarizing
+"""
+import math
+import re
+from typing import Dict, List, Tuple
+
+Message = Dict[str, str]
+
+CHARS_PER_TOKEN = 4  # rough average for English text / JSON with the OpenAI tokenizers
+SUMMARY_HEADER = "Summary of earlier conversation (oldest first):"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; good enough for budgeting, never used for billing."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message.get("content") or "") + 4  # role/framing overhead
+
+
+def clip_text(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}\n...[truncated {len(text) - max_chars} chars]"
+
+
+def select_window(
+    messages: List[Message],
+    budget_tokens: int,
+    max_message_tokens: int,
+) -> Tuple[int, List[Message]]:
+    """
+    Pick the newest messages that fit in `budget_tokens`.
+
+    Returns (start, window): `window` holds messages[start:] with oversized
+    contents clipped to `max_message_tokens`. The newest message is always kept.
+    """
+    window: List[Message] = []
+    used = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        msg = messages[i]
+        content = msg.get("content") or ""
+        if estimate_tokens(content) > max_message_tokens:
+            msg = {**msg, "content": clip_text(content, max_message_tokens)}
+        cost = message_tokens(msg)
+        if window and used + cost > budget_tokens:
+            break
+        window.append(msg)
+        used += cost
+        start = i
+    window.reverse()
+    return start, window
+
+
+def _gist(content: str, max_chars: int = 160) -> str:
+    """First sentence (or line) of a message, whitespace-collapsed and clipped."""
+    text = re.sub(r"\s+", " ", content).strip()
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    gist = match.group(1) if match else text
+    return gist if len(gist) <= max_chars else gist[: max_chars - 3] + "..."
+
+
+def fold_summary(summary: str, messages: List[Message], max_tokens: int) -> str:
+    """
+    Append one line per folded message to `summary`, then drop the oldest lines
+    until the summary fits in `max_tokens`.
+    """
+    lines = [line for line in summary.splitlines() if line and line != SUMMARY_HEADER]
+    for msg in messages:
+        content = msg.get("content") or ""
+        if content:
+            lines.append(f"- {msg.get('role', 'user')}: {_gist(content)}")
+    while lines and estimate_tokens("\n".join([SUMMARY_HEADER, *lines])) > max_tokens:
+        lines.pop(0)
+    return "\n".join([SUMMARY_HEADER, *lines]) if lines else ""
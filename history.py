@@ -0,0 +1,144 @@
+"""
+In-memory cache of recent thread history.
+
+- Bounded LRU of threads (`max_threads`); each thread keeps a ring buffer of its
+  last `capacity` messages (deque with maxlen)
+- Populated from SQLite on first access, appended when a message is queued for
+  write, so hot threads never touch the database on reads
+- A load that races with an append for the same thread is discarded instead of
+  caching a stale snapshot
+- Also holds each thread's message count and rolling summary (see
+  context_window.py) so building the conversation window needs no query
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+
+class ThreadState(NamedTuple):
+    messages: List[Dict[str, str]]  # newest up to `capacity`, oldest first
+    total: int                      # messages in the thread
+    summary: str                    # rolling summary of the oldest `summarized` messages
+    summarized: int
+
+
+class ThreadBuffer:
+    __slots__ = ("messages", "total", "summary", "summarized")
+
+    def __init__(
+        self,
+        messages: List[Dict[str, str]],
+        capacity: int,
+        total: int,
+        summary: str,
+        summarized: int,
+    ) -> None:
+        self.messages: Deque[Dict[str, str]] = deque(messages, maxlen=capacity)
+        self.total = total
+        self.summary = summary
+        self.summarized = summarized
+
+
+class HistoryCache:
+    def __init__(self, max_threads: int = 1024, capacity: int = 50) -> None:
+        self.max_threads = max_threads
+        self.capacity = capacity
+        self._threads: "OrderedDict[str, ThreadBuffer]" = OrderedDict()
+        self._loading: Dict[str, List[List[bool]]] = {}  # thread_id -> [stale] token per in-flight load
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, thread_id: str, limit: int) -> Optional[List[Dict[str, str]]]:
+        """Last `limit` messages (oldest first), or None if the cache cannot answer."""
+        with self._lock:
+            buf = self._threads.get(thread_id)
+            if buf is None or (limit > len(buf.messages) and buf.total > len(buf.messages)):
+                self._stats["misses"] += 1
+                return None
+            self._threads.move_to_end(thread_id)
+            self._stats["hits"] += 1
+            recent = list(buf.messages)[max(0, len(buf.messages) - limit):]
+        return [dict(m) for m in recent]
+
+    def state(self, thread_id: str) -> Optional[ThreadState]:
+        """Everything cached for a thread, or None on a miss."""
+        with self._lock:
+            buf = self._threads.get(thread_id)
+            if buf is None:
+                self._stats["misses"] += 1
+                return None
+            self._threads.move_to_end(thread_id)
+            self._stats["hits"] += 1
+            messages = [dict(m) for m in buf.messages]
+            return ThreadState(messages, buf.total, buf.summary, buf.summarized)
+
+    def begin_load(self, thread_id: str) -> List[bool]:
+        """Call before reading the thread from the database; pass the token to populate()."""
+        with self._lock:
+            token = [False]
+            self._loading.setdefault(thread_id, []).append(token)
+            return token
+
+    def populate(self, thread_id: str, state: ThreadState, token: List[bool]) -> None:
+        """
+        Cache a thread loaded from the database (`state.messages`: the newest up
+        to `capacity`, oldest first). Skipped if a message was appended to the
+        thread while it was being loaded.
+        """
+        with self._lock:
+            tokens = [t for t in self._loading.get(thread_id, ()) if t is not token]
+            if tokens:
+                self._loading[thread_id] = tokens
+            else:
+                self._loading.pop(thread_id, None)
+            if token[0] or thread_id in self._threads:
+                return
+            self._threads[thread_id] = ThreadBuffer(
+                state.messages[-self.capacity:], self.capacity, state.total, state.summary, state.summarized
+            )
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _mark_stale(self, thread_id: str) -> None:
+        for token in self._loading.get(thread_id, ()):
+            token[0] = True
+
+    def append(self, thread_id: str, role: str, content: str) -> None:
+        """Record a newly written message. Uncached threads are left to load on next read."""
+        with self._lock:
+            self._mark_stale(thread_id)
+            buf = self._threads.get(thread_id)
+            if buf is not None:
+                buf.messages.append({"role": role, "content": content})
+                buf.total += 1
+
+    def set_summary(self, thread_id: str, summary: str, summarized: int) -> None:
+        with self._lock:
+            buf = self._threads.get(thread_id)
+            if buf is not None and summarized >= buf.summarized:
+                buf.summary = summary
+                buf.summarized = summarized
+
+    def invalidate(self, thread_id: Optional[str] = None) -> None:
+        """Drop one thread (or everything) so the next read goes back to the database."""
+        with self._lock:
+            if thread_id is None:
+                self._threads.clear()
+                for loading_id in self._loading:
+                    self._mark_stale(loading_id)
+            else:
+                self._threads.pop(thread_id, None)
+                self._mark_stale(thread_id)
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "threads": len(self._threads),
+                "max_threads": self.max_threads,
+                "capacity": self.capacity,
+            }
@@ -0,0 +1,228 @@
+"""
+HTTP fetch layer for the network tools (web_search, weather).
+
+- Fetcher.fetch(service, key, url, params) answers from a TTL cache keyed by
+  (service, normalized key), so "Paris" / " paris " or a repeated search is
+  one request
+- Expired entries are kept (LRU-bounded) and revalidated with a conditional
+  request (If-None-Match / If-Modified-Since); a 304 renews the entry without
+  a body. If the provider fails, a stale entry is served instead (stale=True)
+- Providers:
+  - NetworkProvider: pooled keep-alive requests Sessions (shared HTTPAdapter,
+    one Session per thread, as in agent/llm/openai_http.py)
+  - LocalProvider: file-backed stand-in (fixtures/http/<service>.json) with
+    simulated latency and ETags, for offline load tests and benchmarks
+
+HTTP_FETCH_MODE=network|local picks the provider (local by default when
+LLM_MODE=mock).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SERVICE_TTL_SEC = {"web_search": 300.0, "weather": 600.0}
+DEFAULT_TTL_SEC = 300.0
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "http"
+
+
+class Response(NamedTuple):
+    status: int
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class FetchResult(NamedTuple):
+    status: int
+    text: str
+    cached: bool = False       # served without contacting the provider
+    revalidated: bool = False  # provider answered 304 Not Modified
+    stale: bool = False        # provider failed; expired entry served
+    latency_ms: float = 0.0
+
+
+def normalize_key(key: str) -> str:
+    return re.sub(r"\s+", " ", str(key)).strip().lower()
+
+
+class NetworkProvider:
+    name = "network"
+
+    def __init__(self, pool_size: int = 10, timeout_sec: float = 5.0) -> None:
+        self.timeout_sec = timeout_sec
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def get(self, service: str, key: str, url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> Response:
+        r = self._session().get(url, params=params, headers=headers, timeout=self.timeout_sec)
+        return Response(r.status_code, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+
+
+class LocalProvider:
+    """
+    Answers from fixtures/http/<service>.json: {"<normalized key>": body, "*": body}.
+    The "*" body is a template ("{key}" is replaced). Bodies that are not
+    strings are returned as JSON. Each call sleeps `latency_ms` +/- `jitter`.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Path = FIXTURES_DIR, latency_ms: float = 250.0, jitter: float = 0.3) -> None:
+        self.root = Path(root)
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self._fixtures: Dict[str, Dict[str, Any]] = {}
+
+    def _fixture(self, service: str) -> Dict[str, Any]:
+        if service not in self._fixtures:
+            path = self.root / f"{service}.json"
+            self._fixtures[service] = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        return self._fixtures[service]
+
+    def get(self, service: str, key: str, url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> Response:
+        if self.latency_ms:
+            time.sleep(self.latency_ms * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000)
+        fixture = self._fixture(service)
+        body = fixture.get(normalize_key(key))
+        if body is None:
+            body = fixture.get("*")
+            if body is None:
+                return Response(404, "")
+            body = json.loads(json.dumps(body).replace("{key}", str(key).strip()))
+        text = body if isinstance(body, str) else json.dumps(body)
+        etag = '"' + hashlib.sha1(text.encode()).hexdigest()[:16] + '"'
+        if headers and headers.get("If-None-Match") == etag:
+            return Response(304, "", etag)
+        return Response(200, text, etag)
+
+
+class _Entry:
+    __slots__ = ("text", "status", "etag", "last_modified", "expires")
+
+    def __init__(self, response: Response, expires: float) -> None:
+        self.text = response.text
+        self.status = response.status
+        self.etag = response.etag
+        self.last_modified = response.last_modified
+        self.expires = expires
+
+
+class Fetcher:
+    def __init__(self, provider: Any, max_entries: int = 1024, ttl_sec: Optional[Dict[str, float]] = None) -> None:
+        self.provider = provider
+        self.max_entries = max_entries
+        self.ttl_sec = dict(SERVICE_TTL_SEC if ttl_sec is None else ttl_sec)
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hits": 0, "misses": 0, "revalidated": 0, "stale_served": 0,
+                       "errors": 0, "evictions": 0}
+
+    def fetch(self, service: str, key: str, url: str, params: Optional[Dict[str, Any]] = None) -> FetchResult:
+        """GET url (cached per service + normalized key). Raises on provider errors with nothing cached."""
+        cache_key = (service, normalize_key(key))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                if entry.expires > now:
+                    self._stats["hits"] += 1
+                    return FetchResult(entry.status, entry.text, cached=True)
+            self._stats["misses"] += 1
+
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        t0 = time.perf_counter()
+        try:
+            with self._lock:
+                self._stats["requests"] += 1
+            response = self.provider.get(service, key, url, params=params, headers=headers or None)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+                if entry is None:
+                    raise
+                self._stats["stale_served"] += 1
+            return FetchResult(entry.status, entry.text, stale=True)
+        latency_ms = (time.perf_counter() - t0) * 1000
+
+        expires = time.monotonic() + self.ttl_sec.get(service, DEFAULT_TTL_SEC)
+        with self._lock:
+            if response.status == 304 and entry is not None:
+                entry.expires = expires
+                self._stats["revalidated"] += 1
+                return FetchResult(entry.status, entry.text, revalidated=True, latency_ms=latency_ms)
+            if response.status == 200:
+                self._entries[cache_key] = _Entry(response, expires)
+                self._entries.move_to_end(cache_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return FetchResult(response.status, response.text, latency_ms=latency_ms)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "provider": self.provider.name,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_fetcher: Optional[Fetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher() -> Fetcher:
+    """Process-wide Fetcher, built from the environment on first use."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            default_mode = "local" if os.getenv("LLM_MODE", "").lower() == "mock" else "network"
+            if os.getenv("HTTP_FETCH_MODE", default_mode).lower() == "local":
+                provider = LocalProvider(
+                    Path(os.getenv("HTTP_FETCH_FIXTURES", str(FIXTURES_DIR))),
+                    latency_ms=float(os.getenv("HTTP_FETCH_LATENCY_MS", "250")),
+                )
+            else:
+                provider = NetworkProvider(pool_size=int(os.getenv("HTTP_FETCH_POOL_SIZE", "10")))
+            _fetcher = Fetcher(provider, max_entries=int(os.getenv("HTTP_FETCH_CACHE_ENTRIES", "1024")))
+        return _fetcher
+
+
+def set_fetcher(fetcher: Optional[Fetcher]) -> None:
+    """Replace the process-wide Fetcher (None: rebuild from the environment on next use)."""
+    global _fetcher
+    with _fetcher_lock:
+        _fetcher = fetcher
@@ -0,0 +1,152 @@
+"""
+Per-call LLM accounting.
+
+- LLMCall: one logical call (all of its retries): role, model, monotonic
+  latency, attempts, fallback/cached flags and token usage (provider-reported,
+  or estimated with context_window's heuristic when the backend reports none,
+  e.g. MockLLM or streamed completions)
+- LLMStats: per-model aggregates with a fixed-bucket latency histogram,
+  reported at /metrics
+"""
+import bisect
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from context_window import estimate_tokens, message_tokens
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+@dataclass
+class LLMCall:
+    role: str                    # "planner" / "executor" / "memory" / "other"
+    model: str
+    backend: str
+    status: str                  # "ok" / "error" / "cancelled" / "circuit_open"
+    latency_ms: float
+    attempts: int
+    fallback: bool = False       # served by the role's fallback model
+    cached: bool = False
+    ttft_ms: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = False
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "latency_ms": round(self.latency_ms, 1), "retries": self.retries}
+
+
+def call_tokens(messages: List[Dict[str, str]], text: str, usage: Optional[Dict[str, int]]):
+    """(prompt_tokens, completion_tokens, estimated) from provider usage, else estimated."""
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), False
+    return sum(message_tokens(m) for m in messages), estimate_tokens(text or ""), True
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the largest bucket
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile (max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(self.buckets[i]) if i < len(self.buckets) else round(self.max, 1)
+        return round(self.max, 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in self.buckets] + ["inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": round(self.total / self.count, 1) if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": round(self.max, 1),
+        }
+
+
+class _ModelStats:
+    __slots__ = ("calls", "errors", "retries", "fallback_calls", "cached", "prompt_tokens",
+                 "completion_tokens", "estimated_calls", "latency", "by_role")
+
+    def __init__(self) -> None:
+        self.calls = self.errors = self.retries = self.fallback_calls = self.cached = 0
+        self.prompt_tokens = self.completion_tokens = self.estimated_calls = 0
+        self.latency = LatencyHistogram()
+        self.by_role: Dict[str, int] = {}
+
+
+class LLMStats:
+    """Process-wide per-model aggregates of LLMCall records."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: Dict[str, _ModelStats] = {}
+
+    def record(self, call: LLMCall) -> None:
+        with self._lock:
+            stats = self._models.get(call.model)
+            if stats is None:
+                stats = self._models[call.model] = _ModelStats()
+            stats.calls += 1
+            stats.errors += call.status != "ok"
+            stats.retries += call.retries
+            stats.fallback_calls += call.fallback
+            stats.cached += call.cached
+            stats.prompt_tokens += call.prompt_tokens
+            stats.completion_tokens += call.completion_tokens
+            stats.estimated_calls += call.tokens_estimated
+            stats.by_role[call.role] = stats.by_role.get(call.role, 0) + 1
+            if call.status == "ok":
+                stats.latency.observe(call.latency_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                model: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "retries": s.retries,
+                    "fallback_calls": s.fallback_calls,
+                    "cached": s.cached,
+                    "prompt_tokens": s.prompt_tokens,
+                    "completion_tokens": s.completion_tokens,
+                    "estimated_calls": s.estimated_calls,
+                    "by_role": dict(s.by_role),
+                    "latency_ms": s.latency.snapshot(),
+                }
+                for model, s in self._models.items()
+            }
+
+
+def summarize_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals over a run's llm_calls (as stored on RunOutcome)."""
+    return {
+        "calls": len(calls),
+        "retries": sum(c["retries"] for c in calls),
+        "fallback_calls": sum(1 for c in calls if c["fallback"]),
+        "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+        "completion_tokens": sum(c["completion_tokens"] for c in calls),
+        "latency_ms": round(sum(c["latency_ms"] for c in calls), 1),
+    }
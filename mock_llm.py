@@ -1,21 +1,59 @@
+import asyncio
+import os
+import re
+import time
 from dataclasses import dataclass
-from typing import List
+from typing import AsyncIterator, List, Optional
+
+from agent.llm.backend import BaseBackend
 
 @dataclass
 class Msg:
     role: str
     content: str
 
-class MockLLM:
+class MockLLM(BaseBackend):
     """
     Deterministic planner/executor for offline testing.
-    - Planner returns tool calls based on keywords.
+    - Planner returns tool calls based on keywords; a request with several
+      intents gets one {"tools": [...]} multi-call turn.
     - Executor returns a simple final response using tool logs.
+    - Optional simulated latency (MOCK_LLM_LATENCY_MS) for load benchmarks.
+    - Implements LLMBackend (generate/agenerate/stream/astream take message dicts).
     """
-    def __init__(self, mode: str):
+    name = "mock"
+
+    def __init__(self, mode: str, latency_sec: Optional[float] = None):
+        super().__init__(model=f"mock-{mode}")
         self.mode = mode  # "planner" or "executor"
+        if latency_sec is None:
+            latency_sec = float(os.getenv("MOCK_LLM_LATENCY_MS", "0")) / 1000.0
+        self.latency_sec = latency_sec
 
     def chat(self, messages: List[Msg]) -> str:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        return self._respond(messages)
+
+    # -- LLMBackend primitives --
+    def _generate(self, messages, model, temperature):
+        return self.chat([Msg(m["role"], m["content"]) for m in messages]), None, None
+
+    async def _agenerate(self, messages, model, temperature):
+        """Simulated latency does not block the event loop."""
+        if self.latency_sec:
+            await asyncio.sleep(self.latency_sec)
+        return self._respond([Msg(m["role"], m["content"]) for m in messages]), None, None
+
+    async def _astream(self, messages, model, temperature) -> AsyncIterator[str]:
+        """Yields the response word by word."""
+        if self.latency_sec:
+            await asyncio.sleep(self.latency_sec)
+        for chunk in re.findall(r"\S+\s*|\s+", self._respond([Msg(m["role"], m["content"]) for m in messages])):
+            yield chunk
+            await asyncio.sleep(0)
+
+    def _respond(self, messages: List[Msg]) -> str:
         user_text = ""
         for m in reversed(messages):
             if m.role == "user":
@@ -53,19 +91,21 @@ class MockLLM:
                 # If memory trigger but no specific pattern, still try to save
                 return '{"tool":"save_memory","args":{"kind":"preference","text":"User preference or instruction","importance":3}}'
             
-            if "read" in t and "ping.txt" in t:
-                return '{"tool":"read_file","args":{"path":"ping.txt"}}'
+            # Every intent in the request; several independent ones go out as one multi-call turn
+            calls = []
+            if "read" in t:
+                for path in re.findall(r"[\w./-]+\.(?:txt|md|py|json|csv|log)\b", user_text):
+                    calls.append(f'{{"tool":"read_file","args":{{"path":"{path}"}}}}')
             if "calculate" in t or "multiply" in t or "*" in t:
                 # Extract simple math expressions
-                import re
                 match = re.search(r'(\d+)\s*[\*x×]\s*(\d+)', user_text)
                 if match:
                     expr = f"{match.group(1)} * {match.group(2)}"
-                    return f'{{"tool":"calculator","args":{{"expression":"{expr}"}}}}'
+                    calls.append(f'{{"tool":"calculator","args":{{"expression":"{expr}"}}}}')
             if "time" in t or "date" in t:
-                return '{"tool":"current_time","args":{}}'
+                calls.append('{"tool":"current_time","args":{}}')
             if "list" in t and "file" in t:
-                return '{"tool":"list_files","args":{"path":"."}}'
+                calls.append('{"tool":"list_files","args":{"path":"."}}')
             if "weather" in t:
                 # Try to extract location
                 words = user_text.split()
@@ -73,7 +113,12 @@ class MockLLM:
                     if word.lower() in ["in", "at", "for"]:
                         if i + 1 < len(words):
                             location = words[i + 1].strip(".,!?")
-                            return f'{{"tool":"weather","args":{{"location":"{location}"}}}}'
+                            calls.append(f'{{"tool":"weather","args":{{"location":"{location}"}}}}')
+                            break
+            if len(calls) == 1:
+                return calls[0]
+            if calls:
+                return '{"tools":[' + ",".join(calls) + ']}'
             return '{"final":"Answer the user using available info."}'
 
         # executor
@@ -0,0 +1,103 @@
+"""
+Token budgets for tool results in planner and executor prompts.
+
+- Every tool log gets a stable ref for the run (r1, r2, ...)
+- compact_result(): clips a result to its tool's per-role cap, keeping the
+  head, the tail (command output: errors come last) or both, and says how
+  to get the rest
+- format_tool_logs(): the executor's tool log block under a total budget;
+  the newest results keep their full cap, older ones shrink first
+- tool_detail(): the tool_detail pseudo-tool the planner calls with a ref
+  and offset to read past a clip
+"""
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from context_window import CHARS_PER_TOKEN, estimate_tokens
+
+DETAIL_TOOL = "tool_detail"
+DETAIL_TOKENS = 800      # slice returned per tool_detail call
+GIST_TOKENS = 40         # what is left of an old result once the executor budget is spent
+
+
+class ToolRule(NamedTuple):
+    planner_tokens: int
+    executor_tokens: int
+    keep: str = "head"   # "head" / "tail" / "head_tail"
+
+
+TOOL_RULES: Dict[str, ToolRule] = {
+    "read_file": ToolRule(300, 1000, "head_tail"),
+    "run_command": ToolRule(250, 800, "tail"),
+    "list_files": ToolRule(200, 500, "head"),
+    "web_search": ToolRule(250, 600, "head"),
+}
+DEFAULT_RULE = ToolRule(200, 500, "head")
+
+
+def ref_for(index: int) -> str:
+    return f"r{index + 1}"
+
+
+def _marker(ref: str, omitted: int, offset: int) -> str:
+    return f'[... {omitted} chars omitted; {DETAIL_TOOL} {{"ref": "{ref}", "offset": {offset}}} for more ...]'
+
+
+def clip_result(ref: str, result: str, max_tokens: int, keep: str = "head") -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(result) <= max_chars:
+        return result
+    omitted = len(result) - max_chars
+    if keep == "tail":
+        return f"{_marker(ref, omitted, 0)}\n{result[-max_chars:]}"
+    if keep == "head_tail":
+        half = max_chars // 2
+        return f"{result[:half]}\n{_marker(ref, omitted, half)}\n{result[len(result) - half:]}"
+    return f"{result[:max_chars]}\n{_marker(ref, omitted, max_chars)}"
+
+
+def compact_result(ref: str, tool: str, result: Any, role: str) -> str:
+    """`result` clipped to the tool's cap for `role` ("planner" or "executor")."""
+    rule = TOOL_RULES.get(tool, DEFAULT_RULE)
+    cap = rule.planner_tokens if role == "planner" else rule.executor_tokens
+    return clip_result(ref, str(result), cap, rule.keep)
+
+
+def format_tool_logs(tool_logs: List[Dict[str, Any]], budget_tokens: int) -> Tuple[str, Dict[str, int]]:
+    """
+    Executor tool log block, one line per log with its ref. Returns the text
+    and {"tokens", "full_tokens", "clipped"} so callers can trace the saving.
+    """
+    lines = [""] * len(tool_logs)
+    used = full = clipped = 0
+    for i in range(len(tool_logs) - 1, -1, -1):
+        log = tool_logs[i]
+        ref = log.get("ref") or ref_for(i)
+        result = str(log["result"])
+        head = f"- [{ref}] {log['name']}({log['arguments']}): "
+        body = compact_result(ref, log["name"], result, "executor")
+        if used + estimate_tokens(head + body) > budget_tokens and used:
+            body = clip_result(ref, result, GIST_TOKENS)
+        clipped += body != result
+        lines[i] = head + body
+        used += estimate_tokens(lines[i])
+        full += estimate_tokens(head + result)
+    return "\n".join(lines), {"tokens": used, "full_tokens": full, "clipped": clipped}
+
+
+def tool_detail(tool_logs: List[Dict[str, Any]], ref: str, offset: Any = 0, max_tokens: int = DETAIL_TOKENS) -> str:
+    """The next `max_tokens` of the full result behind `ref`, starting at `offset` chars."""
+    try:
+        offset = int(offset or 0)
+    except (TypeError, ValueError):
+        offset = 0
+    log = next((log for i, log in enumerate(tool_logs) if (log.get("ref") or ref_for(i)) == ref), None)
+    if log is None:
+        known = ", ".join(log.get("ref") or ref_for(i) for i, log in enumerate(tool_logs)) or "none"
+        return f"Unknown ref '{ref}' (known: {known})"
+    result = str(log["result"])
+    offset = max(0, min(offset, len(result)))
+    end = offset + max_tokens * CHARS_PER_TOKEN
+    text = f"[{ref} {log['name']}: chars {offset}-{min(end, len(result))} of {len(result)}]\n{result[offset:end]}"
+    if end < len(result):
+        text += "\n" + _marker(ref, len(result) - end, end)
+    return text
@@ -0,0 +1,403 @@
+"""
+SQLite access layer for assistant.db.
+
+- One connection per thread, opened lazily and reused for the life of the thread
+- WAL journaling + tuned pragmas (readers never block the writer)
+- Prepared statements cached per connection (sqlite3 `cached_statements`)
+- transaction() helper: nested blocks join the outer transaction, so a whole
+  /chat turn can commit once
+- GroupCommitWriter: write-behind thread that batches inserts from all
+  requests into one transaction every few milliseconds
+- UsageAggregator: counts hits per row id in memory and flushes them as one
+  executemany through the writer
+- migrate(): numbered schema migrations tracked in PRAGMA user_version
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Op = Tuple[str, Sequence[Any]]  # (sql, params)
+Migration = Tuple[int, str, Callable[[sqlite3.Connection], None]]  # (version, description, apply)
+
+
+class ExecuteMany(list):
+    """Params wrapper: an Op whose params are an ExecuteMany runs via conn.executemany()."""
+
+
+DEFAULT_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",    # safe with WAL; fsync at checkpoint instead of every commit
+    "cache_size": -16000,       # negative = KiB -> 16 MB page cache per connection
+    "mmap_size": 268435456,     # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # ms to wait on a locked database instead of failing
+}
+
+
+def column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def migrate(pool: "SQLitePool", migrations: List[Migration]) -> List[int]:
+    """
+    Apply every migration newer than the database's PRAGMA user_version, in
+    version order, each in its own transaction together with the version bump.
+    Returns the versions applied.
+    """
+    applied = []
+    for version, description, apply in sorted(migrations, key=lambda m: m[0]):
+        with pool.transaction() as conn:
+            # Re-read inside the write lock so concurrent starters don't both apply it
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version={int(version)}")
+        print(f"📦 Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection owned by SQLitePool.
+    close() is a no-op so legacy `conn = db(); ...; conn.close()` code keeps working
+    without tearing down the shared per-thread connection.
+    """
+
+    def close(self) -> None:
+        pass
+
+    def force_close(self) -> None:
+        super().close()
+
+
+class SQLitePool:
+    """Per-thread connection pool for a single SQLite database file."""
+
+    def __init__(
+        self,
+        path: str,
+        pragmas: Optional[Dict[str, Any]] = None,
+        cached_statements: int = 256,
+        timeout: float = 5.0,
+    ) -> None:
+        self.path = str(path)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[PooledConnection] = []
+        self._stats = {"connections_opened": 0, "commits": 0, "rollbacks": 0}
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=None,       # autocommit; transactions are explicit via transaction()
+            check_same_thread=False,    # only close_all() touches it from another thread
+            cached_statements=self.cached_statements,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self._connections.append(conn)
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def connection(self) -> PooledConnection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[PooledConnection]:
+        """
+        BEGIN IMMEDIATE ... COMMIT on this thread's connection.
+        Nested calls join the outermost transaction; only it commits or rolls back.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            with self._lock:
+                self._stats["rollbacks"] += 1
+            raise
+        else:
+            conn.commit()
+            with self._lock:
+                self._stats["commits"] += 1
+        finally:
+            self._local.depth = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "open_connections": len(self._connections)}
+
+    def close_all(self) -> None:
+        """Close every pooled connection (shutdown / tests)."""
+        with self._lock:
+            conns, self._connections = self._connections, []
+        for conn in conns:
+            try:
+                conn.force_close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+class GroupCommitWriter:
+    """
+    Write-behind writer for a SQLitePool.
+
+    submit()/submit_many() enqueue statements and return at once. A single
+    background thread drains the queue and commits everything pending in one
+    transaction as soon as `max_batch` statements are waiting or `max_delay`
+    seconds have passed since the first one, so N concurrent requests share
+    one fsync instead of paying one each.
+
+    Each submit returns a sequence number; flush(seq) is the read-your-writes
+    barrier (returns once that write - or everything, if seq is None - is committed).
+    close() flushes and stops the thread; it is also registered with atexit.
+    Listeners added with add_error_listener() are called with the ops of any
+    group that could not be committed (so caches of those writes can be dropped).
+    """
+
+    _STOP = object()
+
+    def __init__(self, pool: SQLitePool, max_batch: int = 256, max_delay: float = 0.005) -> None:
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._closed = False
+        self._stats = {"batches": 0, "statements": 0, "max_batch_seen": 0, "errors": 0}
+        self._error_listeners: List[Callable[[List[Op]], None]] = []
+        self._thread = threading.Thread(target=self._run, name="sqlite-group-commit", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add_error_listener(self, listener: Callable[[List[Op]], None]) -> None:
+        self._error_listeners.append(listener)
+
+    def submit(self, sql: str, params: Sequence[Any] = ()) -> int:
+        return self.submit_many([(sql, params)])
+
+    def submit_executemany(self, sql: str, rows: Sequence[Sequence[Any]]) -> int:
+        return self.submit_many([(sql, ExecuteMany(rows))])
+
+    def submit_many(self, ops: List[Op]) -> int:
+        """Enqueue statements that must commit together. Returns their sequence number."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter is closed")
+            self._submitted += 1
+            seq = self._submitted
+            self._queue.put((seq, list(ops)))
+        return seq
+
+    def flush(self, seq: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """Block until write `seq` (default: everything submitted so far) is committed."""
+        with self._cond:
+            target = self._submitted if seq is None else seq
+            if self._committed >= target:
+                return True
+        self._queue.put(("barrier", None))  # commit now instead of waiting out max_delay
+        with self._cond:
+            return self._cond.wait_for(lambda: self._committed >= target, timeout=timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, "pending": self._submitted - self._committed}
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[Tuple[int, List[Op]]] = []
+            stop = item is self._STOP
+            if not stop and item[0] != "barrier":
+                batch.append(item)
+                n = len(item[1])
+                deadline = time.monotonic() + self.max_delay
+                while n < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        nxt = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if nxt is self._STOP:
+                        stop = True
+                        break
+                    if nxt[0] == "barrier":
+                        break
+                    batch.append(nxt)
+                    n += len(nxt[1])
+            if stop:
+                # Drain whatever was queued before close()
+                while True:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is not self._STOP and nxt[0] != "barrier":
+                        batch.append(nxt)
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    @staticmethod
+    def _execute(conn: sqlite3.Connection, op: Op) -> None:
+        sql, params = op
+        if isinstance(params, ExecuteMany):
+            conn.executemany(sql, params)
+        else:
+            conn.execute(sql, params)
+
+    def _commit(self, batch: List[Tuple[int, List[Op]]]) -> None:
+        n = sum(len(ops) for _, ops in batch)
+        try:
+            with self.pool.transaction() as conn:
+                for _, ops in batch:
+                    for op in ops:
+                        self._execute(conn, op)
+        except Exception as e:
+            # One bad group must not drop everyone else's writes: retry group by group
+            print(f"⚠️  Group commit of {n} statements failed ({e}), retrying per group")
+            for seq, ops in batch:
+                try:
+                    with self.pool.transaction() as conn:
+                        for op in ops:
+                            self._execute(conn, op)
+                except Exception as group_err:
+                    with self._cond:
+                        self._stats["errors"] += 1
+                    print(f"⚠️  Dropped write #{seq}: {group_err}")
+                    for listener in self._error_listeners:
+                        try:
+                            listener(ops)
+                        except Exception:
+                            pass
+        with self._cond:
+            self._committed = max(self._committed, max(seq for seq, _ in batch))
+            self._stats["batches"] += 1
+            self._stats["statements"] += n
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], n)
+            self._cond.notify_all()
+
+
+class UsageAggregator:
+    """
+    In-memory hit counter for rows that are read far more often than they change.
+
+    record() only bumps a dict under a lock. Pending counts are handed to the
+    writer as a single executemany of `sql` every `flush_interval` seconds (by
+    a background timer thread, so a burst is written even if no further hits
+    arrive), as soon as `max_pending` distinct ids are waiting, and on
+    flush()/close(). `sql` receives (hits, last_ts, row_id) per row.
+    close() flushes and stops the timer; it is also registered with atexit
+    (before the writer's, so it runs first).
+    """
+
+    def __init__(
+        self,
+        writer: GroupCommitWriter,
+        sql: str,
+        flush_interval: float = 2.0,
+        max_pending: int = 1024,
+    ) -> None:
+        self.writer = writer
+        self.sql = sql
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: Dict[int, List[int]] = {}  # row_id -> [hits, last_ts]
+        self._last_flush = time.monotonic()
+        self._stats = {"recorded": 0, "flushes": 0, "rows_flushed": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="usage-aggregator", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                due = bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:  # writer closed under us; close() handles the rest
+                    print(f"⚠️  Usage flush failed: {e}")
+
+    def record(self, row_ids: Iterable[int], ts: Optional[int] = None) -> None:
+        ts = int(time.time()) if ts is None else ts
+        with self._lock:
+            for row_id in row_ids:
+                entry = self._pending.get(row_id)
+                if entry is None:
+                    self._pending[row_id] = [1, ts]
+                else:
+                    entry[0] += 1
+                    entry[1] = max(entry[1], ts)
+                self._stats["recorded"] += 1
+            due = len(self._pending) >= self.max_pending
+        if due:
+            self.flush()
+
+    def flush(self) -> Optional[int]:
+        """Queue all pending counts on the writer. Returns the writer sequence number, if any."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if not pending:
+                return None
+            self._stats["flushes"] += 1
+            self._stats["rows_flushed"] += len(pending)
+        rows = [(hits, ts, row_id) for row_id, (hits, ts) in pending.items()]
+        return self.writer.submit_executemany(self.sql, rows)
+
+    def close(self) -> Optional[int]:
+        """Stop the timer and queue whatever is pending."""
+        if self._stop.is_set():
+            return None
+        self._stop.set()
+        self._thread.join(timeout=5)
+        return self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
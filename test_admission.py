@@ -0,0 +1,62 @@
+"""Tests for /chat admission control (admission.py). Run: python test_admission.py"""
+import asyncio
+
+from admission import AdmissionController, AdmissionRejected
+
+
+async def _job(ctrl, thread_id, log, label, delay=0.05):
+    async with ctrl.admit(thread_id):
+        log.append(("start", label))
+        await asyncio.sleep(delay)
+        log.append(("end", label))
+
+
+def test_same_thread_runs_in_order():
+    async def main():
+        ctrl = AdmissionController(max_concurrent=8, max_queue=8)
+        log = []
+        await asyncio.gather(*(_job(ctrl, "t1", log, i) for i in range(4)))
+        return log
+    log = asyncio.run(main())
+    assert log == [(k, i) for i in range(4) for k in ("start", "end")]
+    print("✓ Same thread_id processed sequentially, in arrival order")
+
+
+def test_different_threads_run_in_parallel():
+    async def main():
+        ctrl = AdmissionController(max_concurrent=8, max_queue=8)
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        await asyncio.gather(*(_job(ctrl, f"t{i}", [], i, delay=0.1) for i in range(8)))
+        return loop.time() - t0
+    elapsed = asyncio.run(main())
+    assert elapsed < 0.3
+    print(f"✓ 8 threads ran concurrently ({elapsed:.2f}s)")
+
+
+def test_full_queue_rejected_with_retry_after():
+    async def main():
+        ctrl = AdmissionController(max_concurrent=1, max_queue=2)
+        tasks = [asyncio.create_task(_job(ctrl, f"t{i}", [], i, delay=0.1)) for i in range(3)]
+        await asyncio.sleep(0.01)  # 1 running, 2 queued
+        stats = ctrl.stats()
+        try:
+            await ctrl.acquire("t9")
+            rejected = None
+        except AdmissionRejected as e:
+            rejected = e
+        await asyncio.gather(*tasks)
+        return stats, rejected, ctrl.stats()
+    busy, rejected, after = asyncio.run(main())
+    assert busy["in_flight"] == 1 and busy["queue_depth"] == 2
+    assert rejected is not None and rejected.retry_after >= 1
+    assert after["rejected"] == 1 and after["admitted"] == 3 and after["active_threads"] == 0
+    assert after["wait_ms_max"] >= 150
+    print(f"✓ Full queue -> rejected (Retry-After {rejected.retry_after}s), stats={after}")
+
+
+if __name__ == "__main__":
+    test_same_thread_runs_in_order()
+    test_different_threads_run_in_parallel()
+    test_full_queue_rejected_with_retry_after()
+    print("\n✅ Admission control working!")
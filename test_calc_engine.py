@@ -0,0 +1,72 @@
+"""Tests for the calculator engine (calc_engine.py). Run: python test_calc_engine.py"""
+import os
+import time
+
+os.environ["LLM_MODE"] = "mock"
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+import tools
+from calc_engine import CalcError, compile_expression, evaluate, evaluate_many
+
+
+def test_arithmetic_matches_python():
+    cases = ["50 * 20", "2 + 3 * 4", "(2 + 3) * 4", "10 / 4", "10 // 4", "10 % 4", "-3 ** 2", "2 ** -2",
+             "1.5 * 2", "2 ** 10 ** 2", "((((1))))", "+7 - -3"]
+    for expr in cases:
+        assert evaluate(expr) == eval(expr), expr
+    assert tools.calculator("50 * 20") == "1000" and tools.calculator("10 / 2") == "5.0"
+    print(f"✓ {len(cases)} expressions evaluate as Python would")
+
+
+def test_rejects_and_limits():
+    rejected = {
+        "__import__('os')": "unsupported",
+        "x + 1": "unsupported",
+        "(1).__class__": "unsupported",
+        "1 < 2": "unsupported",
+        "'a' * 3": "unsupported",
+        "9 ** 9 ** 9": "exponent too large",
+        "10 ** 5000": "exponent too large",
+        "7 ** 999 * 7 ** 999": "result too large",
+        "1e308 * 10": "result too large",
+        "10.0 ** 400": "result too large",
+        "(-8) ** 0.5": "not a real number",
+        "1 / 0": "division by zero",
+        "1 +": "invalid expression",
+        "1" + "+1" * 300: "too long",
+        "-" * 60 + "1": "nested",
+    }
+    t0 = time.perf_counter()
+    for expr, message in rejected.items():
+        try:
+            evaluate(expr)
+            raise AssertionError(f"accepted {expr!r}")
+        except CalcError as e:
+            assert message in str(e), (expr, str(e))
+    elapsed = time.perf_counter() - t0
+    assert elapsed < 0.5
+    assert tools.calculator("9**9**9").startswith("Error: exponent too large")
+    print(f"✓ {len(rejected)} hostile or oversized inputs refused in {elapsed * 1000:.1f}ms")
+
+
+def test_compiled_cache_and_batch():
+    compile_expression.cache_clear()
+    for _ in range(100):
+        evaluate("12 * (3 + 4)")
+    info = compile_expression.cache_info()
+    assert info.misses == 1 and info.hits == 99
+    assert evaluate_many(["1 + 1", "2 ** 8", "1 / 0"]) == ["2", "256", "Error: division by zero"]
+    out = tools.calculator(expressions=["6 * 7", "x"])
+    assert out.split("\n")[0] == "6 * 7 = 42" and out.split("\n")[1].startswith("x = Error: unsupported")
+    assert tools.calculator(expressions=["1"] * 51).startswith("Error: too many expressions")
+    for bad in ("1+2", ("1+2",), ["1+2", 3], {"e": "1+2"}):
+        assert tools.calculator(expressions=bad) == "Error: expressions must be a list of strings"
+    assert tools.calculator("1+2", expressions=[]) == "3"
+    print("✓ Compiled expressions cached (99/100 hits); batch evaluation with per-expression errors")
+
+
+if __name__ == "__main__":
+    test_arithmetic_matches_python()
+    test_rejects_and_limits()
+    test_compiled_cache_and_batch()
+    print("\n✅ Calculator engine working!")
@@ -0,0 +1,85 @@
+"""Tests for the /chat/stream server-sent events endpoint. Run: python test_chat_stream.py"""
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app_testing import app, fresh_app
+
+REQUEST = "What time is it?"
+
+
+def fixed_time() -> str:
+    return "Saturday, October 17, 2026 at 09:30 AM"
+
+
+def parse_sse(text):
+    """[(event, data dict), ...] from a text/event-stream body."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def stable(body):
+    """Response body without the per-run timing, which differs between two runs."""
+    body = {k: v for k, v in body.items() if k != "type"}
+    body["llm"] = {k: v for k, v in body["llm"].items() if k != "latency_ms"}
+    return body
+
+
+def test_stream_event_order_and_done_matches_chat():
+    with fresh_app(TOOLS={**app.TOOLS, "current_time": fixed_time}):
+        client = TestClient(app.app)
+        body = client.post("/chat", json={"thread_id": "t-chat", "user_message": REQUEST}).json()
+        with client.stream("POST", "/chat/stream", json={"thread_id": "t-stream", "user_message": REQUEST}) as r:
+            assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+            events = parse_sse("".join(r.iter_text()))
+
+    types = [t for t, _ in events]
+    milestones = [t for t in types if t in ("run_start", "planner_routing", "tool_result", "executor_token", "done")]
+    first_token = milestones.index("executor_token")
+    assert milestones[:first_token] == ["run_start", "planner_routing", "tool_result"]
+    assert set(milestones[first_token:-1]) == {"executor_token"} and len(milestones[first_token:-1]) > 1
+    assert types[-1] == "done" and types.count("done") == 1
+    assert all(data["type"] == t for t, data in events)
+
+    tool_result = events[types.index("tool_result")][1]
+    assert tool_result["tool"] == "current_time" and tool_result["status"] == "ok"
+
+    done = events[-1][1]
+    tokens = "".join(data["text"] for t, data in events if t == "executor_token")
+    assert tokens == done["assistant_message"] and fixed_time() in tokens
+    assert stable(done) == stable(body)
+    print(f"✓ /chat/stream: {len(types)} events, {types.count('executor_token')} tokens, done == /chat body")
+
+
+def test_memory_gate_does_not_delay_first_event():
+    async def slow_gate(user_message):
+        await asyncio.sleep(0.5)
+        return {"key": "City", "value": "Paris", "importance": 5}
+
+    first_event = []
+
+    def on_event(event):
+        if not first_event:
+            first_event.append((event["type"], time.perf_counter() - t0))
+
+    with fresh_app(should_save_memory=slow_gate):
+        t0 = time.perf_counter()
+        result = asyncio.run(app.run_chat_turn(
+            app.ChatRequest(thread_id="t-gate", user_message="I live in Paris"), on_event=on_event
+        ))
+        app.writer.flush()
+        saved = [r["text"] for r in app.db().execute("SELECT text FROM memories")]
+    assert result["status"] == "ok" and first_event[0][0] == "run_start" and first_event[0][1] < 0.25
+    assert saved == ["City: Paris"]
+    print(f"✓ run_start after {first_event[0][1] * 1000:.0f}ms with a 500ms memory gate; its memory still saved")
+
+
+if __name__ == "__main__":
+    test_stream_event_order_and_done_matches_chat()
+    test_memory_gate_does_not_delay_first_event()
+    print("\n✅ Chat streaming endpoint working!")
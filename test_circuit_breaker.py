@@ -0,0 +1,115 @@
+"""Tests for per-provider LLM circuit breakers (agent/llm/circuit_breaker.py). Run: python test_circuit_breaker.py"""
+import asyncio
+import time
+
+from app_testing import app
+from agent.llm.circuit_breaker import BreakerRegistry, CircuitBreaker, CircuitOpen
+from mock_llm import MockLLM
+
+
+class DeadLLM(MockLLM):
+    def __init__(self):
+        super().__init__("planner", latency_sec=0)
+        self.calls = 0
+
+    async def _agenerate(self, messages, model, temperature):
+        self.calls += 1
+        raise ConnectionError("connection refused")
+
+
+def test_state_transitions():
+    breaker = CircuitBreaker("ollama/m", failure_rate=0.5, min_calls=3, open_sec=0.05)
+    breaker.acquire(); breaker.record_success()
+    breaker.acquire(); breaker.record_failure()
+    assert breaker.state == "closed"  # below min_calls
+    breaker.acquire(); breaker.record_failure()
+    assert breaker.state == "open"  # 2 of 3 failed
+    try:
+        breaker.acquire()
+        assert False, "expected CircuitOpen"
+    except CircuitOpen as e:
+        assert e.retry_after > 0
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.acquire()  # the probe
+    try:
+        breaker.acquire()
+        assert False, "only one probe at a time"
+    except CircuitOpen:
+        pass
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    breaker.acquire()
+    breaker.release()  # abandoned probe frees the slot
+    breaker.acquire()
+    breaker.record_success()
+    stats = breaker.stats()
+    assert stats["state"] == "closed" and stats["opened"] == 2 and stats["rejected"] == 2
+    print("✓ closed -> open -> half_open -> open -> half_open -> closed")
+
+
+def test_open_breaker_fails_fast():
+    saved = app.llm_breakers
+    app.llm_breakers = BreakerRegistry(min_calls=3, open_sec=60)
+    dead = DeadLLM()
+    try:
+        async def run():
+            for _ in range(3):
+                try:
+                    await app.call_llm_with_retries([{"role": "user", "content": "hi"}], llm_client=dead, model="m", max_retries=0)
+                except ConnectionError:
+                    pass
+            t0 = time.perf_counter()
+            try:
+                await app.call_llm_with_retries([{"role": "user", "content": "hi"}], llm_client=dead, model="m")
+                assert False, "expected CircuitOpen"
+            except CircuitOpen:
+                return time.perf_counter() - t0
+
+        elapsed = asyncio.run(run())
+        assert dead.calls == 3 and elapsed < 0.05
+        metrics = app.metrics()["circuit_breakers"]
+        assert metrics[0]["name"] == "mock/m" and metrics[0]["state"] == "open"
+    finally:
+        app.llm_breakers = saved
+    print(f"✓ Open breaker rejects in {elapsed * 1000:.2f}ms without calling the provider")
+
+
+def test_planner_skips_dead_primary():
+    saved = (app.ROUTING_POLICY, app.LLM_MODE, app.planner_llm, app.planner_model_name, app.create_llm_from_policy, app.llm_breakers)
+    app.ROUTING_POLICY = {
+        "planner": {
+            "primary": {"provider": "ollama", "model": "dead"},
+            "fallback": {"provider": "openai_compat", "model": "mock-planner"},
+        },
+        "executor": {"primary": {"provider": "openai_compat", "model": "mock-executor"}},
+        "rules": {"use_strong_executor_if": {"min_user_chars": 10000, "contains_any": []}},
+    }
+    app.LLM_MODE = "live"
+    app.planner_llm, app.planner_model_name = DeadLLM(), "dead"
+    app.create_llm_from_policy = lambda entry: (MockLLM("planner"), entry["model"])
+    app.llm_breakers = BreakerRegistry(min_calls=1, open_sec=60)
+    app.llm_breakers.get("mock", "dead").record_failure()
+    try:
+        events = []
+        t0 = time.perf_counter()
+        outcome = asyncio.run(app.run_agent_loop({}, [{"role": "user", "content": "hello"}], on_event=events.append))
+        elapsed = time.perf_counter() - t0
+    finally:
+        (app.ROUTING_POLICY, app.LLM_MODE, app.planner_llm, app.planner_model_name,
+         app.create_llm_from_policy, app.llm_breakers) = saved
+    routing = next(e for e in events if e["type"] == "planner_routing")
+    fallback = next(e for e in events if e["type"] == "planner_fallback")
+    assert outcome.status == "ok" and routing["breaker"] == "open" and routing["fallback_breaker"] == "closed"
+    assert fallback["circuit_open"] and elapsed < 1.0
+    print(f"✓ Planner went straight to the fallback ({elapsed * 1000:.0f}ms run)")
+
+
+if __name__ == "__main__":
+    test_state_transitions()
+    test_open_breaker_fails_fast()
+    test_planner_skips_dead_primary()
+    print("\n✅ Circuit breakers working!")
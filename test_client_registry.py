@@ -0,0 +1,85 @@
+"""Tests for the process-wide LLM client registry. Run: python test_client_registry.py"""
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app_testing import app
+from agent.llm.client_registry import ClientRegistry
+
+
+class _ChatStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "x", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_same_route_same_client():
+    reg = ClientRegistry()
+    a = reg.get("openai", api_key="k1")
+    assert reg.get("openai", api_key="k1") is a
+    assert reg.get("openai", api_key="k2") is not a
+    assert reg.get("ollama", base_url="http://h1/v1") is not reg.get("ollama", base_url="http://h2/v1")
+    assert reg.get("openai", api_key="k1", flavor="sync") is not a
+    stats = reg.stats()
+    assert stats["clients"] == 5 and stats["hits"] == 1
+    assert "k1" not in json.dumps(stats)
+    print("✓ Clients cached by (provider, base_url, key, flavor); keys never exposed")
+
+
+def test_fallback_reuses_pooled_client():
+    os.environ["OLLAMA_BASE_URL"] = "http://127.0.0.1:1/v1"
+    first, _ = app.create_llm_from_policy({"provider": "ollama", "model": "m"})
+    again, _ = app.create_llm_from_policy({"provider": "ollama", "model": "m"})
+    assert first._async_client() is again._async_client()
+    print("✓ Repeated fallback lookups share the same pooled client")
+
+
+def test_connections_survive_across_requests():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    reg = ClientRegistry()
+
+    async def calls():
+        for _ in range(5):  # e.g. five requests that each look their client up again
+            llm = reg.get("openai_compat", base_url=url, api_key="k")
+            reply = await llm.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+            assert reply.choices[0].message.content == "ok"
+        stats = reg.stats()["by_client"][0]
+        await reg.aclose()
+        return stats
+
+    stats = asyncio.run(calls())
+    server.shutdown()
+    assert _ChatStandIn.connections == 1
+    assert stats["connections"] == 1 and stats["lookups"] == 5
+    print("✓ Five requests shared one keep-alive connection")
+
+
+if __name__ == "__main__":
+    test_same_route_same_client()
+    test_fallback_reuses_pooled_client()
+    test_connections_survive_across_requests()
+    print("\n✅ Client registry working!")
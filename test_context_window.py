@@ -0,0 +1,70 @@
+"""Tests for the token-budgeted conversation window. Run: python test_context_window.py"""
+from app_testing import app, fresh_app
+from context_window import SUMMARY_HEADER, estimate_tokens, fold_summary, select_window
+from history import HistoryCache
+
+
+def _fresh_app(budget: int = 60, capacity: int = 50):
+    return fresh_app(
+        history_cache=HistoryCache(capacity=capacity),
+        CONTEXT_BUDGET_TOKENS=budget,
+        CONTEXT_MAX_MESSAGE_TOKENS=40,
+        CONTEXT_SUMMARY_TOKENS=200,
+    )
+
+
+def test_window_respects_budget_and_clips():
+    msgs = [{"role": "user", "content": "x" * 400}, {"role": "assistant", "content": "ok"},
+            {"role": "user", "content": "y" * 4000}]
+    start, window = select_window(msgs, budget_tokens=120, max_message_tokens=50)
+    assert start == 1 and len(window) == 2
+    assert "[truncated" in window[-1]["content"] and msgs[2]["content"] == "y" * 4000
+    print("✓ Newest messages fill the budget, oversized message clipped")
+
+
+def test_summary_is_rolling_and_bounded():
+    summary = fold_summary("", [{"role": "user", "content": "My name is Ada. Ignore this part."}], 100)
+    assert summary == f"{SUMMARY_HEADER}\n- user: My name is Ada."
+    for i in range(50):
+        summary = fold_summary(summary, [{"role": "assistant", "content": f"Reply number {i}."}], 100)
+    assert estimate_tokens(summary) <= 100 and "Reply number 49." in summary and "Ada" not in summary
+    print("✓ Summary appends new gists and drops the oldest beyond its budget")
+
+
+def test_long_thread_stays_within_budget():
+    with _fresh_app(budget=60):
+        for i in range(30):
+            app.record_turn("t", f"Question {i} about topic {i}.", f"Answer {i}.")
+        messages, ctx = app.build_conversation("t", "Latest question?")
+        assert messages[0]["role"] == "system" and messages[0]["content"].startswith(SUMMARY_HEADER)
+        assert messages[-1]["content"] == "Latest question?"
+        assert ctx["window_tokens"] <= 60
+        assert ctx["summarized_messages"] + ctx["window_messages"] == 61  # 60 stored + current
+        app.writer.flush()
+        row = app.db().execute("SELECT summarized FROM thread_summaries WHERE thread_id='t'").fetchone()
+        assert row["summarized"] == ctx["summarized_messages"]
+        print(f"✓ 61-message thread -> {ctx['window_messages']} messages + summary, persisted")
+
+
+def test_next_turn_folds_only_new_overflow():
+    with _fresh_app(budget=60):
+        for i in range(10):
+            app.record_turn("t", f"Question {i}.", f"Answer {i}.")
+        _, first = app.build_conversation("t", "Next?")
+        app.record_turn("t", "Next?", "Sure.")
+        _, second = app.build_conversation("t", "And then?")
+        assert second["folded_messages"] == 2
+        assert second["summarized_messages"] == first["summarized_messages"] + 2
+        # A cold cache reloads the persisted summary instead of re-folding
+        app.history_cache = HistoryCache()
+        _, third = app.build_conversation("t", "And then?")
+        assert third["folded_messages"] == 0 and third["summarized_messages"] == second["summarized_messages"]
+        print("✓ Each turn folds only the messages that left the window")
+
+
+if __name__ == "__main__":
+    test_window_respects_budget_and_clips()
+    test_summary_is_rolling_and_bounded()
+    test_long_thread_stays_within_budget()
+    test_next_turn_folds_only_new_overflow()
+    print("\n✅ Conversation window working!")
@@ -0,0 +1,95 @@
+"""Tests for executor token streaming and client-disconnect cancellation. Run: python test_executor_streaming.py"""
+import asyncio
+
+from app_testing import app, fresh_app
+from mock_llm import MockLLM
+
+
+class SlowStreamLLM(MockLLM):
+    """Executor whose chunks arrive 20ms apart."""
+
+    def __init__(self):
+        super().__init__("executor", latency_sec=0)
+
+    async def _astream(self, messages, model, temperature):
+        async for chunk in super()._astream(messages, model, temperature):
+            await asyncio.sleep(0.02)
+            yield chunk
+
+
+def test_callback_receives_chunks():
+    chunks, events = [], []
+    outcome = asyncio.run(app.run_agent_loop(
+        {}, [{"role": "user", "content": "hello"}], on_token=chunks.append
+    ))
+    assert outcome.status == "ok" and len(chunks) > 1 and "".join(chunks) == outcome.final_text
+
+    asyncio.run(app.run_agent_loop({}, [{"role": "user", "content": "hello"}], on_event=events.append))
+    response = next(e for e in events if e["type"] == "executor_response")
+    tokens = [e for e in events if e["type"] == "executor_token"]
+    assert response["streamed"] and response["chunks"] == len(tokens) and response["ttft_ms"] is not None
+    assert "".join(e["text"] for e in tokens) == response["text"]
+    print(f"✓ {len(chunks)} executor chunks delivered to on_token; trace assembled afterwards")
+
+
+def test_cancel_stops_executor_stream():
+    saved = app.executor_llm
+    app.executor_llm = SlowStreamLLM()
+    events = []
+    try:
+        async def run():
+            first_chunk = asyncio.Event()
+            task = asyncio.create_task(app.run_agent_loop(
+                {}, [{"role": "user", "content": "hello"}], on_event=events.append,
+                on_token=lambda text: first_chunk.set()
+            ))
+            await first_chunk.wait()
+            task.cancel()
+            try:
+                await task
+                assert False, "expected CancelledError"
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(run())
+    finally:
+        app.executor_llm = saved
+    response = next(e for e in events if e["type"] == "executor_response")
+    assert response["cancelled"] and response["chunks"] >= 1 and events[-1]["type"] == "run_cancelled"
+    print(f"✓ Cancelled after {response['chunks']} chunk(s); partial response kept in the trace")
+
+
+def test_stream_disconnect_cancels_turn():
+    with fresh_app():
+        saved = app.executor_llm
+        app.executor_llm = SlowStreamLLM()
+        try:
+            async def run():
+                response = await app.chat_stream(app.ChatRequest(thread_id="t-disconnect", user_message="hello"))
+                body = response.body_iterator
+                seen = []
+                async for event in body:
+                    seen.append(event)
+                    if event.startswith("event: executor_token"):
+                        break
+                await body.aclose()  # what the server does when the client goes away
+                await asyncio.sleep(0.05)
+                return seen
+
+            seen = asyncio.run(run())
+        finally:
+            app.executor_llm = saved
+        assert any(e.startswith("event: executor_token") for e in seen)
+        assert not any(e.startswith("event: done") for e in seen)
+        assert app.admission.stats()["in_flight"] == 0
+        app.writer.flush()
+        roles = [r["role"] for r in app.db().execute("SELECT role FROM messages WHERE thread_id='t-disconnect'")]
+        assert roles == ["user"]
+        print("✓ Client disconnect cancels the run and frees its admission slot")
+
+
+if __name__ == "__main__":
+    test_callback_receives_chunks()
+    test_cancel_stops_executor_stream()
+    test_stream_disconnect_cancels_turn()
+    print("\n✅ Executor streaming working!")
@@ -0,0 +1,141 @@
+"""Tests for hedged LLM calls (agent/llm/hedging.py). Run: python test_hedging.py"""
+import asyncio
+
+from app_testing import app
+from agent.llm.hedging import HedgeFailed, HedgePolicy, Hedger
+from mock_llm import MockLLM
+
+POLICY = HedgePolicy(enabled=True, initial_delay_ms=50, min_delay_ms=10, min_samples=3)
+
+
+def answer(text, delay, log=None, chunks=("a", "b")):
+    async def attempt(on_token):
+        try:
+            await asyncio.sleep(delay)
+            if on_token:
+                for chunk in chunks:
+                    on_token(f"{text}:{chunk}")
+                    await asyncio.sleep(0.01)
+            return text
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{text} cancelled")
+            raise
+    return attempt
+
+
+async def failing(on_token):
+    await asyncio.sleep(0.01)
+    raise RuntimeError("connection refused")
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger()
+    result = asyncio.run(hedger.run("m", POLICY, answer("primary", 0.01), answer("fallback", 0)))
+    assert result.winner == "primary" and not result.hedged and result.text == "primary"
+    assert hedger.stats()["primary_latency_ms"]["m"]["samples"] == 1
+    print("✓ Fast primary answers without starting the fallback")
+
+
+def test_slow_primary_loses_and_is_cancelled():
+    hedger = Hedger()
+    log = []
+    result = asyncio.run(hedger.run("m", POLICY, answer("primary", 1.0, log), answer("fallback", 0.01)))
+    assert result.winner == "fallback" and result.hedge_reason == "slow_primary"
+    assert result.latency_ms < 500 and log == ["primary cancelled"]
+
+    result = asyncio.run(hedger.run("m", POLICY, failing, answer("fallback", 0.01)))
+    assert result.winner == "fallback" and result.hedge_reason == "primary_error" and result.latency_ms < 50
+    assert "RuntimeError" in result.errors["primary"]
+
+    try:
+        asyncio.run(hedger.run("m", POLICY, failing, failing))
+        assert False, "expected HedgeFailed"
+    except HedgeFailed as e:
+        assert set(e.result.errors) == {"primary", "fallback"}
+    stats = hedger.stats()
+    assert stats["fallback_wins"] == 2 and stats["failures"] == 1 and stats["hedged"] == 3
+    print(f"✓ Slow primary hedged after {POLICY.initial_delay_ms:.0f}ms, failed primary handed over at once")
+
+
+def test_delay_tracks_percentile():
+    hedger = Hedger()
+    assert hedger.delay_ms("m", POLICY) == POLICY.initial_delay_ms
+    for ms in (20, 30, 40, 400):
+        hedger.observe("m", ms)
+    assert hedger.delay_ms("m", HedgePolicy(percentile=50, min_samples=3, min_delay_ms=0)) == 30
+    assert hedger.delay_ms("m", HedgePolicy(percentile=95, min_samples=3, max_delay_ms=100)) == 100
+    print("✓ Hedge delay follows the primary's latency percentile")
+
+
+def test_losing_primary_is_recorded_as_lower_bound():
+    hedger = Hedger()
+    for _ in range(3):
+        asyncio.run(hedger.run("m", POLICY, answer("primary", 1.0), answer("fallback", 0.01)))
+    asyncio.run(hedger.run("m", POLICY, answer("primary", 1.0), answer("fallback", 0.01), on_token=lambda c: None))
+    stats = hedger.stats()
+    assert stats["primary_censored"] == 4 and stats["primary_latency_ms"]["m"]["samples"] == 4
+    assert hedger.percentile("m", 50) >= POLICY.initial_delay_ms
+    # Only losses were seen, so the next delay is at least as long as the primary ran, not shorter
+    assert hedger.delay_ms("m", POLICY) >= POLICY.initial_delay_ms
+    print(f"✓ Cancelled primaries recorded at their elapsed time (p50 {hedger.percentile('m', 50):.0f}ms)")
+
+
+def test_stream_owned_by_first_chunk():
+    hedger = Hedger()
+    chunks = []
+    result = asyncio.run(hedger.run(
+        "m", POLICY, answer("primary", 1.0), answer("fallback", 0.01), on_token=chunks.append
+    ))
+    assert result.winner == "fallback" and chunks == ["fallback:a", "fallback:b"]
+    print("✓ Only the winning attempt's chunks are streamed")
+
+
+def test_shipped_policy_is_opt_in():
+    saved = (app.ROUTING_POLICY, app.LLM_MODE)
+    app.ROUTING_POLICY, app.LLM_MODE = app.load_routing_policy(), "live"
+    try:
+        assert app.hedge_policy("planner") is None and app.hedge_policy("executor") is None
+    finally:
+        app.ROUTING_POLICY, app.LLM_MODE = saved
+    print("✓ routing_policy.json ships with hedging off for both roles")
+
+
+def test_run_agent_loop_hedges_planner():
+    saved = (app.ROUTING_POLICY, app.LLM_MODE, app.planner_llm, app.create_llm_from_policy, app.llm_hedger)
+    app.ROUTING_POLICY = {
+        "planner": {
+            "primary": {"provider": "ollama", "model": "slow"},
+            "fallback": {"provider": "openai_compat", "model": "mock-planner"},
+            "hedge": {"enabled": True, "initial_delay_ms": 50, "min_delay_ms": 10},
+        },
+        "executor": {"primary": {"provider": "openai_compat", "model": "mock-executor"}},
+        "rules": {"use_strong_executor_if": {"min_user_chars": 10000, "contains_any": []}},
+    }
+    app.LLM_MODE = "live"
+    app.planner_llm = MockLLM("planner", latency_sec=2.0)
+    app.create_llm_from_policy = lambda entry: (MockLLM("planner"), entry["model"])
+    app.llm_hedger = Hedger()
+    try:
+        events = []
+        outcome = asyncio.run(app.run_agent_loop(
+            {}, [{"role": "user", "content": "hello there"}], on_event=events.append
+        ))
+    finally:
+        app.ROUTING_POLICY, app.LLM_MODE, app.planner_llm, app.create_llm_from_policy, app.llm_hedger = saved
+    hedges = [e for e in events if e["type"] == "llm_hedge"]
+    assert outcome.status == "ok" and hedges and hedges[0]["winner"] == "fallback"
+    assert hedges[0]["role"] == "planner" and hedges[0]["fallback_model"] == "mock-planner"
+    assert next(e for e in events if e["type"] == "planner_routing")["hedge"] is True
+    print(f"✓ run_agent_loop hedged the planner (latency {hedges[0]['latency_ms']}ms)")
+
+
+if __name__ == "__main__":
+    test_fast_primary_is_not_hedged()
+    test_slow_primary_loses_and_is_cancelled()
+    test_delay_tracks_percentile()
+    test_losing_primary_is_recorded_as_lower_bound()
+    test_stream_owned_by_first_chunk()
+    test_shipped_policy_is_opt_in()
+    test_run_agent_loop_hedges_planner()
+    print("\n✅ Hedged requests working!")
@@ -0,0 +1,66 @@
+"""Tests for the thread history cache (history.py). Run: python test_history.py"""
+from app_testing import app, fresh_app
+from history import HistoryCache, ThreadState
+
+
+def _fresh_app(capacity: int = 5):
+    return fresh_app(history_cache=HistoryCache(max_threads=2, capacity=capacity))
+
+
+def _count_queries(fn):
+    con = app.db()
+    statements = []
+    con.set_trace_callback(statements.append)
+    try:
+        result = fn()
+    finally:
+        con.set_trace_callback(None)
+    return result, [s for s in statements if "FROM messages" in s]
+
+
+def test_hot_thread_skips_sqlite():
+    with _fresh_app():
+        app.record_turn("t1", "hi", "hello")
+        first, queries = _count_queries(lambda: app.get_recent_messages("t1", 4))
+        assert len(queries) == 1
+        app.record_turn("t1", "again", "sure")
+        second, queries = _count_queries(lambda: app.get_recent_messages("t1", 4))
+        assert queries == []
+        assert [m["content"] for m in second] == ["hi", "hello", "again", "sure"]
+        stats = app.history_cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        print("✓ Second read served from cache, includes queued turn")
+
+
+def test_ring_buffer_matches_database():
+    with _fresh_app(capacity=5):
+        app.get_recent_messages("t1", 3)  # cache empty thread
+        for i in range(8):
+            app.add_message("t1", "user", f"m{i}")
+        cached = app.get_recent_messages("t1", 3)
+        app.history_cache.invalidate()
+        fresh = app.get_recent_messages("t1", 3)
+        assert cached == fresh and [m["content"] for m in fresh] == ["m5", "m6", "m7"]
+        # Older than the ring buffer holds -> falls back to SQLite
+        _, queries = _count_queries(lambda: app.get_recent_messages("t1", 8))
+        assert len(queries) == 1
+        print("✓ Ring buffer stays coherent with SQLite, overflow reads go to the database")
+
+
+def test_lru_eviction_and_stale_load():
+    cache = HistoryCache(max_threads=2, capacity=5)
+    for tid in ("a", "b", "c"):
+        cache.populate(tid, ThreadState([], 0, "", 0), cache.begin_load(tid))
+    assert cache.get("a", 5) is None and cache.stats()["evictions"] == 1
+    token = cache.begin_load("d")
+    cache.append("d", "user", "written during load")
+    cache.populate("d", ThreadState([], 0, "", 0), token)
+    assert cache.get("d", 5) is None
+    print("✓ LRU evicts oldest thread, racing load is not cached")
+
+
+if __name__ == "__main__":
+    test_hot_thread_skips_sqlite()
+    test_ring_buffer_matches_database()
+    test_lru_eviction_and_stale_load()
+    print("\n✅ History cache working!")
@@ -0,0 +1,85 @@
+"""Tests for the HTTP fetch layer behind web_search/weather (http_fetch.py). Run: python test_http_fetch.py"""
+import os
+import time
+
+os.environ["LLM_MODE"] = "mock"
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+import tools
+from http_fetch import Fetcher, LocalProvider, Response, set_fetcher
+
+
+class CountingProvider(LocalProvider):
+    name = "counting"
+
+    def __init__(self, **kwargs):
+        super().__init__(latency_ms=0, **kwargs)
+        self.requests = []
+        self.fail = False
+
+    def get(self, service, key, url, params=None, headers=None):
+        self.requests.append(headers or {})
+        if self.fail:
+            raise ConnectionError("offline")
+        return super().get(service, key, url, params=params, headers=headers)
+
+
+def test_tools_use_local_stand_in():
+    set_fetcher(Fetcher(LocalProvider(latency_ms=50)))
+    try:
+        t0 = time.perf_counter()
+        weather = tools.weather("Paris")
+        elapsed = time.perf_counter() - t0
+        search = tools.web_search("Python")
+        other = tools.weather("Reykjavik")
+        assert weather.startswith("Paris: Partly cloudy") and 0.03 < elapsed < 0.2
+        assert search.startswith("Python is a high-level") and other.startswith("Reykjavik: Overcast")
+        assert "local stand-in" in tools.web_search("rust async runtimes")
+    finally:
+        set_fetcher(None)
+    print(f"✓ web_search / weather answered offline by the stand-in ({elapsed * 1000:.0f}ms simulated)")
+
+
+def test_normalized_ttl_cache():
+    provider = CountingProvider()
+    fetcher = Fetcher(provider)
+    for location in ("Paris", " paris ", "PARIS"):
+        assert fetcher.fetch("weather", location, "https://wttr.in/x").text.startswith("Paris")
+    assert len(provider.requests) == 1 and fetcher.stats()["hits"] == 2
+    print("✓ Identical queries (after normalization) cost one request")
+
+
+def test_conditional_revalidation_and_stale():
+    provider = CountingProvider()
+    fetcher = Fetcher(provider, ttl_sec={"weather": 0})
+    first = fetcher.fetch("weather", "London", "u")
+    second = fetcher.fetch("weather", "London", "u")
+    assert not first.revalidated and second.revalidated and second.text == first.text
+    assert provider.requests[1]["If-None-Match"].startswith('"')
+    provider.fail = True
+    third = fetcher.fetch("weather", "London", "u")
+    assert third.stale and third.text == first.text
+    try:
+        fetcher.fetch("weather", "Oslo", "u")
+        raise AssertionError("expected the provider error")
+    except ConnectionError:
+        pass
+    stats = fetcher.stats()
+    assert stats["revalidated"] == 1 and stats["stale_served"] == 1 and stats["errors"] == 2
+    print("✓ Expired entries revalidate with If-None-Match (304); stale served when the provider fails")
+
+
+def test_missing_fixture_is_404():
+    fetcher = Fetcher(LocalProvider(latency_ms=0, root="/nonexistent"))
+    assert [fetcher.fetch("weather", "Paris", "u").status for _ in range(2)] == [404, 404]
+    assert fetcher.stats()["entries"] == 0 and fetcher.stats()["requests"] == 2
+    assert Response(404, "").etag is None
+    print("✓ Unknown services answer 404 and are not cached")
+
+
+if __name__ == "__main__":
+    test_tools_use_local_stand_in()
+    test_normalized_ttl_cache()
+    test_conditional_revalidation_and_stale()
+    test_missing_fixture_is_404()
+    print("\n✅ HTTP fetch layer working!")
@@ -0,0 +1,95 @@
+"""Tests for the unified LLMBackend interface (agent/llm/backend.py). Run: python test_llm_backend.py"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app_testing import app
+from agent.llm.backend import LLMBackend, OpenAIChatBackend, ResponsesBackend, as_backend
+from agent.llm.openai_http import LLMResponse
+from mock_llm import MockLLM
+
+
+class _ChatStandIn(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions, plain and streamed."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        words = ["Hello", " from", " stand-in"]
+        if req.get("stream"):
+            chunks = [{"id": "x", "object": "chat.completion.chunk", "created": 0, "model": req["model"],
+                       "choices": [{"index": 0, "delta": {"content": w}, "finish_reason": None}]} for w in words]
+            body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps({
+                "id": "x", "object": "chat.completion", "created": 0, "model": req["model"],
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(words)}}],
+                "usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10},
+            })
+            content_type = "application/json"
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_all_backends_share_one_shape():
+    class FakeComplete:
+        def complete(self, prompt):
+            return LLMResponse(text=f"echo:{prompt}", raw={"usage": {"input_tokens": 2, "output_tokens": 1}})
+
+    backends = [MockLLM("executor"), as_backend(FakeComplete(), "fake")]
+    for backend in backends:
+        assert isinstance(backend, LLMBackend)
+        sync = backend.generate("Tool logs: none")
+        async_ = asyncio.run(backend.agenerate("Tool logs: none"))
+        assert sync.text == async_.text and sync.latency_ms >= 0 and sync.backend == backend.name
+    assert isinstance(backends[1], ResponsesBackend)
+    assert backends[1].generate("hi").usage == {"prompt_tokens": 2, "completion_tokens": 1, "total_tokens": 3}
+    print("✓ MockLLM and complete() clients answer through generate/agenerate")
+
+
+def test_streaming_records_ttft():
+    chunks = []
+    result = asyncio.run(MockLLM("executor").agenerate("Tool logs: x", on_token=chunks.append))
+    assert result.streamed and result.ttft_ms is not None and "".join(chunks) == result.text
+    assert len(chunks) > 1
+    print(f"✓ Streamed {len(chunks)} chunks, ttft={result.ttft_ms:.2f}ms")
+
+
+def test_openai_chat_backend_against_stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backend = OpenAIChatBackend("m", provider="openai_compat",
+                                base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", api_key="k")
+    sync = backend.generate([{"role": "user", "content": "hi"}])
+    assert sync.text == "Hello from stand-in" and sync.usage["total_tokens"] == 10
+    assert list(backend.stream("hi")) == ["Hello", " from", " stand-in"]
+
+    async def run():
+        chunks = []
+        streamed = await backend.agenerate("hi", on_token=chunks.append)
+        text = await app.call_llm_with_retries([{"role": "user", "content": "hi"}], llm_client=backend, model="m")
+        return chunks, streamed, text
+
+    chunks, streamed, text = asyncio.run(run())
+    server.shutdown()
+    assert chunks == ["Hello", " from", " stand-in"] and streamed.ttft_ms is not None
+    assert text == "Hello from stand-in"
+    print("✓ OpenAI chat backend: sync, async, streamed, via call_llm_with_retries")
+
+
+if __name__ == "__main__":
+    test_all_backends_share_one_shape()
+    test_streaming_records_ttft()
+    test_openai_chat_backend_against_stand_in()
+    print("\n✅ LLM backend interface working!")
@@ -0,0 +1,99 @@
+"""Tests for per-call LLM accounting (llm_metrics.py). Run: python test_llm_metrics.py"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app_testing import app, fresh_app
+from llm_metrics import LatencyHistogram, LLMCall, LLMStats, call_tokens, summarize_calls
+from mock_llm import MockLLM
+
+
+class FlakyLLM(MockLLM):
+    """Fails the first `failures` calls, then answers like the mock planner."""
+
+    def __init__(self, failures):
+        super().__init__("planner", latency_sec=0)
+        self.failures = failures
+
+    def _respond(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("simulated timeout")
+        return super()._respond(messages)
+
+
+def test_histogram_and_tokens():
+    hist = LatencyHistogram()
+    for ms in [10] * 90 + [700] * 9 + [40000]:
+        hist.observe(ms)
+    snap = hist.snapshot()
+    assert snap["count"] == 100 and snap["buckets"]["le_50"] == 90 and snap["buckets"]["inf"] == 1
+    assert snap["p50"] == 50 and snap["p95"] == 1000 and hist.percentile(100) == 40000
+    assert call_tokens([], "hi", {"prompt_tokens": 12, "completion_tokens": 3}) == (12, 3, False)
+    prompt, completion, estimated = call_tokens([{"role": "user", "content": "hello " * 40}], "ok", None)
+    assert prompt > 40 and completion >= 1 and estimated
+    print(f"✓ Latency histogram p50={snap['p50']} p95={snap['p95']}; provider vs estimated tokens")
+
+
+def test_stats_aggregate_per_model():
+    stats = LLMStats()
+    stats.record(LLMCall("planner", "m1", "mock", "ok", 120, attempts=3, prompt_tokens=100, completion_tokens=10))
+    stats.record(LLMCall("executor", "m1", "mock", "ok", 80, attempts=1, cached=True))
+    stats.record(LLMCall("planner", "m2", "mock", "error", 900, attempts=1, fallback=True))
+    m1, m2 = stats.stats()["m1"], stats.stats()["m2"]
+    assert m1["calls"] == 2 and m1["retries"] == 2 and m1["cached"] == 1 and m1["prompt_tokens"] == 100
+    assert m1["by_role"] == {"planner": 1, "executor": 1} and m1["latency_ms"]["count"] == 2
+    assert m2["errors"] == 1 and m2["fallback_calls"] == 1 and m2["latency_ms"]["count"] == 0
+    print("✓ Per-model calls, retries, errors, fallbacks and latency (successes only)")
+
+
+def test_retries_are_counted():
+    calls = []
+    saved = app.llm_stats
+    app.llm_stats = LLMStats()
+    try:
+        text = asyncio.run(app.call_llm_with_retries(
+            [{"role": "user", "content": "what time is it"}], llm_client=FlakyLLM(1), model="flaky",
+            max_retries=2, role="planner", on_call=calls.append,
+        ))
+        model_stats = app.llm_stats.stats()["flaky"]
+    finally:
+        app.llm_stats = saved
+    assert "current_time" in text and len(calls) == 1
+    call = calls[0]
+    assert call.status == "ok" and call.attempts == 2 and call.retries == 1 and call.role == "planner"
+    assert call.tokens_estimated and call.prompt_tokens > 0 and call.latency_ms >= 2000  # one 2s backoff
+    assert model_stats["calls"] == 1 and model_stats["retries"] == 1
+    print(f"✓ One logical call with {call.retries} retry recorded ({call.latency_ms:.0f}ms)")
+
+
+def test_run_reports_calls():
+    events = []
+    outcome = asyncio.run(app.run_agent_loop(
+        app.TOOLS, [{"role": "user", "content": "What time is it?"}], on_event=events.append
+    ))
+    roles = [c["role"] for c in outcome.llm_calls]
+    traced = [e for e in events if e["type"] == "llm_call"]
+    assert outcome.status == "ok" and roles == ["planner", "planner", "executor"] and len(traced) == 3
+    assert all(c["status"] == "ok" and c["attempts"] == 1 for c in outcome.llm_calls)
+    summary = summarize_calls(outcome.llm_calls)
+    assert summary["calls"] == 3 and summary["prompt_tokens"] > 0 and summary["completion_tokens"] > 0
+    assert "llm" in app.metrics() and app.planner_model_name in app.metrics()["llm"]
+    print(f"✓ Run trace: {summary['calls']} llm_call events, {summary['prompt_tokens']} prompt tokens")
+
+
+def test_chat_response_includes_summary():
+    with fresh_app():
+        body = TestClient(app.app).post("/chat", json={"thread_id": "t-llm", "user_message": "What time is it?"}).json()
+    assert body["status"] == "ok" and body["llm"]["calls"] == 3
+    assert body["llm"]["prompt_tokens"] > 0 and body["llm"]["retries"] == 0
+    print(f"✓ /chat body carries the llm summary: {body['llm']}")
+
+
+if __name__ == "__main__":
+    test_histogram_and_tokens()
+    test_stats_aggregate_per_model()
+    test_retries_are_counted()
+    test_run_reports_calls()
+    test_chat_response_includes_summary()
+    print("\n✅ LLM call accounting working!")
@@ -0,0 +1,79 @@
+"""Tests for FTS5-backed retrieve_memories. Run: python test_memory_fts.py"""
+from contextlib import contextmanager
+
+from app_testing import app, fresh_app
+
+
+@contextmanager
+def _fresh_db(fts: bool = True):
+    with fresh_app():
+        if not fts:
+            app.MEMORY_FTS = False
+        yield app.db()
+
+
+def test_tokenized_match_ranks_first():
+    with _fresh_db() as con:
+        app.add_memory("fact", "User deploys with Docker on Kubernetes", 2)
+        app.add_memory("preference", "User likes dark mode", 5)
+        app.add_memory("fact", "User's name is Tyler", 4)
+        app.writer.flush()
+        rows = app.retrieve_memories(con, "How should I configure the docker deployment?", limit=3)
+        assert rows[0]["text"] == "User deploys with Docker on Kubernetes"  # porter: deployment ~ deploys
+        assert [r["importance"] for r in rows[1:]] == [5, 4]
+        print("✓ Tokenized FTS match outranks importance")
+
+
+def test_project_scope_first():
+    with _fresh_db() as con:
+        app.add_memory("fact", "Global fact about python", 5)
+        app.add_memory("fact", "Project note unrelated", 1, "proj_a")
+        app.add_memory("fact", "Other project python note", 5, "proj_b")
+        app.writer.flush()
+        rows = app.retrieve_memories(con, "python", project_id="proj_a", limit=8)
+        assert [r["text"] for r in rows] == ["Project note unrelated", "Global fact about python"]
+        print("✓ Project memories first, other projects excluded")
+
+
+def test_triggers_keep_index_in_sync():
+    with _fresh_db() as con:
+        app.add_memory("fact", "Favorite editor is vim", 3)
+        app.writer.flush()
+        mem_id = con.execute("SELECT id FROM memories").fetchone()[0]
+        app.delete_memory(mem_id)
+        assert con.execute("SELECT COUNT(*) FROM memories_fts WHERE memories_fts MATCH 'vim'").fetchone()[0] == 0
+        print("✓ Delete trigger removes FTS entry")
+
+
+def test_like_fallback():
+    with _fresh_db(fts=False) as con:
+        app.add_memory("fact", "User prefers tabs", 1)
+        app.add_memory("fact", "User likes coffee", 5)
+        app.writer.flush()
+        rows = app.retrieve_memories(con, "do I prefer tabs or spaces?", limit=2)
+        assert rows[0]["text"] == "User prefers tabs"
+        print("✓ LIKE fallback matches individual terms")
+
+
+def test_usage_updates_recency_ranking():
+    with _fresh_db() as con:
+        app.add_memory("fact", "Older note", 3)
+        app.add_memory("fact", "Newer note", 3)
+        app.writer.flush()
+        older_id = con.execute("SELECT id FROM memories WHERE text = 'Older note'").fetchone()[0]
+        con.execute("UPDATE memories SET last_used_ts = 0")
+        app.mark_memory_used(older_id)
+        app.mark_memory_used(older_id)
+        app.writer.flush(app.memory_usage.flush())
+        rows = app.retrieve_memories(con, "unrelated", limit=2)
+        assert rows[0]["text"] == "Older note" and rows[0]["uses"] == 2
+        print("✓ Batched usage marks feed recency ranking")
+
+
+if __name__ == "__main__":
+    test_tokenized_match_ranks_first()
+    test_project_scope_first()
+    test_triggers_keep_index_in_sync()
+    test_like_fallback()
+    test_usage_updates_recency_ranking()
+    print("\n✅ FTS memory retrieval working!")
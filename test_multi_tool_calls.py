@@ -0,0 +1,134 @@
+"""Tests for multi-call planner turns (parse_tool_calls, concurrent tool execution). Run: python test_multi_tool_calls.py"""
+import asyncio
+import time
+
+from app_testing import app
+from mock_llm import MockLLM, Msg
+
+
+def test_parse_tool_calls_shapes():
+    one = '{"tool":"current_time","args":{}}'
+    many = '{"tools":[{"tool":"read_file","args":{"path":"a.txt"}},{"tool":"current_time","args":{}}]}'
+    assert app.parse_tool_calls(one) == [{"tool": "current_time", "args": {}}]
+    assert [c["tool"] for c in app.parse_tool_calls(many)] == ["read_file", "current_time"]
+    assert len(app.parse_tool_calls('[{"tool":"a","args":{}},{"tool":"b","args":{}}]')) == 2
+    assert len(app.parse_tool_calls(f"Sure, here you go:\n{many}\nDone.")) == 2
+    assert app.parse_tool_calls('{"tools":[{"tool":"a","args":{}},{"tool":"b"},"junk"]}') == [{"tool": "a", "args": {}}]
+    assert app.parse_tool_calls('{"final":"answer"}') is None and app.parse_tool_calls("hello") is None
+    assert app.parse_tool_call(many)["tool"] == "read_file"
+    print("✓ Single, batched, bare-list and prose-wrapped tool calls parse")
+
+
+def test_mock_planner_batches_intents():
+    planner = MockLLM("planner", latency_sec=0)
+    user = "read a.txt and b.txt and tell me the time\n\nTool logs so far:\nNone yet"
+    calls = app.parse_tool_calls(planner.chat([Msg("user", user)]))
+    assert [c["tool"] for c in calls] == ["read_file", "read_file", "current_time"]
+    assert [c["args"].get("path") for c in calls[:2]] == ["a.txt", "b.txt"]
+    single = planner.chat([Msg("user", "Read ping.txt\n\nTool logs so far:\nNone yet")])
+    assert single == '{"tool":"read_file","args":{"path":"ping.txt"}}'
+    print("✓ MockLLM planner emits one multi-call turn for several intents")
+
+
+def _slow_tools(delay):
+    def read_file(path):
+        time.sleep(delay)
+        return f"contents of {path}"
+
+    def current_time():
+        time.sleep(delay)
+        return "12:00"
+    return {"read_file": read_file, "current_time": current_time}
+
+
+def _run(user_message, tools):
+    saved_tools = dict(app.TOOLS)
+    app.TOOLS.update(tools)
+    app.tool_cache.clear()
+    events = []
+    try:
+        t0 = time.perf_counter()
+        outcome = asyncio.run(app.run_agent_loop(tools, [{"role": "user", "content": user_message}], on_event=events.append))
+        return outcome, events, time.perf_counter() - t0
+    finally:
+        app.TOOLS.clear()
+        app.TOOLS.update(saved_tools)
+        app.tool_cache.clear()
+
+
+def test_calls_run_concurrently_in_one_step():
+    outcome, events, elapsed = _run("read a.txt and b.txt and tell me the time", _slow_tools(0.2))
+    assert outcome.status == "ok"
+    assert [(log["ref"], log["name"]) for log in outcome.tool_logs] == [("r1", "read_file"), ("r2", "read_file"), ("r3", "current_time")]
+    assert outcome.tool_logs[1]["result"] == "contents of b.txt"
+    planner_calls = [e for e in events if e["type"] == "planner_raw"]
+    batch = next(e for e in events if e["type"] == "tool_batch")
+    assert len(planner_calls) == 2 and batch["calls"] == 3 and elapsed < 0.5
+    print(f"✓ 3 tool calls, 2 planner calls, {batch['wall_ms']:.0f}ms tool wall time (sequential: ~600ms)")
+
+
+def test_pool_is_bounded():
+    saved = app.TOOL_CONCURRENCY
+    app.TOOL_CONCURRENCY = 2
+    try:
+        outcome, events, _ = _run("read a.txt, b.txt, c.txt and d.txt", _slow_tools(0.1))
+    finally:
+        app.TOOL_CONCURRENCY = saved
+    batch = next(e for e in events if e["type"] == "tool_batch")
+    assert len(outcome.tool_logs) == 4 and batch["concurrency"] == 2 and 180 <= batch["wall_ms"] < 380
+    print(f"✓ 4 calls with 2 slots took {batch['wall_ms']:.0f}ms")
+
+
+class BatchPlanner(MockLLM):
+    """Plans one fixed batch, then answers once tool logs are in."""
+
+    def __init__(self, batch):
+        super().__init__("planner", latency_sec=0)
+        self.batch = batch
+
+    def _respond(self, messages):
+        if "none yet" in messages[-1].content.lower():
+            return self.batch
+        return super()._respond(messages)
+
+
+def test_side_effects_run_in_order():
+    files, log = {}, []
+
+    def read_file(path):
+        log.append(f"read {path}")
+        time.sleep(0.05)
+        return files.get(path, "missing")
+
+    def write_file(path, content):
+        log.append(f"write {path}")
+        time.sleep(0.1)  # a concurrent read would start (and finish) before this write lands
+        files[path] = content
+        return "written"
+
+    batch = ('{"tools":[{"tool":"read_file","args":{"path":"a.txt"}},'
+             '{"tool":"write_file","args":{"path":"a.txt","content":"new"}},'
+             '{"tool":"read_file","args":{"path":"a.txt"}},{"tool":"read_file","args":{"path":"b.txt"}}]}')
+    saved = app.planner_llm
+    app.planner_llm = BatchPlanner(batch)
+    try:
+        outcome, events, _ = _run("update a.txt", {"read_file": read_file, "write_file": write_file})
+    finally:
+        app.planner_llm = saved
+    assert outcome.status == "ok"
+    assert [(log["name"], log["result"]) for log in outcome.tool_logs] == [
+        ("read_file", "missing"), ("write_file", "written"), ("read_file", "new"), ("read_file", "missing"),
+    ]
+    assert log[:2] == ["read a.txt", "write a.txt"] and sorted(log[2:]) == ["read a.txt", "read b.txt"]
+    batch_event = next(e for e in events if e["type"] == "tool_batch")
+    assert batch_event["sequential"] == 1 and batch_event["wall_ms"] < 300
+    print(f"✓ write_file ran between the reads around it ({batch_event['wall_ms']:.0f}ms)")
+
+
+if __name__ == "__main__":
+    test_parse_tool_calls_shapes()
+    test_mock_planner_batches_intents()
+    test_calls_run_concurrently_in_one_step()
+    test_pool_is_bounded()
+    test_side_effects_run_in_order()
+    print("\n✅ Multi-call planner turns working!")
@@ -0,0 +1,76 @@
+"""Tests for OpenAIHTTPClient connection pooling. Run: python test_openai_http.py"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent.llm.openai_http import OpenAIHTTPClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps({"output": [{"content": [{"type": "output_text", "text": payload["input"]}]}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Handler.connections = 0
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def test_sequential_calls_reuse_one_connection():
+    server, url = _server()
+    with OpenAIHTTPClient(api_key="k", base_url=url) as llm:
+        assert [llm.complete(f"p{i}").text for i in range(20)] == [f"p{i}" for i in range(20)]
+        assert _Handler.connections == 1
+        assert llm.pool_stats()["idle_connections"] == 1
+    server.shutdown()
+    print("✓ 20 sequential calls over one keep-alive connection")
+
+
+def test_threads_share_bounded_pool():
+    server, url = _server()
+    with OpenAIHTTPClient(api_key="k", base_url=url, pool_size=4) as llm:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            texts = list(pool.map(lambda i: llm.complete(f"t{i}").text, range(200)))
+        assert texts == [f"t{i}" for i in range(200)]
+        assert _Handler.connections <= 4
+    server.shutdown()
+    print(f"✓ 200 calls from 4 threads used {_Handler.connections} connections")
+
+
+def test_keep_alive_off_and_timeouts():
+    server, url = _server()
+    with OpenAIHTTPClient(api_key="k", base_url=url, keep_alive=False,
+                          connect_timeout_sec=1.5, timeout_sec=7) as llm:
+        llm.complete("a")
+        llm.complete("b")
+        assert _Handler.connections == 2
+        assert (llm.connect_timeout_sec, llm.timeout_sec) == (1.5, 7)
+    server.shutdown()
+    print("✓ keep_alive=False opens a connection per call")
+
+
+if __name__ == "__main__":
+    test_sequential_calls_reuse_one_connection()
+    test_threads_share_bounded_pool()
+    test_keep_alive_off_and_timeouts()
+    print("\n✅ OpenAI HTTP client pooling working!")
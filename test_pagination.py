@@ -0,0 +1,74 @@
+"""Tests for schema migrations and keyset pagination. Run: python test_pagination.py"""
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+
+from app_testing import TMP_DIR, app, fresh_app
+
+
+@contextmanager
+def _fresh_app(path=None):
+    with fresh_app(path):
+        yield TestClient(app.app)
+
+
+def test_migrates_legacy_database():
+    path = os.path.join(tempfile.mkdtemp(dir=TMP_DIR), "legacy.db")
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, thread_id TEXT NOT NULL, "
+                "role TEXT NOT NULL, content TEXT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    con.execute("CREATE TABLE memories (id INTEGER PRIMARY KEY AUTOINCREMENT, ts INTEGER NOT NULL, kind TEXT NOT NULL, "
+                "text TEXT NOT NULL, importance INTEGER NOT NULL, last_used_ts INTEGER NOT NULL, uses INTEGER NOT NULL)")
+    con.commit()
+    con.close()
+    with _fresh_app(path):
+        db = app.db()
+        assert db.execute("PRAGMA user_version").fetchone()[0] == len(app.MIGRATIONS)
+        assert "project_id" in [r[1] for r in db.execute("PRAGMA table_info(memories)")]
+        plan = " ".join(r[3] for r in db.execute(
+            "EXPLAIN QUERY PLAN SELECT role, content FROM messages WHERE thread_id=? ORDER BY id DESC LIMIT 20", ("t",)))
+        assert "idx_messages_thread" in plan and "TEMP B-TREE" not in plan
+        objects = {r[0] for r in db.execute("SELECT name FROM sqlite_master")}
+        assert {"thread_summaries", "idx_memories_rank"} <= objects
+        app.init_db()  # second startup is a no-op
+        print("✓ Legacy database migrated once; history reads use (thread_id, id) index")
+
+
+def test_thread_messages_keyset_pages():
+    with _fresh_app() as client:
+        for i in range(5):
+            app.record_turn("t", f"q{i}", f"a{i}")
+        app.record_turn("other", "x", "y")
+        seen, before = [], None
+        while True:
+            params = {"limit": 4, **({"before": before} if before else {})}
+            body = client.get("/threads/t/messages", params=params).json()
+            seen = [m["content"] for m in body["messages"]] + seen
+            before = body["next_before"]
+            if before is None:
+                break
+        assert seen == [c for i in range(5) for c in (f"q{i}", f"a{i}")]
+        print("✓ /threads/{id}/messages pages back through the whole thread in order")
+
+
+def test_memories_keyset_pages():
+    with _fresh_app() as client:
+        for i in range(5):
+            app.add_memory("fact", f"fact {i}", 3, "p1" if i % 2 else None)
+        first = client.get("/memories", params={"limit": 3}).json()
+        assert [m["text"] for m in first["memories"]] == ["fact 4", "fact 3", "fact 2"]
+        rest = client.get("/memories", params={"limit": 3, "before": first["next_before"]}).json()
+        assert [m["text"] for m in rest["memories"]] == ["fact 1", "fact 0"] and rest["next_before"] is None
+        scoped = client.get("/memories", params={"project_id": "p1"}).json()
+        assert [m["text"] for m in scoped["memories"]] == ["fact 3", "fact 1"]
+        print("✓ /memories returns real columns with cursor pagination")
+
+
+if __name__ == "__main__":
+    test_migrates_legacy_database()
+    test_thread_messages_keyset_pages()
+    test_memories_keyset_pages()
+    print("\n✅ Migrations and pagination working!")
@@ -0,0 +1,86 @@
+"""Tests for the planner bypass fast path (route_request). Run: python test_planner_bypass.py"""
+import asyncio
+
+from app_testing import app, fresh_app
+from mock_llm import MockLLM
+
+
+class RecordingLLM(MockLLM):
+    def __init__(self, mode):
+        super().__init__(mode, latency_sec=0)
+        self.prompts = []
+
+    def _respond(self, messages):
+        self.prompts.append(messages)
+        return super()._respond(messages)
+
+
+def test_route_request_reasons():
+    cases = {
+        "Hello, how are you?": (True, "no_tool_signals"),
+        "Explain recursion like I'm five": (True, "no_tool_signals"),
+        "Read ping.txt": (False, "tool_keyword:read"),
+        "What's the weather in Paris?": (False, "tool_keyword:weather"),
+        "Remember that I like tea": (False, "memory_trigger:remember"),
+        "what is 12 * 7": (False, "math_expression"),
+        "tell me a story " * 50: (False, "long_request"),
+        "Open notes.txt and summarize it": (False, "tool_keyword:open"),
+        "Summarize notes.txt for me": (False, "file_name"),
+        "what day is it today": (False, "tool_keyword:what day"),
+        "Is it raining in Paris?": (False, "tool_keyword:rain"),
+        "What's the temperature in Tokyo?": (False, "tool_keyword:temperature"),
+        "Look up the latest news about SQLite": (False, "tool_keyword:look up"),
+        "How much is 15 percent of 80?": (False, "tool_keyword:how much"),
+        "Give me 15% of 80": (False, "math_expression"),
+        "Thanks, that was helpful!": (True, "no_tool_signals"),
+        "Can you explain what a closure is?": (True, "no_tool_signals"),
+    }
+    for text, (bypass, reason) in cases.items():
+        route = app.route_request(text)
+        assert (route["bypass_planner"], route["reason"]) == (bypass, reason), (text, route)
+    print(f"✓ {len(cases)} requests routed with an auditable reason")
+
+
+def test_bypass_skips_planner_and_keeps_memories():
+    saved = (app.planner_llm, app.executor_llm)
+    app.planner_llm, app.executor_llm = RecordingLLM("planner"), RecordingLLM("executor")
+    events = []
+    try:
+        outcome = asyncio.run(app.run_agent_loop(
+            {}, [{"role": "system", "content": app.PLANNER_SYSTEM}, {"role": "user", "content": "Hello!"}],
+            memory_block="Memories:\n- [preference] Always answer in strict bullet points",
+            on_event=events.append, route=app.route_request("Hello!"),
+        ))
+        planner_prompts, executor_prompts = app.planner_llm.prompts, app.executor_llm.prompts
+    finally:
+        app.planner_llm, app.executor_llm = saved
+    types = [e["type"] for e in events]
+    assert outcome.status == "ok" and not planner_prompts and len(executor_prompts) == 1
+    assert any("bullet points" in m.content for m in executor_prompts[0])
+    assert "request_route" in types and "planner_routing" not in types and "planner_raw" not in types
+    print("✓ Bypassed run: one executor call, memory block included, no planner events")
+
+
+def test_chat_turn_routes():
+    with fresh_app():
+        async def turn(text):
+            events = []
+            result = await app.run_chat_turn(app.ChatRequest(thread_id="t-route", user_message=text), on_event=events.append)
+            return result, events
+
+        plain, plain_events = asyncio.run(turn("Hi there"))
+        timed, timed_events = asyncio.run(turn("What time is it?"))
+        route = next(e for e in plain_events if e["type"] == "request_route")
+        assert plain["status"] == "ok" and route["bypass_planner"] and route["reason"] == "no_tool_signals"
+        assert not any(e["type"] == "planner_raw" for e in plain_events)
+        route = next(e for e in timed_events if e["type"] == "request_route")
+        assert not route["bypass_planner"] and route["reason"] == "tool_keyword:time"
+        assert timed["tool_calls"] and timed["tool_calls"][0]["name"] == "current_time"
+        print("✓ /chat turns: plain message bypasses, tool request goes through the planner")
+
+
+if __name__ == "__main__":
+    test_route_request_reasons()
+    test_bypass_skips_planner_and_keeps_memories()
+    test_chat_turn_routes()
+    print("\n✅ Planner bypass working!")
@@ -0,0 +1,94 @@
+"""Tests for tool-log prompt budgeting (prompt_budget.py). Run: python test_prompt_budget.py"""
+import asyncio
+import json
+
+from app_testing import app
+from context_window import estimate_tokens
+from mock_llm import MockLLM
+from prompt_budget import DETAIL_TOOL, clip_result, compact_result, format_tool_logs, tool_detail
+
+BIG = "".join(f"line {n:04d}\n" for n in range(1000))  # 10 KB
+
+
+def test_clip_keeps_the_right_part():
+    head = clip_result("r1", BIG, 100, "head")
+    tail = clip_result("r1", BIG, 100, "tail")
+    both = clip_result("r1", BIG, 100, "head_tail")
+    assert head.startswith("line 0000") and '"offset": 400' in head
+    assert tail.rstrip().endswith("line 0999") and '"offset": 0' in tail
+    assert both.startswith("line 0000") and both.rstrip().endswith("line 0999")
+    assert all(estimate_tokens(t) < 150 for t in (head, tail, both))
+    assert compact_result("r1", "calculator", "42", "planner") == "42"
+    print("✓ head / tail / head_tail clipping with a detail pointer")
+
+
+def test_executor_budget_shrinks_oldest_first():
+    logs = [{"ref": f"r{i + 1}", "name": "read_file", "arguments": {"path": f"f{i}"}, "result": BIG} for i in range(5)]
+    text, stats = format_tool_logs(logs, budget_tokens=2500)
+    lines = text.split("\n- ")
+    assert stats["tokens"] <= 2500 + 100 and stats["full_tokens"] > 12000 and stats["clipped"] == 5
+    assert len(lines[-1]) > len(lines[0])  # newest kept more
+    assert all(f"[r{i + 1}]" in text for i in range(5))
+    print(f"✓ Executor tool logs: {stats['full_tokens']} -> {stats['tokens']} tokens")
+
+
+def test_detail_pages_through_full_result():
+    logs = [{"ref": "r1", "name": "read_file", "arguments": {}, "result": BIG}]
+    pages, offset = [], 0
+    while True:
+        page = tool_detail(logs, "r1", offset, max_tokens=500)
+        header, _, body = page.partition("\n")
+        body = body.split("\n[... ")[0]
+        pages.append(body)
+        if "chars omitted" not in page:
+            break
+        offset = json.loads(page[page.rindex("{"):page.rindex("}") + 1])["offset"]
+    assert "".join(pages) == BIG and len(pages) == 5
+    assert "Unknown ref" in tool_detail(logs, "r9")
+    print(f"✓ tool_detail pages through a clipped result in {len(pages)} calls")
+
+
+class DetailPlanner(MockLLM):
+    """Reads a big file, asks for more of it, then finishes."""
+
+    def __init__(self):
+        super().__init__("planner", latency_sec=0)
+        self.prompts = []
+
+    def _respond(self, messages):
+        self.prompts.append(sum(len(m.content) for m in messages))
+        if not any(m.content.startswith("Tool result") for m in messages):
+            return '{"tool":"read_file","args":{"path":"big.txt"}}'
+        if not any(m.content.startswith("[r1") for m in messages):
+            return json.dumps({"tool": DETAIL_TOOL, "args": {"ref": "r1", "offset": 600}})
+        return '{"final":"Done."}'
+
+
+def test_planner_history_is_clipped():
+    saved = (app.planner_llm, app.TOOLS.get("read_file"))
+    app.planner_llm = DetailPlanner()
+    app.TOOLS["read_file"] = lambda path: BIG
+    app.tool_cache.clear()
+    events = []
+    try:
+        outcome = asyncio.run(app.run_agent_loop(
+            {"read_file": app.TOOLS["read_file"]}, [{"role": "user", "content": "read big.txt"}],
+            max_steps=4, on_event=events.append
+        ))
+        prompts = app.planner_llm.prompts
+    finally:
+        app.planner_llm, app.TOOLS["read_file"] = saved
+        app.tool_cache.clear()
+    assert outcome.status == "ok" and len(outcome.tool_logs) == 1 and outcome.tool_logs[0]["result"] == BIG
+    assert len(prompts) == 3 and prompts[1] - prompts[0] < 2000  # clipped, not the 10 KB result
+    budget = next(e for e in events if e["type"] == "tool_log_budget")
+    assert budget["tokens"] < budget["full_tokens"]
+    print("✓ Planner history carries the clipped result; tool_detail handled in the loop")
+
+
+if __name__ == "__main__":
+    test_clip_keeps_the_right_part()
+    test_executor_budget_shrinks_oldest_first()
+    test_detail_pages_through_full_result()
+    test_planner_history_is_clipped()
+    print("\n✅ Prompt budgeting working!")
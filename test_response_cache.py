@@ -0,0 +1,136 @@
+"""Tests for the LLM response cache (agent/llm/response_cache.py). Run: python test_response_cache.py"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from app_testing import app
+from agent.llm import response_cache
+from agent.llm.response_cache import CachingBackend, ResponseCache, cache_key
+from mock_llm import MockLLM
+
+
+class CountingLLM(MockLLM):
+    def __init__(self):
+        super().__init__("planner", latency_sec=0)
+        self.calls = 0
+
+    def _generate(self, messages, model, temperature):
+        self.calls += 1
+        return super()._generate(messages, model, temperature)
+
+    async def _agenerate(self, messages, model, temperature):
+        self.calls += 1
+        return await super()._agenerate(messages, model, temperature)
+
+
+def test_memory_and_disk_hits():
+    path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    key = cache_key("m", [{"role": "user", "content": "hi"}], 0.0)
+    assert key != cache_key("m", [{"role": "user", "content": "hi"}], 0.3)
+
+    cache = ResponseCache(path)
+    assert cache.get(key) is None
+    cache.put(key, "hello", {"total_tokens": 3})
+    assert cache.get(key) == ("hello", {"total_tokens": 3})
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened.get(key) == ("hello", {"total_tokens": 3})  # from disk
+    assert reopened.get(key) == ("hello", {"total_tokens": 3})  # now from memory
+    stats = reopened.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["disk_entries"] == 1
+    reopened.close()
+    print("✓ Entries survive a restart and are promoted to memory")
+
+
+def test_ttl_and_size_eviction():
+    cache = ResponseCache(os.path.join(tempfile.mkdtemp(), "cache.db"), ttl_sec=0.05, max_memory=2, max_disk=10)
+    cache.put("old", "x")
+    time.sleep(0.1)
+    assert cache.get("old") is None and cache.stats()["expired"] >= 1
+
+    cache.ttl_sec = 3600
+    for i in range(25):
+        cache.put(f"k{i}", str(i))
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["disk_entries"] <= 10 and stats["evictions"] > 0
+    assert cache.get("k24") == ("24", None) and cache.get("k0") is None
+    cache.close()
+    print(f"✓ TTL expiry and size eviction (disk entries={stats['disk_entries']})")
+
+
+def test_async_disk_work_runs_off_the_loop():
+    cache = ResponseCache(os.path.join(tempfile.mkdtemp(), "cache.db"), max_memory=1)
+    threads = []
+    for name in ("_disk_get", "_disk_put"):
+        def spy(*args, _real=getattr(cache, name)):
+            threads.append(threading.current_thread())
+            return _real(*args)
+        setattr(cache, name, spy)
+
+    async def run():
+        await cache.aput("a", "A")
+        await cache.aput("b", "B")  # pushes "a" out of the one-entry LRU
+        return await cache.aget("a"), await cache.aget("a"), await cache.aget("missing")
+
+    assert asyncio.run(run()) == (("A", None), ("A", None), None)
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["misses"] == 1
+    assert len(threads) == 4 and threading.main_thread() not in threads  # 2 writes, 2 disk lookups
+    cache.close()
+    print("✓ aget/aput run SQLite on worker threads; memory hits stay on the loop")
+
+
+def test_only_deterministic_calls_are_cached():
+    inner = CountingLLM()
+    backend = CachingBackend(inner, ResponseCache())
+    prompt = [{"role": "user", "content": "What's the weather in Paris?"}]
+
+    first = backend.generate(prompt, temperature=0.0)
+    second = backend.generate(prompt, temperature=0.0)
+    assert not first.cached and second.cached and first.text == second.text and inner.calls == 1
+
+    backend.generate(prompt, temperature=0.7)
+    backend.generate(prompt, temperature=0.7)
+    assert inner.calls == 3
+    print("✓ Temperature 0 cached, sampled calls pass through")
+
+
+def test_call_llm_with_retries_uses_cache():
+    os.environ["LLM_RESPONSE_CACHE"] = "1"
+    os.environ["LLM_RESPONSE_CACHE_PATH"] = ""
+    response_cache._cache = None
+    try:
+        inner = CountingLLM()
+        messages = [{"role": "user", "content": "What time is it?"}]
+
+        async def run():
+            texts = []
+            for _ in range(3):
+                texts.append(await app.call_llm_with_retries(messages, llm_client=inner, model="mock-planner", temperature=0.0))
+            chunks = []
+            texts.append(await app.call_llm_with_retries(
+                messages, llm_client=inner, model="mock-planner", temperature=0.0, on_token=chunks.append
+            ))
+            return texts, chunks
+
+        texts, chunks = asyncio.run(run())
+        assert len(set(texts)) == 1 and inner.calls == 1 and chunks == [texts[0]]
+        assert app.metrics()["response_cache"]["memory_hits"] == 3
+    finally:
+        os.environ.pop("LLM_RESPONSE_CACHE", None)
+        os.environ.pop("LLM_RESPONSE_CACHE_PATH", None)
+        response_cache._cache = None
+    assert app.metrics()["response_cache"] == {"enabled": False}
+    print("✓ Repeated planner calls answered from the cache")
+
+
+if __name__ == "__main__":
+    test_memory_and_disk_hits()
+    test_ttl_and_size_eviction()
+    test_async_disk_work_runs_off_the_loop()
+    test_only_deterministic_calls_are_cached()
+    test_call_llm_with_retries_uses_cache()
+    print("\n✅ Response cache working!")
@@ -0,0 +1,180 @@
+"""Tests for the pooled SQLite access layer (storage.py). Run: python test_storage.py"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from storage import GroupCommitWriter, SQLitePool, UsageAggregator
+
+
+def _pool():
+    path = os.path.join(tempfile.mkdtemp(), "test.db")
+    pool = SQLitePool(path)
+    pool.connection().execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    return pool
+
+
+def test_wal_and_pragmas():
+    pool = _pool()
+    conn = pool.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    print("✓ WAL mode + pragmas applied")
+
+
+def test_connection_reused_per_thread():
+    pool = _pool()
+    assert pool.connection() is pool.connection()
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.connection()))
+    t.start(); t.join()
+    assert other[0] is not pool.connection()
+    pool.connection().close()  # legacy close() must not kill the pooled connection
+    pool.connection().execute("SELECT 1")
+    assert pool.stats()["connections_opened"] == 2
+    print("✓ One reusable connection per thread")
+
+
+def test_nested_transaction_commits_once():
+    pool = _pool()
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO t(v) VALUES ('a')")
+        with pool.transaction() as inner:
+            inner.execute("INSERT INTO t(v) VALUES ('b')")
+    assert pool.stats()["commits"] == 1
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+    print("✓ Nested transaction joins outer and commits once")
+
+
+def test_transaction_rollback():
+    pool = _pool()
+    try:
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO t(v) VALUES ('a')")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    assert pool.stats()["rollbacks"] == 1
+    print("✓ Failed transaction rolled back")
+
+
+def test_concurrent_writers():
+    pool = _pool()
+
+    def writer(n):
+        for i in range(50):
+            with pool.transaction() as conn:
+                conn.execute("INSERT INTO t(v) VALUES (?)", (f"{n}-{i}",))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 400
+    print("✓ 8 concurrent writers, no 'database is locked'")
+
+
+def test_group_commit_batches_and_flushes():
+    pool = _pool()
+    writer = GroupCommitWriter(pool, max_delay=0.05)
+
+    def producer(n):
+        for i in range(25):
+            writer.submit("INSERT INTO t(v) VALUES (?)", (f"{n}-{i}",))
+
+    threads = [threading.Thread(target=producer, args=(n,)) for n in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 200
+    assert stats["pending"] == 0 and stats["batches"] < 200
+    print(f"✓ 200 inserts from 8 threads in {stats['batches']} commits")
+    writer.close()
+
+
+def test_group_is_atomic_and_bad_group_isolated():
+    pool = _pool()
+    writer = GroupCommitWriter(pool, max_delay=0.05)
+    writer.submit_many([("INSERT INTO t(v) VALUES ('ok1')", ()), ("INSERT INTO t(v) VALUES ('ok2')", ())])
+    bad = writer.submit_many([("INSERT INTO t(v) VALUES ('lost')", ()), ("INSERT INTO missing VALUES (1)", ())])
+    writer.submit("INSERT INTO t(v) VALUES ('ok3')")
+    writer.flush(bad)
+    writer.flush()
+    rows = [r[0] for r in pool.connection().execute("SELECT v FROM t ORDER BY id")]
+    assert rows == ["ok1", "ok2", "ok3"]
+    assert writer.stats()["errors"] == 1
+    print("✓ Failing group rolled back alone, other groups committed")
+    writer.close()
+
+
+def test_close_flushes_pending_writes():
+    pool = _pool()
+    writer = GroupCommitWriter(pool, max_delay=1.0)
+    for i in range(10):
+        writer.submit("INSERT INTO t(v) VALUES (?)", (str(i),))
+    writer.close()
+    assert pool.connection().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 10
+    print("✓ close() flushes queued writes")
+
+
+def test_usage_aggregator_batches_hits():
+    pool = _pool()
+    pool.connection().execute("CREATE TABLE m (id INTEGER PRIMARY KEY, uses INTEGER, last_used_ts INTEGER)")
+    pool.connection().executemany("INSERT INTO m VALUES (?, 0, 0)", [(1,), (2,), (3,)])
+    writer = GroupCommitWriter(pool)
+    usage = UsageAggregator(
+        writer,
+        "UPDATE m SET uses = uses + ?, last_used_ts = MAX(last_used_ts, ?) WHERE id = ?",
+        flush_interval=3600,
+    )
+    usage.record([1, 2], ts=100)
+    usage.record([1], ts=200)
+    usage.record([1], ts=150)
+    assert usage.stats()["pending"] == 2
+    assert pool.connection().execute("SELECT SUM(uses) FROM m").fetchone()[0] == 0  # nothing written yet
+    writer.flush(usage.flush())
+    rows = pool.connection().execute("SELECT id, uses, last_used_ts FROM m ORDER BY id").fetchall()
+    assert [tuple(r) for r in rows] == [(1, 3, 200), (2, 1, 100), (3, 0, 0)]
+    assert writer.stats()["batches"] == 1
+    assert usage.stats() == {"recorded": 4, "flushes": 1, "rows_flushed": 2, "pending": 0}
+    print("✓ 4 hits on 2 memories written as one executemany")
+    writer.close()
+
+
+def test_usage_aggregator_flushes_on_timer():
+    pool = _pool()
+    pool.connection().execute("CREATE TABLE m (id INTEGER PRIMARY KEY, uses INTEGER, last_used_ts INTEGER)")
+    pool.connection().execute("INSERT INTO m VALUES (1, 0, 0)")
+    writer = GroupCommitWriter(pool)
+    usage = UsageAggregator(
+        writer,
+        "UPDATE m SET uses = uses + ?, last_used_ts = MAX(last_used_ts, ?) WHERE id = ?",
+        flush_interval=0.05,
+    )
+    usage.record([1, 1], ts=100)  # a burst, then silence
+    deadline = time.monotonic() + 2
+    while usage.stats()["flushes"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.flush()
+    assert pool.connection().execute("SELECT uses FROM m").fetchone()[0] == 2
+    usage.record([1], ts=200)
+    usage.close()
+    writer.close()
+    assert pool.connection().execute("SELECT uses FROM m").fetchone()[0] == 3
+    print("✓ Pending hits written by the timer without another record(); close() flushes the rest")
+
+
+if __name__ == "__main__":
+    test_wal_and_pragmas()
+    test_connection_reused_per_thread()
+    test_nested_transaction_commits_once()
+    test_transaction_rollback()
+    test_concurrent_writers()
+    test_group_commit_batches_and_flushes()
+    test_group_is_atomic_and_bad_group_isolated()
+    test_close_flushes_pending_writes()
+    test_usage_aggregator_batches_hits()
+    test_usage_aggregator_flushes_on_timer()
+    print("\n✅ Storage layer working!")
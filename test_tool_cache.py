@@ -0,0 +1,106 @@
+"""Tests for the tool result cache (tool_cache.py). Run: python test_tool_cache.py"""
+import os
+import tempfile
+import threading
+
+os.environ["LLM_MODE"] = "mock"
+os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+import tools
+from tool_cache import ToolCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting(fn):
+    def wrapped(**kwargs):
+        wrapped.calls += 1
+        return fn(**kwargs)
+    wrapped.calls = 0
+    return wrapped
+
+
+def test_policies():
+    clock = Clock()
+    cache = ToolCache(clock=clock)
+    now = counting(lambda: f"t={clock.now}")
+    calc = counting(tools.calculator)
+    read = counting(lambda path: f"{path}: v1")
+    weather = counting(lambda location: f"{location}: sunny")
+    assert cache.call("current_time", {}, now) == "t=0.0"
+    clock.now = 5
+    assert cache.call("current_time", {}, now) == "t=5" and now.calls == 2
+    for _ in range(3):
+        assert cache.call("calculator", {"expression": "6*7"}, calc) == "42"
+    cache.call("read_file", {"path": "a.txt"}, read)
+    clock.now = 50
+    cache.call("read_file", {"path": "a.txt"}, read)
+    clock.now = 70
+    cache.call("read_file", {"path": "a.txt"}, read)
+    # The fetch layer owns weather / web_search freshness, so every call reaches it
+    for _ in range(2):
+        cache.call("weather", {"location": "Paris"}, weather)
+    stats = cache.stats()
+    assert calc.calls == 1 and read.calls == 2 and weather.calls == 2
+    assert stats["expired"] == 1 and stats["uncacheable"] == 4
+    assert stats["by_tool"]["calculator"] == {"hits": 2, "misses": 1}
+    print(f"✓ Never / until-invalidated / TTL policies (hit rate {stats['hit_rate']})")
+
+
+def test_write_invalidates_reads():
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        cache = ToolCache()
+        run = lambda tool, **args: cache.call(tool, args, getattr(tools, tool))
+        run("write_file", path="notes/a.txt", content="v1")
+        assert run("read_file", path="notes/a.txt") == "v1" and run("list_files", path="notes") == "a.txt"
+        run("write_file", path="notes/b.txt", content="x")
+        run("write_file", path="./notes/a.txt", content="v2")
+        assert run("read_file", path="notes/a.txt") == "v2"
+        assert sorted(run("list_files", path="notes").split("\n")) == ["a.txt", "b.txt"]
+        run("read_file", path="notes/b.txt")
+        run("run_command", cmd="pwd")
+        assert cache.stats()["entries"] == 0
+    finally:
+        os.chdir(cwd)
+    print("✓ write_file drops stale read_file/list_files entries; run_command drops all file reads")
+
+
+def test_bounded_and_race_safe():
+    cache = ToolCache(max_entries=10, max_chars=500, max_entry_chars=200)
+    calc = lambda expression: expression
+    for n in range(50):
+        cache.call("calculator", {"expression": str(n) * 20}, calc)
+    stats = cache.stats()
+    assert stats["entries"] <= 10 and stats["chars"] <= 500 and stats["evictions"] > 0
+    cache.call("calculator", {"expression": "x" * 300}, calc)
+    assert cache.stats()["entries"] == stats["entries"]  # too large to store
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_read(path):
+        started.set()
+        release.wait()
+        return "old contents"
+    reader = threading.Thread(target=cache.call, args=("read_file", {"path": "f.txt"}, slow_read))
+    reader.start()
+    started.wait()
+    cache.call("write_file", {"path": "f.txt", "content": "new"}, lambda path, content: "ok")
+    release.set()
+    reader.join()
+    assert cache.call("read_file", {"path": "f.txt"}, lambda path: "new") == "new"
+    print(f"✓ Capped at {stats['entries']} entries / {stats['chars']} chars; read racing a write not cached")
+
+
+if __name__ == "__main__":
+    test_policies()
+    test_write_invalidates_reads()
+    test_bounded_and_race_safe()
+    print("\n✅ Tool cache working!")
@@ -0,0 +1,86 @@
+"""Tests for the tool execution layer (tool_runtime.py). Run: python test_tool_runtime.py"""
+import asyncio
+import time
+
+from app_testing import app
+from tool_runtime import CPU, IO, ToolRuntime, ToolSpec, ToolTimeout
+
+
+def sleeper(seconds):
+    time.sleep(seconds)
+    return f"slept {seconds}"
+
+
+async def async_sleeper(seconds):
+    await asyncio.sleep(seconds)
+    return "done"
+
+
+def test_pools_and_timing():
+    runtime = ToolRuntime(io_workers=1, cpu_workers=1, specs={"slow": ToolSpec(IO, 5), "calc": ToolSpec(CPU, 5)})
+
+    async def scenario():
+        return await asyncio.gather(
+            runtime.run("slow", sleeper, {"seconds": 0.2}),
+            runtime.run("slow", sleeper, {"seconds": 0.2}),
+            runtime.run("calc", lambda: 6 * 7, {}),
+        )
+    first, second, calc = asyncio.run(scenario())
+    runtime.close()
+    assert first.result == "slept 0.2" and first.exec_ms >= 190
+    assert second.queue_ms >= 150  # waited for the single I/O worker
+    assert calc.result == 42 and calc.queue_ms < 100  # the CPU pool is not behind the I/O queue
+    stats = runtime.stats()
+    assert stats["tools"]["slow"]["calls"] == 2 and stats["pools"]["io"]["workers"] == 1
+    print(f"✓ Queue vs exec time: second I/O call queued {second.queue_ms:.0f}ms, CPU call {calc.queue_ms:.0f}ms")
+
+
+def test_deadlines():
+    runtime = ToolRuntime(specs={"slow": ToolSpec(IO, 0.1)})
+
+    async def expect_timeout(fn, args, deadline=None):
+        t0 = time.perf_counter()
+        try:
+            await runtime.run("slow", fn, args, deadline=deadline)
+        except ToolTimeout as e:
+            return e, time.perf_counter() - t0
+        raise AssertionError("no timeout")
+    own, own_elapsed = asyncio.run(expect_timeout(sleeper, {"seconds": 1}))
+    run_left, _ = asyncio.run(expect_timeout(async_sleeper, {"seconds": 1}, deadline=time.monotonic() + 0.05))
+    spent, _ = asyncio.run(expect_timeout(sleeper, {"seconds": 0}, deadline=time.monotonic() - 1))
+    runtime.close()
+    assert own.started and own.timeout_sec == 0.1 and own_elapsed < 0.3
+    assert run_left.timeout_sec < 0.1 and not spent.started and spent.timeout_sec == 0
+    assert runtime.stats()["tools"]["slow"]["timeouts"] == 3
+    print("✓ Per-tool timeout, remaining-run deadline, and no start once the run is out of time")
+
+
+def test_timeout_in_agent_loop():
+    saved_tools, saved_specs = dict(app.TOOLS), dict(app.tool_runtime.specs)
+    app.TOOLS["weather"] = lambda location: sleeper(1)
+    app.TOOLS["current_time"] = lambda: "12:00"
+    app.tool_runtime.specs["weather"] = ToolSpec(IO, 0.2)
+    app.tool_cache.clear()
+    events = []
+    try:
+        outcome = asyncio.run(app.run_agent_loop(
+            app.TOOLS, [{"role": "user", "content": "What's the weather in Paris and the time?"}],
+            on_event=events.append,
+        ))
+    finally:
+        app.TOOLS.clear()
+        app.TOOLS.update(saved_tools)
+        app.tool_runtime.specs = saved_specs
+        app.tool_cache.clear()
+    results = {e["tool"]: e for e in events if e["type"] == "tool_result"}
+    assert outcome.status == "ok" and [log["status"] for log in outcome.tool_logs] == ["ok", "timeout"]
+    assert results["weather"]["status"] == "timeout" and results["weather"]["timeout_sec"] == 0.2
+    assert results["current_time"]["exec_ms"] is not None and results["current_time"]["queue_ms"] is not None
+    print("✓ A slow tool is cut off, the run finishes; tool_result carries queue/exec ms")
+
+
+if __name__ == "__main__":
+    test_pools_and_timing()
+    test_deadlines()
+    test_timeout_in_agent_loop()
+    print("\n✅ Tool runtime working!")
@@ -0,0 +1,181 @@
+"""
+Bounded, policy-driven cache of tool results.
+
+- Each tool declares whether its results may be reused (ToolPolicy): never
+  (current_time, side-effecting tools), for `ttl_sec`, or until evicted or
+  invalidated (ttl_sec=None, pure tools like calculator)
+- web_search and weather are not stored here: http_fetch.Fetcher owns their
+  freshness (TTL plus ETag/Last-Modified revalidation and stale-if-error), and
+  a second TTL in front of it would skip revalidation and double the staleness
+- LRU over entries, capped by entry count and approximate size (characters of
+  key + result); results larger than `max_entry_chars` are not stored
+- Filesystem reads are tagged with the path they read (resolved like tools.py
+  does): write_file drops read_file entries for the path it writes and
+  list_files entries for its parent directories; run_command (which may run a
+  script that writes anything) drops every path-tagged entry
+- A result computed while an invalidation happened is returned but not stored,
+  so a read racing a write never caches the old content
+- Thread-safe: tools run on worker threads; tool calls themselves run outside
+  the lock
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class ToolPolicy(NamedTuple):
+    cache: bool = False
+    ttl_sec: Optional[float] = None          # None: until evicted or invalidated
+    path_arg: Optional[str] = None           # tag entries with this (resolved) path argument
+    path_default: str = "."
+    invalidates: Optional[str] = None        # "path": the written path argument; "*": every path-tagged entry
+
+
+NO_CACHE = ToolPolicy()
+
+TOOL_POLICIES: Dict[str, ToolPolicy] = {
+    "calculator": ToolPolicy(cache=True),
+    "current_time": NO_CACHE,
+    # Cached (and revalidated) by http_fetch.Fetcher
+    "web_search": NO_CACHE,
+    "weather": NO_CACHE,
+    # TTL as well: files can change outside the agent
+    "read_file": ToolPolicy(cache=True, ttl_sec=60, path_arg="path"),
+    "list_files": ToolPolicy(cache=True, ttl_sec=60, path_arg="path"),
+    "write_file": ToolPolicy(path_arg="path", invalidates="path"),
+    "run_command": ToolPolicy(invalidates="*"),
+}
+
+
+def resolve_path(value: Any) -> str:
+    return str((Path.cwd() / str(value)).resolve())
+
+
+class _Entry:
+    __slots__ = ("tool", "result", "expires", "path", "size")
+
+    def __init__(self, tool: str, result: str, expires: Optional[float], path: Optional[str], size: int) -> None:
+        self.tool = tool
+        self.result = result
+        self.expires = expires
+        self.path = path
+        self.size = size
+
+
+class ToolCache:
+    def __init__(
+        self,
+        policies: Optional[Dict[str, ToolPolicy]] = None,
+        max_entries: int = 512,
+        max_chars: int = 2_000_000,
+        max_entry_chars: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.policies = dict(TOOL_POLICIES if policies is None else policies)
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.max_entry_chars = max_entry_chars
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._chars = 0
+        self._epoch = 0  # bumped by every invalidation
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "uncacheable": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+        self._by_tool: Dict[str, Dict[str, int]] = {}
+
+    def policy(self, tool: str) -> ToolPolicy:
+        return self.policies.get(tool, NO_CACHE)
+
+    def call(self, tool: str, args: Dict[str, Any], fn: Callable[..., str]) -> str:
+        """fn(**args), served from the cache when the tool's policy allows it."""
+        policy = self.policy(tool)
+        if not policy.cache:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            try:
+                return fn(**args)
+            finally:
+                if policy.invalidates:
+                    self._invalidate_for(policy, args)
+
+        key = (tool, json.dumps(args, sort_keys=True))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires is not None and entry.expires <= self._clock():
+                self._drop(key)
+                self._stats["expired"] += 1
+                entry = None
+            counts = self._by_tool.setdefault(tool, {"hits": 0, "misses": 0})
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                counts["hits"] += 1
+                return entry.result
+            self._stats["misses"] += 1
+            counts["misses"] += 1
+            epoch = self._epoch
+
+        result = fn(**args)
+        if isinstance(result, str):
+            self._store(key, policy, args, result, epoch)
+        return result
+
+    def _store(self, key: Tuple[str, str], policy: ToolPolicy, args: Dict[str, Any], result: str, epoch: int) -> None:
+        size = len(key[1]) + len(result)
+        if size > self.max_entry_chars:
+            return
+        path = resolve_path(args.get(policy.path_arg, policy.path_default)) if policy.path_arg else None
+        with self._lock:
+            if path is not None and epoch != self._epoch:
+                return  # a write landed while this read ran; its result may be stale
+            if key in self._entries:
+                self._drop(key)
+            expires = self._clock() + policy.ttl_sec if policy.ttl_sec is not None else None
+            self._entries[key] = _Entry(key[0], result, expires, path, size)
+            self._chars += size
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        self._chars -= self._entries.pop(key).size
+
+    def _invalidate_for(self, policy: ToolPolicy, args: Dict[str, Any]) -> None:
+        if policy.invalidates == "*":
+            self.invalidate_paths(None)
+        else:
+            path = Path(resolve_path(args.get(policy.path_arg, policy.path_default)))
+            # The file itself, plus every directory listing that may now show it
+            self.invalidate_paths({str(path), *(str(p) for p in path.parents)})
+
+    def invalidate_paths(self, paths: Optional[set]) -> int:
+        """Drop path-tagged entries for `paths` (None: all of them). Returns the number dropped."""
+        with self._lock:
+            self._epoch += 1
+            self._stats["invalidations"] += 1
+            stale = [k for k, e in self._entries.items() if e.path is not None and (paths is None or e.path in paths)]
+            for key in stale:
+                self._drop(key)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "chars": self._chars,
+                "max_entries": self.max_entries,
+                "max_chars": self.max_chars,
+                "by_tool": {tool: dict(counts) for tool, counts in self._by_tool.items()},
+            }
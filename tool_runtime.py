@@ -0,0 +1,177 @@
+"""
+Execution layer for agent tools.
+
+- Each tool declares how it runs (ToolSpec): on the I/O pool (network, files,
+  subprocesses), on the CPU pool (pure computation, kept small so it cannot
+  starve I/O tools of threads) or natively on the event loop (async def)
+- Every call gets a deadline: the tool's own `timeout_sec`, shortened to what
+  is left of the run (`deadline`, monotonic). A call that has not started by
+  then never starts; a running async tool is cancelled; a running thread
+  cannot be interrupted, so its eventual result is discarded
+- ToolRun reports queue time (waiting for a worker) and exec time separately
+"""
+import asyncio
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+IO, CPU, ASYNC = "io", "cpu", "async"
+
+
+class ToolSpec(NamedTuple):
+    pool: str = IO
+    timeout_sec: float = 10.0
+
+
+DEFAULT_SPEC = ToolSpec()
+
+TOOL_SPECS: Dict[str, ToolSpec] = {
+    "calculator": ToolSpec(CPU, 2.0),
+    "current_time": ToolSpec(CPU, 1.0),
+    "web_search": ToolSpec(IO, 8.0),      # requests timeout=5 per attempt
+    "weather": ToolSpec(IO, 8.0),
+    "list_files": ToolSpec(IO, 5.0),
+    "read_file": ToolSpec(IO, 5.0),
+    "write_file": ToolSpec(IO, 5.0),
+    "run_command": ToolSpec(IO, 25.0),    # the subprocess itself is killed after 20s
+}
+
+
+class ToolTimeout(Exception):
+    """The tool missed its deadline; `started` is False if it never got a worker."""
+
+    def __init__(self, tool: str, timeout_sec: float, started: bool) -> None:
+        where = "running" if started else "waiting for a worker"
+        super().__init__(f"{tool} timed out after {timeout_sec:.1f}s ({where})")
+        self.tool = tool
+        self.timeout_sec = timeout_sec
+        self.started = started
+
+
+class ToolRun(NamedTuple):
+    result: Any
+    queue_ms: float
+    exec_ms: float
+    timeout_sec: float
+
+
+class ToolRuntime:
+    def __init__(
+        self,
+        io_workers: int = 8,
+        cpu_workers: int = 2,
+        specs: Optional[Dict[str, ToolSpec]] = None,
+    ) -> None:
+        self.specs = dict(TOOL_SPECS if specs is None else specs)
+        self._pools = {
+            IO: ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="tool-io"),
+            CPU: ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="tool-cpu"),
+        }
+        self._workers = {IO: io_workers, CPU: cpu_workers}
+        self._lock = threading.Lock()
+        self._busy = {IO: 0, CPU: 0}
+        self._tools: Dict[str, Dict[str, float]] = {}
+
+    def spec(self, tool: str, fn: Callable) -> ToolSpec:
+        spec = self.specs.get(tool, DEFAULT_SPEC)
+        if inspect.iscoroutinefunction(fn):
+            return spec._replace(pool=ASYNC)
+        return spec
+
+    async def run(self, tool: str, fn: Callable[..., Any], args: Dict[str, Any], deadline: Optional[float] = None) -> ToolRun:
+        """
+        fn(**args) on the tool's pool within min(timeout_sec, deadline - now).
+        Raises ToolTimeout on a missed deadline; the tool's own exceptions propagate.
+        """
+        spec = self.spec(tool, fn)
+        submitted = time.perf_counter()
+        timeout = spec.timeout_sec
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            self._record(tool, "timeouts")
+            raise ToolTimeout(tool, 0.0, started=False)
+
+        started: Dict[str, float] = {}
+        finished: Dict[str, float] = {}
+
+        def call():
+            started["at"] = time.perf_counter()
+            with self._lock:
+                self._busy[spec.pool] += 1
+            try:
+                return fn(**args)
+            finally:
+                finished["at"] = time.perf_counter()
+                with self._lock:
+                    self._busy[spec.pool] -= 1
+
+        async def call_async():
+            started["at"] = time.perf_counter()
+            try:
+                return await fn(**args)
+            finally:
+                finished["at"] = time.perf_counter()
+
+        if spec.pool == ASYNC:
+            work = call_async()
+        else:
+            work = asyncio.get_running_loop().run_in_executor(self._pools[spec.pool], call)
+        try:
+            result = await asyncio.wait_for(work, timeout)
+        except asyncio.TimeoutError:
+            self._record(tool, "timeouts")
+            raise ToolTimeout(tool, timeout, started="at" in started) from None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(tool, "errors", started, finished, submitted)
+            raise
+        self._record(tool, "calls", started, finished, submitted)
+        return ToolRun(
+            result=result,
+            queue_ms=(started["at"] - submitted) * 1000,
+            exec_ms=(finished["at"] - started["at"]) * 1000,
+            timeout_sec=timeout,
+        )
+
+    def _record(self, tool: str, outcome: str, started=None, finished=None, submitted=None) -> None:
+        with self._lock:
+            stats = self._tools.setdefault(
+                tool, {"calls": 0, "errors": 0, "timeouts": 0, "queue_ms": 0.0, "exec_ms": 0.0}
+            )
+            stats[outcome] += 1
+            if started and finished:
+                stats["queue_ms"] += (started["at"] - submitted) * 1000
+                stats["exec_ms"] += (finished["at"] - started["at"]) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for tool, s in self._tools.items():
+                ran = s["calls"] + s["errors"]
+                tools[tool] = {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "timeouts": s["timeouts"],
+                    "queue_ms_mean": round(s["queue_ms"] / ran, 1) if ran else None,
+                    "exec_ms_mean": round(s["exec_ms"] / ran, 1) if ran else None,
+                }
+            return {
+                "pools": {pool: {"workers": self._workers[pool], "busy": self._busy[pool]} for pool in self._pools},
+                "tools": tools,
+            }
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def runtime_from_env() -> ToolRuntime:
+    return ToolRuntime(
+        io_workers=int(os.getenv("TOOL_IO_WORKERS", "8")),
+        cpu_workers=int(os.getenv("TOOL_CPU_WORKERS", "2")),
+    )
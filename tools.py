@@ -1,23 +1,25 @@
 """
 Tool functions for the AI assistant
 """
+import json
 import subprocess
 from datetime import datetime
 from pathlib import Path
-import requests
+from typing import List, Optional
 
+from calc_engine import CalcError, evaluate, evaluate_many
+from http_fetch import get_fetcher
 
-def calculator(expression: str) -> str:
-    """Evaluate a mathematical expression safely."""
+
+def calculator(expression: str = "", expressions: Optional[List[str]] = None) -> str:
+    """Evaluate a mathematical expression (or a batch, one "expr = result" line each) safely."""
     try:
-        # Only allow safe math operations
-        allowed_chars = "0123456789+-*/(). "
-        if not all(c in allowed_chars for c in expression):
-            return "Error: Invalid characters in expression"
-        result = eval(expression, {"__builtins__": {}}, {})
-        return str(result)
-    except Exception as e:
-        return f"Error: {str(e)}"
+        if expressions not in (None, []):
+            results = evaluate_many(expressions)
+            return "\n".join(f"{expr} = {result}" for expr, result in zip(expressions, results))
+        return str(evaluate(expression))
+    except CalcError as e:
+        return f"Error: {e}"
 
 
 def current_time() -> str:
@@ -31,8 +33,8 @@ def web_search(query: str) -> str:
     try:
         url = "https://api.duckduckgo.com/"
         params = {"q": query, "format": "json", "no_html": "1", "skip_disambig": "1"}
-        response = requests.get(url, params=params, timeout=5)
-        data = response.json()
+        response = get_fetcher().fetch("web_search", query, url, params=params)
+        data = json.loads(response.text)
         
         # Try to get the abstract or related topics
         if data.get("Abstract"):
@@ -54,8 +56,8 @@ def weather(location: str) -> str:
     """Get weather information for a location using wttr.in."""
     try:
         url = f"https://wttr.in/{location}?format=%l:+%C+%t+%h+%w"
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
+        response = get_fetcher().fetch("weather", location, url)
+        if response.status == 200:
             return response.text.strip()
         return f"Could not fetch weather for {location}"
     except Exception as e: